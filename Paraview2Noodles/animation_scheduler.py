@@ -0,0 +1,198 @@
+"""
+Non-blocking animation playback for a Rigatoni server.
+
+AnimationScheduler runs as a task on the server's event loop. It fetches frames in an executor, so straining or
+reading the next frame never blocks the loop, publishes them through a FramePublisher at a target frame rate, and
+skips frames when publishing falls behind so playback keeps real time instead of slowing down.
+Playback is controlled with pause, resume, seek, set_loop, set_fps and stop, all meant to be called from method
+handlers on the same loop, and stats reports the achieved frame rate next to the target one.
+
+Frames can come from anything indexable with a length, a FrameProvider, PackedFrames or a list of strained frames.
+"""
+import asyncio
+import time
+from collections import deque
+
+
+class AnimationScheduler:
+    """
+    Plays frames through a FramePublisher at a target frame rate.
+
+    Attributes:
+        frames_shown (int): Frames published so far.
+        frames_dropped (int): Frames skipped to catch up with the target frame rate.
+
+    Example usage (inside a method handler):
+        scheduler = AnimationScheduler(publisher, frames, fps=10)
+        scheduler.start()
+    """
+    def __init__(self, publisher, frames, fps=10.0, loop=True, drop_frames=True, executor=None):
+        """
+        :param publisher: FramePublisher the frames are shown through
+        :param frames: indexable frames with a length
+        :param fps: target frame rate
+        :param loop: start over after the last frame, otherwise playback stops there
+        :param drop_frames: skip frames to keep up when publishing is slower than the frame rate
+        :param executor: executor frames are fetched in, None uses the loop's default thread pool
+        """
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.publisher = publisher
+        self.frames = frames
+        self.fps = float(fps)
+        self.loop = loop
+        self.drop_frames = drop_frames
+        self.executor = executor
+        self.index = 0
+        self.paused = False
+        self.frames_shown = 0
+        self.frames_dropped = 0
+        self._task = None
+        self._wake = None
+        self._seek_to = None
+        # Publish times of the last frames, for the achieved frame rate
+        self._shown_times = deque(maxlen=30)
+
+    @property
+    def running(self):
+        """True while the playback task is alive, paused or not."""
+        return self._task is not None and not self._task.done()
+
+    def start(self, index=None):
+        """
+        Start playback, from index if given. Must be called on the event loop.
+
+        :return: the asyncio.Task playing the frames, None if there are no frames to play
+        """
+        if index is not None:
+            self.index = index
+        if self.running:
+            return self._task
+        if len(self.frames) == 0:
+            return None
+        self.paused = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def _interrupt(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    def pause(self):
+        """Hold the current frame."""
+        self.paused = True
+        self._interrupt()
+
+    def resume(self):
+        """Continue after pause."""
+        self.paused = False
+        self._interrupt()
+
+    def seek(self, index):
+        """Show frame index next, playback keeps its paused/playing state. Ignored when there are no frames."""
+        if len(self.frames) == 0:
+            return
+        self._seek_to = int(index) % len(self.frames)
+        self._interrupt()
+
+    def set_fps(self, fps):
+        """Change the target frame rate."""
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.fps = float(fps)
+        self._shown_times.clear()
+        self._interrupt()
+
+    def set_loop(self, loop):
+        """Loop back to the first frame after the last one, or stop there."""
+        self.loop = bool(loop)
+
+    def stop(self):
+        """End playback, the last frame shown stays on the entity."""
+        if self.running:
+            self._task.cancel()
+
+    def achieved_fps(self):
+        """Frame rate over the last frames published."""
+        if len(self._shown_times) < 2:
+            return 0.0
+        span = self._shown_times[-1] - self._shown_times[0]
+        return (len(self._shown_times) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        """
+        Playback state and frame rates.
+
+        :return: dict with target_fps, achieved_fps, frame, frame_count, frames_shown, frames_dropped and state
+        """
+        if not self.running:
+            state = "stopped"
+        else:
+            state = "paused" if self.paused else "playing"
+        return {
+            "target_fps": self.fps,
+            "achieved_fps": round(self.achieved_fps(), 2),
+            "frame": self.index,
+            "frame_count": len(self.frames),
+            "frames_shown": self.frames_shown,
+            "frames_dropped": self.frames_dropped,
+            "state": state,
+        }
+
+    async def _sleep(self, seconds):
+        """Sleep until seconds pass or a control call interrupts, returns True if interrupted."""
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, seconds))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _show(self, index):
+        loop = asyncio.get_running_loop()
+        frame = await loop.run_in_executor(self.executor, self.frames.__getitem__, index)
+        self.publisher.publish(frame)
+        self.frames_shown += 1
+        self._shown_times.append(time.perf_counter())
+
+    async def _run(self):
+        count = len(self.frames)
+        if count == 0:
+            return
+        deadline = time.perf_counter()
+        while True:
+            if self._seek_to is not None:
+                self.index, self._seek_to = self._seek_to, None
+                if self.paused:
+                    # Show the frame seeked to even while paused
+                    await self._show(self.index)
+            if self.paused:
+                await self._sleep(3600)
+                deadline = time.perf_counter()
+                self._shown_times.clear()
+                continue
+
+            await self._show(self.index)
+            deadline += 1.0 / self.fps
+            step = 1
+            now = time.perf_counter()
+            if self.drop_frames and now > deadline:
+                # Skip the frames whose time has already passed
+                behind = int((now - deadline) * self.fps)
+                step += behind
+                self.frames_dropped += behind
+                deadline += behind / self.fps
+            if now - deadline > 1.0:
+                # Too far behind to catch up (drop_frames off, or a long stall), restart the clock
+                deadline = now
+
+            next_index = self.index + step
+            if next_index >= count:
+                if not self.loop:
+                    return
+                next_index %= count
+            self.index = next_index
+            if await self._sleep(deadline - time.perf_counter()):
+                # A control call came in, act on it and restart the clock from now
+                deadline = time.perf_counter()
@@ -0,0 +1,148 @@
+"""
+Lazy frame provider for animation playback.
+
+Instead of straining every frame up front, the provider strains frames on demand with a bounded read-ahead window.
+Up to read_ahead frames are strained in the background by a process pool (see Batch_Strainer), and the frame
+that was played last is freed when the next one is handed out. Resident memory stays at read_ahead + 1 frames
+no matter how long the animation is, and the server can go live as soon as the first frame is ready.
+Frames can also be fetched by index, stepping forward (or skipping a few frames) reuses the read-ahead window,
+jumping anywhere else restarts it at the requested frame.
+"""
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from Batch_Strainer import SharedFrame, strain_to_shared, frame_files
+from Reader_Strainer_Threading import threading_strainer
+
+logger = logging.getLogger(__name__)
+
+
+class FrameProvider:
+    """
+    Iterable of strained frames with background prefetching.
+
+    Each pass over the provider strains the sequence again from the first frame, so it can be looped.
+    provider[i] fetches a single frame and keeps reading ahead from there.
+    Frames handed out are only valid until the next frame is requested.
+    provider[i] can be called from several threads, e.g. executor workers of an old and a new scheduler, the calls
+    take turns on the read-ahead window.
+
+    Example usage:
+        provider = FrameProvider.from_folder("path/to/folder/", read_ahead=8)
+        for frame in provider:
+            publish(frame)
+        provider.close()
+    """
+    def __init__(self, filenames, read_ahead=4, max_workers=None, strainer=threading_strainer, cache=None):
+        """
+        :param filenames: frame files in playback order
+        :param read_ahead: number of frames strained ahead of the one being played
+        :param max_workers: process pool size, defaults to min(read_ahead, cpu count)
+        :param strainer: picklable strainer function, threading_strainer by default
+        :param cache: optional StrainCache, replays skip VTK parsing for frames already strained
+        """
+        self.filenames = list(filenames)
+        self.read_ahead = max(1, read_ahead)
+        self.strainer = strainer
+        self.cache = cache
+        if max_workers is None:
+            max_workers = min(self.read_ahead, os.cpu_count() or 1)
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        self._pending = deque()
+        self._next_index = 0
+        self._current = None
+        self._lock = threading.Lock()
+        self._fill()
+
+    @classmethod
+    def from_folder(cls, folder_path, extension=".ply", **kwargs):
+        """Provider over every numbered frame in a folder, in frame order."""
+        return cls(frame_files(folder_path, extension), **kwargs)
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def _fill(self):
+        """Keep read_ahead frames in flight."""
+        while self._next_index < len(self.filenames) and len(self._pending) < self.read_ahead:
+            filename = self.filenames[self._next_index]
+            self._pending.append((self._next_index, filename,
+                                  self._pool.submit(strain_to_shared, filename, self.strainer, self.cache)))
+            self._next_index += 1
+
+    def _evict_current(self):
+        if self._current is not None:
+            self._current.unlink()
+            self._current = None
+
+    def _drop_pending(self):
+        """Cancel queued frames and free the ones already strained."""
+        while self._pending:
+            self._drop_first()
+
+    def _drop_first(self):
+        """Cancel or free the first queued frame."""
+        index, filename, future = self._pending.popleft()
+        if future.cancel():
+            return
+        try:
+            SharedFrame(filename, future.result()).unlink()
+        except Exception as e:
+            logger.warning("could not free frame %s: %s", filename, e)
+
+    def __iter__(self):
+        if (self._pending and self._pending[0][0] != 0) or self._next_index != len(self._pending):
+            # Frames were already handed out, start the sequence over
+            self._evict_current()
+            self._drop_pending()
+            self._next_index = 0
+        self._fill()
+        try:
+            while self._pending:
+                index, filename, future = self._pending.popleft()
+                self._fill()
+                frame = SharedFrame(filename, future.result())
+                self._evict_current()
+                self._current = frame
+                yield frame
+        finally:
+            self._evict_current()
+            self._drop_pending()
+            self._next_index = 0
+
+    def __getitem__(self, index):
+        """
+        Frame at index, valid until the next frame is requested.
+        Frames queued before it are skipped, if it is not in the read-ahead window the window restarts there.
+        """
+        if index < 0:
+            index += len(self.filenames)
+        if not 0 <= index < len(self.filenames):
+            raise IndexError("frame index out of range")
+        with self._lock:
+            while self._pending and self._pending[0][0] < index:
+                self._drop_first()
+            if not self._pending or self._pending[0][0] != index:
+                self._drop_pending()
+                self._next_index = index
+            self._fill()
+            _, filename, future = self._pending.popleft()
+            self._fill()
+            frame = SharedFrame(filename, future.result())
+            self._evict_current()
+            self._current = frame
+            return frame
+
+    def prime(self):
+        """Queue the first read_ahead frames again so the next pass starts warm."""
+        with self._lock:
+            self._fill()
+
+    def close(self):
+        """Free every frame and shut the pool down."""
+        with self._lock:
+            self._evict_current()
+            self._drop_pending()
+        self._pool.shutdown()
@@ -0,0 +1,375 @@
+"""
+Publishes animation frames to a Rigatoni server through one long lived entity.
+
+A single ByteServer and a single Material are created up front and reused for every frame. Each frame only builds
+its geometry and swaps it into the entity's render representation, the previous geometry is deleted.
+The ByteServer keeps the bytes of the last few frames, a small pool of slots, so clients still downloading the
+previous frame can finish, and older frames are dropped from it.
+
+With delta encoding (the default) every attribute and the index buffer are published as their own buffer and view.
+Each one is hashed and compared to the previous frame's, unchanged streams are reused by the new patch instead of
+being sent again. When only positions or colors move the index buffer is never resent, and a frame identical to the
+previous one costs nothing.
+
+Large frames can be split into spatially coherent chunks (see Mesh_Chunking), one patch per chunk, so every patch
+fits 16 bit indices and clients can fetch the chunks' buffers in parallel.
+
+A frame can also be published as several parts, e.g. the blocks of a composite dataset (see Composite_Strainer),
+one patch per part. publish_blocks publishes blocks either that way or as one entity per block,
+with the entities sharing a single ByteServer. Patches have no name, so only one entity per block keeps
+the block names visible to clients.
+"""
+import asyncio
+import hashlib
+from collections import deque
+import numpy as np
+import rigatoni
+from rigatoni import geometry as geo
+from rigatoni import noodle_objects as nooobs
+from Attribute_Encoding import encode_frame
+from Mesh_Chunking import chunk_mesh
+
+DEFAULT_FRAME_METHODS = ["noo::set_position", "noo::set_rotation", "noo::set_scale", "stop animation"]
+# Buffers larger than this are hosted on the ByteServer instead of being sent inline
+INLINE_LIMIT = 10000
+# Seconds a coarser level of detail stays up before the next finer one replaces it
+DEFAULT_LOD_HOLD = 0.5
+# field: (semantic, format, normalized)
+ATTRIBUTE_STREAMS = {
+    "points": ("POSITION", "VEC3", False),
+    "normals": ("NORMAL", "VEC3", False),
+    "colors": ("COLOR", "U8VEC4", True),
+}
+
+
+def array_digest(array):
+    """
+    Hash of an array's shape, dtype and bytes, used to spot streams that did not change between frames.
+    """
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str((array.shape, array.dtype.str)).encode())
+    digest.update(memoryview(array).cast("B"))
+    return digest.digest()
+
+
+class _Stream:
+    """One published buffer and its view."""
+    def __init__(self, digest, buffer, view, tag, nbytes):
+        self.digest = digest
+        self.buffer = buffer
+        self.view = view
+        self.tag = tag
+        self.nbytes = nbytes
+
+
+class FramePublisher:
+    """
+    Swap strained frames into one entity on a Rigatoni server.
+
+    Attributes:
+        bytes_sent (int): Bytes of buffers published so far.
+        bytes_reused (int): Bytes that delta encoding did not have to publish again.
+        frames_skipped (int): Frames identical to their predecessor that were not published at all.
+
+    Example usage:
+        publisher = FramePublisher(server, "Test Sphere", port=8000)
+        for frame in frames:
+            publisher.publish(frame)
+        publisher.close()
+    """
+    def __init__(self, server: rigatoni.Server, name="Test Sphere", port=8000, slots=2,
+                 position=(0, 5, 0, 0), methods=DEFAULT_FRAME_METHODS, delta=True,
+                 chunk_vertices=None, chunk_workers=None, byte_server=None):
+        """
+        :param server: server to publish on
+        :param name: name given to the entity and its geometry
+        :param port: port of the one ByteServer used for every frame
+        :param slots: number of frames whose bytes stay on the ByteServer
+        :param position: instance position of the entity
+        :param methods: names of the methods attached to the entity
+        :param delta: only publish the streams that changed since the previous frame
+        :param chunk_vertices: split frames into one patch per spatial chunk of at most this many vertices,
+            65536 keeps every patch on 16 bit indices. None publishes a single patch
+        :param chunk_workers: threads used to prepare the chunks' buffers
+        :param byte_server: ByteServer to share with other publishers, port is ignored then and close leaves it running
+        """
+        self.server = server
+        self.name = name
+        self.position = position
+        self.methods = methods
+        self.delta = delta
+        self.chunk_vertices = chunk_vertices
+        self.chunk_workers = chunk_workers
+        self._owns_byte_server = byte_server is None
+        self.byte_server = byte_server if byte_server is not None else rigatoni.ByteServer(port=port)
+        self.material = server.create_component(rigatoni.Material, name=f"{name} Material")
+        self.entity = None
+        self._slots = deque()
+        self.slots = max(1, slots)
+        self._streams = {}
+        self._retired = []
+        self.bytes_sent = 0
+        self.bytes_reused = 0
+        self.frames_skipped = 0
+
+    def _patch_input(self, frame):
+        return geo.GeometryPatchInput(
+            vertices=frame.points,
+            indices=frame.polygons,
+            normals=frame.normals,
+            colors=frame.colors,
+            index_type="TRIANGLES",
+            material=self.material.id
+        )
+
+    def _buffer_tags(self, patch):
+        """ByteServer tags of the buffers behind a patch, inline buffers have none."""
+        tags = set()
+        for attribute in patch.attributes:
+            view = self.server.get_delegate(attribute.view)
+            buffer = self.server.get_delegate(view.source_buffer)
+            uri = getattr(buffer, "uri_bytes", None)
+            if uri:
+                tags.add(str(uri).rsplit("/", 1)[-1])
+        return tags
+
+    def _release_old_slots(self):
+        while len(self._slots) > self.slots:
+            for tag in self._slots.popleft():
+                self.byte_server.buffers.pop(tag, None)
+
+    def _publish_stream(self, key, array):
+        """
+        Publish one contiguous array as its own buffer and view, or reuse the previous frame's if the bytes match.
+
+        :return: the _Stream holding the view
+        """
+        array = np.ascontiguousarray(array)
+        digest = array_digest(array)
+        previous = self._streams.get(key)
+        if previous is not None and previous.digest == digest:
+            self.bytes_reused += previous.nbytes
+            return previous
+        data = array.tobytes()
+        tag = None
+        if len(data) > INLINE_LIMIT:
+            uri = self.byte_server.add_buffer(data)
+            tag = uri.rsplit("/", 1)[-1]
+            buffer = self.server.create_buffer(name=f"{self.name} {key} Buffer", size=len(data), uri_bytes=uri)
+        else:
+            buffer = self.server.create_buffer(name=f"{self.name} {key} Buffer", size=len(data), inline_bytes=data)
+        view = self.server.create_bufferview(source_buffer=buffer.id, offset=0, length=len(data),
+                                             name=f"{self.name} {key} View", type="GEOMETRY")
+        if previous is not None:
+            self._retired.append(previous)
+        stream = _Stream(digest, buffer, view, tag, len(data))
+        self._streams[key] = stream
+        self.bytes_sent += len(data)
+        return stream
+
+    def _stream_arrays(self, frame):
+        """
+        Frame encoded into the formats the patch declares, float32 positions and normals, uint8 RGBA colors
+        and uint16 indices whenever the vertex count allows.
+        """
+        encoded = encode_frame(frame)
+        arrays = {"points": encoded.positions}
+        if encoded.normals is not None:
+            arrays["normals"] = encoded.normals
+        if encoded.colors is not None:
+            arrays["colors"] = encoded.colors
+        return arrays, encoded.indices
+
+    def _chunks(self, parts):
+        """The parts split into chunks below the vertex limit, or the parts as they are when chunking is off."""
+        if self.chunk_vertices is None:
+            return list(parts)
+        return [chunk for part in parts for chunk in chunk_mesh(part, self.chunk_vertices, workers=self.chunk_workers)]
+
+    def build_delta_patches(self, parts):
+        """
+        Patches for the parts of one frame, one per chunk, that reuse every stream unchanged since the previous frame.
+
+        :param parts: list of strained meshes, [frame] for a single mesh
+        :return: list of patches, or None if the frame is identical to the previous one
+        """
+        previous_streams = dict(self._streams)
+        used = set()
+        patches = []
+        for number, chunk in enumerate(self._chunks(parts)):
+            arrays, indices = self._stream_arrays(chunk)
+            vertex_count = len(arrays["points"])
+            index_format = "U16" if indices.dtype == np.uint16 else "U32"
+            attributes = []
+            for field, array in arrays.items():
+                semantic, format, normalized = ATTRIBUTE_STREAMS[field]
+                key = f"{field} {number}"
+                stream = self._publish_stream(key, array)
+                used.add(key)
+                attributes.append(nooobs.Attribute(view=stream.view.id, semantic=semantic, format=format,
+                                                   normalized=normalized, offset=0, stride=array.strides[0]))
+            key = f"indices {number}"
+            index_stream = self._publish_stream(key, indices)
+            used.add(key)
+            index = nooobs.Index(view=index_stream.view.id, count=indices.size, offset=0, format=index_format)
+            patches.append(nooobs.GeometryPatch(attributes=attributes, vertex_count=vertex_count, indices=index,
+                                                type="TRIANGLES", material=self.material.id))
+        # Streams the new frame no longer has
+        for key in list(self._streams):
+            if key not in used:
+                self._retired.append(self._streams.pop(key))
+
+        if self.entity is not None and not self._retired and previous_streams == self._streams:
+            return None
+        return patches
+
+    def build_geometry(self, patches):
+        """Geometry component from a list of patches."""
+        return self.server.create_component(rigatoni.Geometry, name=self.name, patches=patches)
+
+    def build_patches(self, parts):
+        """Patches for the parts of one frame, one per chunk, all sharing the publisher's material and ByteServer."""
+        return [geo.build_geometry_patch(self.server, self.name, self._patch_input(chunk), self.byte_server, generate_normals=False)
+                for chunk in self._chunks(parts)]
+
+    def publish(self, frame):
+        """
+        Show a frame. The first call creates the entity, later calls swap the geometry in place.
+
+        :param frame: strained frame with points, polygons, normals and colors
+        :return: the entity
+        """
+        return self.publish_parts([frame])
+
+    def publish_parts(self, parts):
+        """
+        Show a frame made of several meshes, one patch per part (and per chunk when chunking is on).
+
+        :param parts: list of strained meshes, e.g. the blocks of a composite dataset
+        :return: the entity
+        """
+        if self.delta:
+            patches = self.build_delta_patches(parts)
+            if patches is None:
+                self.frames_skipped += 1
+                return self.entity
+            return self._show_delta(self.build_geometry(patches))
+        patches = self.build_patches(parts)
+        geometry = self.build_geometry(patches)
+        return self._show(geometry, patches)
+
+    async def publish_lods(self, levels, hold=DEFAULT_LOD_HOLD):
+        """
+        Show a level of detail pyramid coarse to fine, awaited on the server's event loop.
+        Every level but the finest stays up for hold seconds before the next one swaps in over it. Meanwhile the loop
+        sends its messages, so clients fetch the small coarse buffers first and show them while the finer ones follow.
+
+        :param levels: list of strained levels, finest first, e.g. from Mesh_LOD.build_lod_pyramid
+        :param hold: seconds each coarser level is shown before the next finer one is published
+        :return: the entity
+        """
+        coarse_to_fine = list(reversed(levels))
+        for number, level in enumerate(coarse_to_fine):
+            self.publish(level)
+            if number < len(coarse_to_fine) - 1:
+                await asyncio.sleep(hold)
+        return self.entity
+
+    def _create_entity(self, geometry):
+        instances = geo.create_instances(positions=[self.position])
+        self.entity = geo.build_entity(self.server, geometry=geometry, instances=instances)
+        self.entity.methods_list = [self.server.get_delegate_id(method) for method in self.methods]
+        self.server.update_component(self.entity)
+
+    def _swap_mesh(self, geometry):
+        """
+        Point the entity at new geometry and delete the old mesh on its own.
+        A recursive delete would also queue the shared material for deletion, callers free what else it used.
+
+        :return: the old geometry's delegate
+        """
+        old_rep = self.entity.render_rep
+        old_geometry = self.server.get_delegate(old_rep.mesh)
+        self.entity.render_rep = nooobs.RenderRepresentation(mesh=geometry.id, instances=old_rep.instances)
+        self.server.update_component(self.entity)
+        self.server.delete_component(old_geometry)
+        return old_geometry
+
+    def _show(self, geometry, patches):
+        if self.entity is None:
+            self._create_entity(geometry)
+        else:
+            # Every frame builds its own views and buffers, delete the old frame's, the material stays
+            old_geometry = self._swap_mesh(geometry)
+            views = []
+            for patch in old_geometry.patches:
+                for view in [attribute.view for attribute in patch.attributes] + [patch.indices.view]:
+                    if view not in views:
+                        views.append(view)
+            buffers = []
+            for view in views:
+                buffer = self.server.get_delegate(view).source_buffer
+                if buffer not in buffers:
+                    buffers.append(buffer)
+            for component in views + buffers:
+                self.server.delete_component(component)
+        tags = set()
+        for patch in patches:
+            tags |= self._buffer_tags(patch)
+        self._slots.append(tags)
+        self._release_old_slots()
+        return self.entity
+
+    def _show_delta(self, geometry):
+        if self.entity is None:
+            self._create_entity(geometry)
+        else:
+            # The reused streams stay, only the retired ones are deleted below
+            self._swap_mesh(geometry)
+        tags = set()
+        for stream in self._retired:
+            self.server.delete_component(stream.view)
+            self.server.delete_component(stream.buffer)
+            if stream.tag is not None:
+                tags.add(stream.tag)
+        self._retired = []
+        self._slots.append(tags)
+        self._release_old_slots()
+        return self.entity
+
+    def close(self, delete_entity=False):
+        """Stop the ByteServer unless it is shared, optionally deleting the entity and its geometry."""
+        if delete_entity and self.entity is not None:
+            self.server.delete_component(self.entity)
+            self.entity = None
+        if self._owns_byte_server:
+            self.byte_server.shutdown()
+
+
+def publish_blocks(server: rigatoni.Server, blocks, mode="patches", name="Blocks", port=8000, **kwargs):
+    """
+    Publish the strained blocks of a composite dataset.
+
+    :param server: server to publish on
+    :param blocks: list of Composite_Strainer.StrainedBlock
+    :param mode: "patches" for one entity with a patch per block, "entities" for one entity per block named after it.
+        NOODLES patches carry no name, only "entities" keeps the block names on the client
+    :param name: entity name in "patches" mode
+    :param port: port of the ByteServer, shared by every block
+    :param kwargs: passed on to FramePublisher
+    :return: list of FramePublisher, one per entity. Close the first one last, it owns the ByteServer
+    """
+    if mode == "patches":
+        publisher = FramePublisher(server, name=name, port=port, **kwargs)
+        publisher.publish_parts([block.data for block in blocks])
+        return [publisher]
+    if mode != "entities":
+        raise ValueError("mode must be 'patches' or 'entities'")
+    publishers = []
+    for block in blocks:
+        shared = publishers[0].byte_server if publishers else None
+        publisher = FramePublisher(server, name=block.name, port=port, byte_server=shared, **kwargs)
+        publisher.publish(block.data)
+        publishers.append(publisher)
+    return publishers
@@ -5,8 +5,15 @@ from typing import List, Optional
 import numpy as np
 import quaternion
 from VtkNoodlesSourceStrainer import SourceStrainer
-from Threading_withT import threading_strainer
+from Reader_Strainer_Threading import threading_strainer
+from frame_provider import FrameProvider
+from Strain_Cache import StrainCache
+from Packed_Frames import PackedFrames
+from frame_publisher import FramePublisher, DEFAULT_FRAME_METHODS
+from animation_scheduler import AnimationScheduler
 from Reader_Strainer import noodStrainer
+from Async_Strainer import StrainJobs, async_threading_strainer, run_strainer
+from Mesh_LOD import build_lod_pyramid
 import rigatoni
 from rigatoni.core import Server
 from rigatoni import geometry as geo
@@ -55,116 +62,113 @@ def delete(server: rigatoni.Server, context, *args):
     sphere = server.get_delegate(context)
     server.delete_component(sphere)
     return 0
-def stop_animation(server:rigatoni.Server, context, *args):
-    break_value = True
-    return 0
+### Background straining jobs, method handlers run on the server's event loop and must not block it
+jobs = StrainJobs()
+load_publisher = None
 
 
-def create_next_entity(server: rigatoni.Server, context, *args):
+async def load_levels(server: rigatoni.Server, path):
+    """
+    Strain a file and show it coarse to fine, the 5% level first and the full mesh last (see Mesh_LOD).
+    Straining and decimation run in the loop's thread pool.
     """
-    Create a new entity for each individual animation frame
+    global load_publisher
+    data = await async_threading_strainer(path)
+    levels = await run_strainer(build_lod_pyramid, data)
+    if load_publisher is None:
+        load_publisher = FramePublisher(server, name="Loaded File", port=8001)
+    return await load_publisher.publish_lods(levels)
 
-    Parameters:
-    - server (rigatoni.Server): The Rigatoni server instance where the entity will be created.
-    - context: The context information for the entity creation.
-    - *args: Variable number of arguments passed to the method.
-        - args[0][0] (str): The file path or reference for the entity creation.
-        - args[0][1] (int): The version number for each byte_server
-        - args[0][2] (str): The replacement ID for the entity to be replaced
-    
-    Returns:
-    - str: The ID of the created entity.
-
-    Example:
-    entity_id = create_next_entity(server_instance, context_info, "file_path.obj", 1, "replacement_id", "material_name")
+
+def load_file(server: rigatoni.Server, context, path):
     """
-    print("here is args",args)
-    file = args[0][0]
-    version = args[0][1]
-    replacement_id = args[0][2]
-    name = "Test Sphere"
-    material = server.create_component(rigatoni.Material, name="Test Material")
-
-    # Create Patch
-    patches = []
-    patch_info = geo.GeometryPatchInput(
-        vertices=file.points,
-        indices=file.polygons,
-        normals = file.normals,
-        colors = file.colors,
-        index_type="TRIANGLES",
-        material=material.id
-    )
-    byte_server_largemesh = rigatoni.ByteServer(port=version)
-    patches.append(geo.build_geometry_patch(server, name, patch_info, byte_server_largemesh,generate_normals = False))
-    # Create geometry using patches
-    sphere = server.create_component(rigatoni.Geometry, name=name, patches=patches)
-    # Set instances and create an entity
-    instances = geo.create_instances(
-        positions=[(0, 5, 0, 0)],
-    )
-    entity = geo.build_entity(server, geometry=sphere, instances=instances)
-    entity.methods_list = [
-        server.get_delegate_id("noo::set_position"),
-        server.get_delegate_id("noo::set_rotation"),
-        server.get_delegate_id("noo::set_scale"),
-        server.get_delegate_id("stop animation"),
-        server.get_delegate_id("delete"),
-    ]
-    server.update_component(entity)
-    ### Delete previous frame
-    server.delete_component(replacement_id) 
-    return entity.id
+    Strain a file in the background and show it once it is ready, clients stay responsive while it loads.
+    A coarse level of detail is shown first and finer ones swap in over it.
+    Loading another file before this one is done cancels this one, finer levels of it included.
+    """
+    jobs.start("load file", load_levels(server, path), lambda entity: None)
+    return 0
+
+
+def cancel_load(server: rigatoni.Server, context, *args):
+    jobs.cancel("load file")
+    return 0
+
+
+### Playback controls attached to the animated entity next to the transform methods
+ANIMATION_METHODS = DEFAULT_FRAME_METHODS + ["pause animation", "resume animation", "seek animation",
+                                             "loop animation", "animation rate", "animation stats"]
+scheduler = None
+### One publisher for every run of the animation, a new one would try to bind a second ByteServer to the same port
+animation_publisher = None
+
 
 def loop_scene(server: rigatoni.Server, context, *args):
     """
-    Create the first frame and then loop through the rest to build a scene.
+    Create the first frame and start playing the rest in the background at the target frame rate.
+    Every frame goes through one FramePublisher, so the ByteServer, material and entity are created once
+    and each frame only swaps its geometry into the entity. Calling it again restarts playback on the same publisher. The method returns right away, playback runs
+    as a task on the server's event loop and is controlled with the animation methods.
     Parameters:
     - server (rigatoni.Server): The Rigatoni server instance where the scene will be created.
     - *args: Variable number of arguments passed to the method.
-        - args[0] (int): byte server port number
-        - args[1] (str): The name for the initial entity.
-        - args[2] (rigatoni.Material.Id): The id for the previous frame
     """
-    version= 8000
-    name = "Test Sphere"
-    material = server.create_component(comp_type = rigatoni.Material, name="Test Material")
-    # Create Patch
-    patches = []
-    patch_info = geo.GeometryPatchInput(
-        vertices=starting_data.points,
-        indices=starting_data.polygons,
-        normals = starting_data.normals,
-        colors = starting_data.colors,
-        index_type="TRIANGLES",
-        material=material.id
-    )
-    byte_server_largemesh = rigatoni.ByteServer(port=version)
-    patches.append(geo.build_geometry_patch(server, name, patch_info, byte_server_largemesh,generate_normals = False)) 
-    # Create geometry using patches
-    sphere = server.create_component(rigatoni.Geometry, name=name, patches=patches)
-    # Set instances and create an entity
-    instances = geo.create_instances(
-        positions=[(0, 5, 0, 0)],
-    )
-    entity = geo.build_entity(server, geometry=sphere, instances=instances)
-    entity.methods_list = [
-        server.get_delegate_id("noo::set_position"),
-        server.get_delegate_id("noo::set_rotation"),
-        server.get_delegate_id("stop animation"),
-        server.get_delegate_id("noo::set_scale"),
-    ]
-    server.update_component(entity)
-    id = entity.id
-    version += 1
-    for file in file_data:
-        if(break_value == True):
-            break
-        id = create_next_entity(server, context,[file, version, id])
-        version += 1
+    global scheduler, animation_publisher
+    if scheduler is not None and scheduler.running:
+        ### The old task's frame fetch may still be running in a worker, FrameProvider serializes it with the new ones
+        scheduler.stop()
+    if animation_publisher is None:
+        animation_publisher = FramePublisher(server, name="Test Sphere", port=8000, methods=ANIMATION_METHODS)
+    animation_publisher.publish(starting_data)
+    scheduler = AnimationScheduler(animation_publisher, file_data, fps=frame_rate)
+    ### Nothing to play without frames, the first frame stays up
+    scheduler.start()
+    return 0
+
+
+def stop_animation(server: rigatoni.Server, context, *args):
+    if scheduler is not None:
+        scheduler.stop()
+    return 0
+
+
+def pause_animation(server: rigatoni.Server, context, *args):
+    if scheduler is not None:
+        scheduler.pause()
+    return 0
+
+
+def resume_animation(server: rigatoni.Server, context, *args):
+    if scheduler is not None:
+        scheduler.resume()
+    return 0
+
+
+def seek_animation(server: rigatoni.Server, context, frame):
+    if scheduler is not None:
+        scheduler.seek(int(frame))
+    return 0
+
+
+def loop_animation(server: rigatoni.Server, context, loop):
+    if scheduler is not None:
+        scheduler.set_loop(loop)
+    return 0
+
+
+def animation_rate(server: rigatoni.Server, context, fps):
+    if scheduler is not None:
+        scheduler.set_fps(float(fps))
     return 0
 
 
+def animation_stats(server: rigatoni.Server, context, *args):
+    """Target and achieved frame rate, current frame and dropped frames of the playback."""
+    if scheduler is None:
+        return {"state": "stopped"}
+    return scheduler.stats()
+
+
 # define arg documentation for injected method
 instance_args = [
     rigatoni.MethodArg(name="entity id", doc="What're you creating an instance of?", editor_hint="noo::entity_id"),
@@ -186,11 +190,35 @@ scale_args = [
     rigatoni.MethodArg(name="scale", doc="How to scale", editor_hint="noo::array")
 ]
 
+seek_args = [
+    rigatoni.MethodArg(name="frame", doc="Frame index to jump to", editor_hint="noo::integer")
+]
+
+loop_args = [
+    rigatoni.MethodArg(name="loop", doc="Start over after the last frame", editor_hint="noo::boolean")
+]
+
+rate_args = [
+    rigatoni.MethodArg(name="fps", doc="Target frame rate", editor_hint="noo::real")
+]
+
+load_args = [
+    rigatoni.MethodArg(name="path", doc="File to load (.ply, .obj, .vtp)", editor_hint="noo::text")
+]
+
 # Define starting state
 starting_state = [
     rigatoni.StartingComponent(rigatoni.Method, {"name": "create_animation", "arg_doc": []}, loop_scene, True),
     rigatoni.StartingComponent(rigatoni.Method, {"name": "delete", "arg_doc": []}, delete),
     rigatoni.StartingComponent(rigatoni.Method, {"name": "stop animation", "arg_doc": []}, stop_animation),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "pause animation", "arg_doc": []}, pause_animation),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "resume animation", "arg_doc": []}, resume_animation),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "seek animation", "arg_doc": [*seek_args]}, seek_animation),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "loop animation", "arg_doc": [*loop_args]}, loop_animation),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "animation rate", "arg_doc": [*rate_args]}, animation_rate),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "animation stats", "arg_doc": []}, animation_stats),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "load file", "arg_doc": [*load_args]}, load_file),
+    rigatoni.StartingComponent(rigatoni.Method, {"name": "cancel load", "arg_doc": []}, cancel_load),
     rigatoni.StartingComponent(rigatoni.Method, {"name": "noo::set_position", "arg_doc": [*move_args]}, move),
     rigatoni.StartingComponent(rigatoni.Method, {"name": "noo::set_rotation", "arg_doc": [*rot_args]}, rotate),
     rigatoni.StartingComponent(rigatoni.Method, {"name": "noo::set_scale", "arg_doc": [*scale_args]}, scale),
@@ -206,25 +234,28 @@ logging.basicConfig(
 )
 
 def main():
-    global file_data, starting_data, slide_count, break_value, nood_data
+    global file_data, starting_data, slide_count, nood_data, frame_rate
     global version_num
-    break_value = False
     slide_count = 0
-    starting_data = threading_strainer("path/to/first/file/10.ply")
+    ### Target playback rate, frames are skipped when publishing cannot keep up
+    frame_rate = 10
+    ### Strained frames are cached on disk, restarting against an unchanged dataset skips VTK parsing
+    cache = StrainCache()
+    starting_data = cache.strain("path/to/first/file/10.ply")
 
     folder_path = "path/to/folder/"
-    file_data = []
-
-    files = os.listdir(folder_path)
-
-    ### Sort files based on number, example of file name is 00.ply, 1.ply....
-    files = [file for file in files if file.endswith(".ply")]
-    files.sort(key=lambda x: int(''.join(filter(str.isdigit, x))))
-    
-    for file in files:
-        file_path = os.path.join(folder_path, file)
-        result = threading_strainer(file_path)
-        file_data.append(result)
+
+    ### A packed container (see Packed_Frames.py) is memory mapped and needs no straining at all
+    packed_path = os.path.join(folder_path, "frames.noodpack")
+    ### Otherwise frames are strained lazily in frame order (00.ply, 1.ply....), a few frames ahead of playback,
+    ### so the server is live right away and memory does not grow with the number of frames.
+    ### Use Batch_Strainer.load_frame_folder instead to strain every frame up front.
+    ### Run inside the ParaView/VTK process instead and the pipeline can be served without writing any frames,
+    ### file_data = PipelineBridge(FindSource('Contour1')) (see pipeline_bridge.py)
+    if os.path.exists(packed_path):
+        file_data = PackedFrames(packed_path)
+    else:
+        file_data = FrameProvider.from_folder(folder_path, ".ply", read_ahead=8, cache=cache)
 
     server = Server(50000, starting_state, delegates)
     server.run()
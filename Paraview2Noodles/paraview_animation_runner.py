@@ -2,6 +2,7 @@
 """
 Simple stand alone script for writing out each frame of a paraview animation. 
 Run this script in the paraview GUI, change frame number to number of time steps you need
+To skip the files entirely, serve the pipeline in process with pipeline_bridge.PipelineBridge.
 """
 from paraview.simple import *
 frames = 0
@@ -0,0 +1,95 @@
+"""
+In-process bridge from a live VTK or ParaView pipeline to NOODLES.
+
+Instead of writing every timestep to .ply with paraview_animation_runner.py and straining the files again,
+PipelineBridge attaches to an algorithm's output port (or a paraview.simple proxy), updates it to each timestep
+and strains the resulting vtkPolyData straight from memory. Nothing touches the disk.
+
+The bridge is indexable by timestep, so it can be handed to AnimationScheduler in place of a FrameProvider:
+    bridge = PipelineBridge(contour)
+    scheduler = AnimationScheduler(publisher, bridge, fps=10)
+VTK pipelines are not thread safe, give the scheduler an executor with a single thread (or keep everything else off
+the pipeline) while it plays.
+"""
+from vtk import vtkAlgorithm, vtkAlgorithmOutput, vtkStreamingDemandDrivenPipeline
+from Reader_Strainer_Threading import strain_polydata
+from Reader_Registry import to_polydata
+
+
+class PipelineBridge:
+    """
+    Timesteps of a pipeline's output, strained on demand.
+
+    Attributes:
+        times (list): Timestep values reported by the pipeline, [None] for data without time.
+
+    Example usage:
+        bridge = PipelineBridge(FindSource('Contour1'))
+        for frame in bridge:
+            publisher.publish(frame)
+    """
+    def __init__(self, source, port=0, strainer=strain_polydata):
+        """
+        :param source: vtkAlgorithm, vtkAlgorithmOutput or paraview.simple proxy
+        :param port: output port of the algorithm
+        :param strainer: function straining a vtkPolyData, strain_polydata by default
+        """
+        self.proxy = None
+        if isinstance(source, vtkAlgorithmOutput):
+            port = source.GetIndex()
+            source = source.GetProducer()
+        elif not isinstance(source, vtkAlgorithm) and hasattr(source, "GetClientSideObject"):
+            # ParaView proxy, updates go through the proxy so the server side pipeline executes
+            self.proxy = source
+            source = source.GetClientSideObject()
+        self.algorithm = source
+        self.port = port
+        self.strainer = strainer
+        self.times = self._timesteps()
+
+    def _timesteps(self):
+        if self.proxy is not None:
+            times = list(getattr(self.proxy, "TimestepValues", None) or [])
+            return times or [None]
+        self.algorithm.UpdateInformation()
+        information = self.algorithm.GetOutputInformation(self.port)
+        key = vtkStreamingDemandDrivenPipeline.TIME_STEPS()
+        if not information.Has(key):
+            return [None]
+        return [information.Get(key, i) for i in range(information.Length(key))]
+
+    def __len__(self):
+        return len(self.times)
+
+    def polydata_at(self, time=None):
+        """
+        Update the pipeline to a time and return its output as vtkPolyData.
+        The output is a shallow copy, it stays valid when the pipeline updates to another time.
+
+        :param time: timestep value, None updates without requesting a time
+        """
+        if self.proxy is not None:
+            if time is None:
+                self.proxy.UpdatePipeline()
+            else:
+                self.proxy.UpdatePipeline(time)
+        elif time is None:
+            self.algorithm.Update(self.port)
+        else:
+            self.algorithm.UpdateTimeStep(time)
+        output = self.algorithm.GetOutputDataObject(self.port)
+        copy = output.NewInstance()
+        copy.ShallowCopy(output)
+        return to_polydata(copy)
+
+    def frame_at(self, time=None):
+        """Strained frame at a time."""
+        return self.strainer(self.polydata_at(time))
+
+    def __getitem__(self, index):
+        """Strained frame of the index-th timestep."""
+        return self.frame_at(self.times[index])
+
+    def __iter__(self):
+        for time in self.times:
+            yield self.frame_at(time)
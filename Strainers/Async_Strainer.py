@@ -0,0 +1,116 @@
+"""
+Asyncio versions of the strainers for use inside a Rigatoni server.
+
+The Rigatoni server runs on an asyncio event loop and calls method handlers on it, so a strainer called directly from
+a handler stalls the loop, and every connected client, for as long as VTK takes to read the file. The coroutines here
+run the strainers in an executor (the loop's default thread pool unless another executor is given, a
+ProcessPoolExecutor also works for the file based strainers) and only await the result.
+
+Method handlers are plain functions, StrainJobs starts a straining coroutine as a task from one and calls back on the
+loop once the result is in. Jobs are named, starting a job under a name that is still running cancels the old one.
+
+Cancelling a job stops waiting for it right away. Work that has not started in the executor yet is dropped, a read
+that is already running finishes in its worker and its result is discarded, VTK readers cannot be interrupted.
+
+Example usage (inside a method handler):
+    jobs.start("load", async_threading_strainer(path), lambda data: publisher.publish(data))
+"""
+import asyncio
+import functools
+import logging
+from Reader_Strainer import noodStrainer
+from Reader_Strainer_Threading import threading_strainer
+from vtkMapperStrainer import mapperStrainer
+
+logger = logging.getLogger(__name__)
+
+
+async def run_strainer(strainer, *args, executor=None, **kwargs):
+    """
+    Run any strainer in an executor and await its result.
+
+    :param strainer: strainer function, must be picklable when executor is a process pool
+    :param executor: concurrent.futures executor, None uses the loop's default thread pool
+    :return: whatever the strainer returns
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, functools.partial(strainer, *args, **kwargs))
+    try:
+        return await future
+    except asyncio.CancelledError:
+        # Drops the call if the executor has not started it yet
+        future.cancel()
+        raise
+
+
+async def async_nood_strainer(filename, executor=None, **kwargs):
+    """noodStrainer in an executor, keyword arguments are passed on (color_array, color_range, cmap)."""
+    return await run_strainer(noodStrainer, filename, executor=executor, **kwargs)
+
+
+async def async_threading_strainer(filename, executor=None, **kwargs):
+    """threading_strainer in an executor, keyword arguments are passed on (pool, chunk_size)."""
+    return await run_strainer(threading_strainer, filename, executor=executor, **kwargs)
+
+
+async def async_mapper_strainer(mapper, executor=None):
+    """
+    mapperStrainer in an executor. Needs a thread executor, the mapper cannot be sent to another process,
+    and the mapper's pipeline should not be modified until the result is in.
+    """
+    return await run_strainer(mapperStrainer, mapper, executor=executor)
+
+
+class StrainJobs:
+    """
+    Named straining tasks started from synchronous code running on the event loop, e.g. Rigatoni method handlers.
+    """
+    def __init__(self):
+        self.tasks = {}
+
+    def start(self, name, coroutine, on_done, on_error=None):
+        """
+        Start a straining coroutine as a task, cancelling a running job with the same name.
+
+        :param name: job name
+        :param coroutine: e.g. async_threading_strainer(filename)
+        :param on_done: called on the loop with the result
+        :param on_error: called on the loop with the exception if the strainer fails, defaults to logging it
+        :return: the asyncio.Task
+        """
+        self.cancel(name)
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks[name] = task
+
+        def finished(task):
+            if self.tasks.get(name) is task:
+                del self.tasks[name]
+            if task.cancelled():
+                return
+            error = task.exception()
+            if error is None:
+                on_done(task.result())
+            elif on_error is not None:
+                on_error(error)
+            else:
+                logger.error("straining job %s failed: %r", name, error)
+        task.add_done_callback(finished)
+        return task
+
+    def running(self, name):
+        """True while the named job has not finished."""
+        task = self.tasks.get(name)
+        return task is not None and not task.done()
+
+    def cancel(self, name):
+        """Cancel the named job, returns True if there was one running."""
+        task = self.tasks.pop(name, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def cancel_all(self):
+        """Cancel every running job."""
+        for name in list(self.tasks):
+            self.cancel(name)
@@ -0,0 +1,191 @@
+"""
+Compact attribute encoding for strained meshes.
+
+An optional stage after straining that shrinks the arrays shipped to clients:
+- positions as float32, or quantized to int16 inside the bounding box with a dequantization scale and offset
+- normals as float32, or octahedral encoded into 2 x int8 / int16
+- colors as normalized uint8 RGBA
+- indices as uint16 whenever the vertex count allows, uint32 otherwise
+
+NOODLES attributes only describe float VEC3 positions and normals, so FramePublisher uses the float32 / uint8 / uint16
+encodings. The quantized forms are for storage (caches, packed frames) and clients that know how to decode them,
+decode_frame turns an EncodedFrame back into float32 arrays.
+"""
+import numpy as np
+from Reader_Strainer_Threading import Properties
+
+POSITION_ENCODINGS = ("float32", "int16")
+NORMAL_ENCODINGS = ("float32", "oct8", "oct16")
+
+
+class EncodedFrame:
+    """
+    Encoded arrays of one strained mesh.
+
+    Attributes:
+        positions (np.ndarray): (N,3) float32 or int16 positions.
+        normals (np.ndarray): (N,3) float32 or (N,2) int8 / int16 octahedral normals, None if there are none.
+        colors (np.ndarray): (N,4) uint8 RGBA, None if there are none.
+        indices (np.ndarray): (M,3) uint16 or uint32 triangles.
+        position_scale (np.ndarray): per axis scale to dequantize positions, position = q * scale + offset.
+        position_offset (np.ndarray): per axis offset to dequantize positions.
+        position_encoding (str), normal_encoding (str): Encodings used.
+    """
+    def __init__(self):
+        self.positions = None
+        self.normals = None
+        self.colors = None
+        self.indices = None
+        self.position_scale = np.ones(3, dtype=np.float64)
+        self.position_offset = np.zeros(3, dtype=np.float64)
+        self.position_encoding = "float32"
+        self.normal_encoding = "float32"
+
+    def nbytes(self):
+        """Total size of the encoded arrays."""
+        arrays = [self.positions, self.normals, self.colors, self.indices]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def dequantization_matrix(self):
+        """
+        4x4 column major transform mapping quantized positions back to the original space,
+        can be used as an entity transform.
+        """
+        matrix = np.diag(np.append(self.position_scale, 1.0))
+        matrix[3, :3] = self.position_offset
+        return matrix.flatten().tolist()
+
+
+def quantize_positions(points, bits=16):
+    """
+    Quantize positions into signed integers spanning the bounding box.
+
+    :param points: (N,3) array
+    :param bits: 16 for int16
+    :return: (quantized int16 array, scale, offset) with points ~= quantized * scale + offset
+    """
+    points = np.asarray(points, dtype=np.float64)
+    steps = (1 << bits) - 1
+    half = 1 << (bits - 1)
+    if len(points) == 0:
+        return np.empty((0, 3), dtype=np.int16), np.ones(3), np.zeros(3)
+    low = points.min(axis=0)
+    extent = points.max(axis=0) - low
+    scale = np.where(extent > 0, extent / steps, 1.0)
+    quantized = np.rint((points - low) / scale) - half
+    offset = low + half * scale
+    return quantized.astype(np.int16), scale, offset
+
+
+def dequantize_positions(quantized, scale, offset):
+    """Inverse of quantize_positions, as float32."""
+    return (quantized.astype(np.float64) * scale + offset).astype(np.float32)
+
+
+def oct_encode(normals, bits=8):
+    """
+    Octahedral encode unit normals into two signed normalized integers.
+
+    :param normals: (N,3) array
+    :param bits: 8 for int8, 16 for int16
+    :return: (N,2) int8 or int16 array
+    """
+    normals = np.asarray(normals, dtype=np.float64)
+    length = np.abs(normals).sum(axis=1, keepdims=True)
+    length[length == 0] = 1
+    xy = normals[:, :2] / length
+    z = normals[:, 2] / length[:, 0]
+    sign = np.where(xy >= 0, 1.0, -1.0)
+    folded = (1 - np.abs(xy[:, ::-1])) * sign
+    xy = np.where((z < 0)[:, None], folded, xy)
+    limit = (1 << (bits - 1)) - 1
+    dtype = np.int8 if bits == 8 else np.int16
+    return np.rint(np.clip(xy, -1, 1) * limit).astype(dtype)
+
+
+def oct_decode(encoded):
+    """Inverse of oct_encode, (N,3) float32 unit normals."""
+    limit = np.iinfo(encoded.dtype).max
+    xy = np.clip(encoded.astype(np.float64) / limit, -1, 1)
+    z = 1 - np.abs(xy).sum(axis=1)
+    t = np.clip(-z, 0, None)
+    xy = xy - np.where(xy >= 0, t[:, None], -t[:, None])
+    normals = np.column_stack([xy, z])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals.astype(np.float32)
+
+
+def encode_colors(colors):
+    """
+    Colors as (N,4) normalized uint8 RGBA. Float colors are taken as 0-1, integer colors as 0-255, alpha defaults to 255.
+
+    :return: uint8 array, None for anything that is not RGB or RGBA
+    """
+    colors = np.asarray(colors)
+    if colors.ndim != 2 or colors.shape[1] not in (3, 4):
+        return None
+    if colors.dtype == np.uint8 and colors.shape[1] == 4:
+        return np.ascontiguousarray(colors)
+    if np.issubdtype(colors.dtype, np.floating):
+        colors = np.clip(colors * 255.0 + 0.5, 0, 255)
+    rgba = np.full((len(colors), 4), 255, dtype=np.uint8)
+    rgba[:, :colors.shape[1]] = colors
+    return rgba
+
+
+def encode_indices(polygons, vertex_count):
+    """Triangles as uint16 when every index fits, uint32 otherwise."""
+    dtype = np.uint16 if vertex_count <= np.iinfo(np.uint16).max + 1 else np.uint32
+    return np.asarray(polygons).astype(dtype, copy=False).reshape(-1, 3)
+
+
+def encode_frame(data, positions="float32", normals="float32"):
+    """
+    Encode strained data.
+
+    :param data: Properties (or anything with points, polygons, normals and colors)
+    :param positions: "float32" or "int16"
+    :param normals: "float32", "oct8" or "oct16"
+    :return: EncodedFrame
+    """
+    if positions not in POSITION_ENCODINGS:
+        raise ValueError("positions must be one of %s" % (POSITION_ENCODINGS,))
+    if normals not in NORMAL_ENCODINGS:
+        raise ValueError("normals must be one of %s" % (NORMAL_ENCODINGS,))
+    encoded = EncodedFrame()
+    points = np.asarray(data.points)
+    if positions == "int16":
+        encoded.positions, encoded.position_scale, encoded.position_offset = quantize_positions(points)
+    else:
+        encoded.positions = np.ascontiguousarray(points, dtype=np.float32)
+    encoded.position_encoding = positions
+
+    normal_array = np.asarray(data.normals)
+    if normal_array.size:
+        if normals == "float32":
+            encoded.normals = np.ascontiguousarray(normal_array, dtype=np.float32)
+        else:
+            encoded.normals = oct_encode(normal_array, 8 if normals == "oct8" else 16)
+        encoded.normal_encoding = normals
+
+    if len(data.colors):
+        encoded.colors = encode_colors(data.colors)
+    encoded.indices = encode_indices(data.polygons, len(points))
+    return encoded
+
+
+def decode_frame(encoded):
+    """
+    Decode an EncodedFrame back into float32 Properties (colors stay uint8).
+    """
+    data = Properties()
+    if encoded.position_encoding == "int16":
+        data.points = dequantize_positions(encoded.positions, encoded.position_scale, encoded.position_offset)
+    else:
+        data.points = encoded.positions
+    if encoded.normals is not None:
+        data.normals = oct_decode(encoded.normals) if encoded.normal_encoding != "float32" else encoded.normals
+    if encoded.colors is not None:
+        data.colors = encoded.colors
+    data.polygons = encoded.indices
+    return data
@@ -0,0 +1,166 @@
+"""
+Batch loader that strains a sequence of frame files across a process pool.
+
+Each worker runs a strainer (threading_strainer by default) on one file and copies the resulting arrays into
+shared memory blocks, only the block names, shapes and dtypes are pickled back to the parent.
+The parent maps the blocks as NumPy arrays, so the big buffers are never serialized.
+Results come back in frame order no matter which worker finishes first.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+from Reader_Strainer_Threading import threading_strainer
+
+logger = logging.getLogger(__name__)
+
+FRAME_FIELDS = ["points", "polygons", "normals", "colors", "scalars"]
+
+
+class SharedFrame:
+    """
+    Strained frame whose arrays live in shared memory.
+
+    Has the same attributes as the strainers' Properties class so it can be handed to anything that takes strained data.
+    The frame owns its blocks, call close() when done with it, or unlink() to also free the memory.
+
+    Attributes:
+        filename (str): The file the frame was strained from.
+        points, polygons, normals, colors, scalars (np.ndarray): Strained arrays, empty if the strainer produced none.
+    """
+    def __init__(self, filename, descriptors):
+        self.filename = filename
+        self._blocks = []
+        for field in FRAME_FIELDS:
+            setattr(self, field, np.array([]))
+        for field, (name, shape, dtype) in descriptors.items():
+            block = shared_memory.SharedMemory(name=name)
+            self._blocks.append(block)
+            setattr(self, field, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+
+    def close(self):
+        """Drop the arrays and detach from the shared memory blocks."""
+        for field in FRAME_FIELDS:
+            setattr(self, field, np.array([]))
+        for block in self._blocks:
+            block.close()
+
+    def unlink(self):
+        """Detach and free the shared memory blocks."""
+        self.close()
+        for block in self._blocks:
+            block.unlink()
+        self._blocks = []
+
+
+def _create_block(nbytes):
+    """
+    Create a shared memory block that outlives the worker that made it.
+    The parent SharedFrame takes ownership, so the worker's resource tracker must not clean it up.
+    """
+    try:
+        return shared_memory.SharedMemory(create=True, size=max(nbytes, 1), track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        block = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+def strain_to_shared(filename, strainer=threading_strainer, cache=None):
+    """
+    Strain one file and copy its arrays into shared memory. Runs inside the pool workers.
+
+    :param filename: file to strain
+    :param strainer: picklable strainer function returning a Properties like object
+    :param cache: optional StrainCache, hits skip the strainer entirely
+    :return: dict of field -> (block name, shape, dtype string)
+    """
+    if cache is not None:
+        data = cache.strain(filename, strainer)
+    else:
+        data = strainer(filename)
+    descriptors = {}
+    for field in FRAME_FIELDS:
+        array = getattr(data, field, None)
+        if array is None:
+            continue
+        array = np.asarray(array)
+        if array.size == 0:
+            continue
+        block = _create_block(array.nbytes)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+        descriptors[field] = (block.name, array.shape, array.dtype.str)
+        del shared
+        block.close()
+    return descriptors
+
+
+def log_progress(done, total, filename):
+    """Default progress report."""
+    logger.info("strained frame %d of %d %s", done, total, os.path.basename(filename))
+
+
+def frame_files(folder_path, extension=".ply"):
+    """
+    Numbered frame files in a folder, sorted by frame number. Example of file name is 00.ply, 1.ply....
+
+    :param folder_path: folder holding the frames
+    :param extension: file extension of the frames
+    :return: list of file paths in frame order
+    """
+    files = [file for file in os.listdir(folder_path) if file.endswith(extension)]
+    files.sort(key=lambda x: int(''.join(filter(str.isdigit, x))))
+    return [os.path.join(folder_path, file) for file in files]
+
+
+def batch_strain(filenames, max_workers=None, strainer=threading_strainer, progress=log_progress, cache=None):
+    """
+    Strain many files across a process pool.
+
+    :param filenames: files to strain, results keep this order
+    :param max_workers: size of the process pool, defaults to the number of cpus
+    :param strainer: picklable strainer function, threading_strainer by default
+    :param progress: callable(done, total, filename) called as frames finish, None for silence
+    :param cache: optional StrainCache shared by the workers
+    :return: list of SharedFrame in the order of filenames
+    """
+    filenames = list(filenames)
+    descriptors = [None] * len(filenames)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(strain_to_shared, filename, strainer, cache): i for i, filename in enumerate(filenames)}
+        done = 0
+        try:
+            for future in as_completed(futures):
+                i = futures[future]
+                descriptors[i] = future.result()
+                done += 1
+                if progress is not None:
+                    progress(done, len(filenames), filenames[i])
+        except BaseException:
+            # The shared memory of frames already strained (or still being strained) is not tracked by anyone, free it
+            for future in futures:
+                future.cancel()
+            for future, i in futures.items():
+                if descriptors[i] is None and not future.cancelled():
+                    try:
+                        descriptors[i] = future.result()
+                    except BaseException:
+                        pass
+            for filename, descriptor in zip(filenames, descriptors):
+                if descriptor is not None:
+                    SharedFrame(filename, descriptor).unlink()
+            raise
+    return [SharedFrame(filename, descriptor) for filename, descriptor in zip(filenames, descriptors)]
+
+
+def load_frame_folder(folder_path, extension=".ply", max_workers=None, strainer=threading_strainer, progress=log_progress, cache=None):
+    """
+    Strain every numbered frame in a folder across a process pool.
+
+    :param folder_path: folder holding the frames, e.g. the output of paraview_animation_runner.py
+    :return: list of SharedFrame in frame order
+    """
+    return batch_strain(frame_files(folder_path, extension), max_workers, strainer, progress, cache)
@@ -0,0 +1,102 @@
+"""
+Vectorized color mapping for the NOODLES strainers.
+
+Scalars are normalized into 0-1 and looked up in a precomputed RGBA table sampled from a matplotlib colormap,
+in one pass over the array instead of calling the colormap once per vertex.
+Tables are cached per (colormap, size), so coloring every frame of an animation only pays for the lookup.
+"""
+from functools import lru_cache
+import numpy as np
+import matplotlib.pyplot as plt
+from Extraction import as_array, find_color_array
+
+
+@lru_cache(maxsize=32)
+def build_lut(cmap="cool", size=256):
+    """
+    RGBA lookup table sampled at the centre of size equal bins, so with size == cmap.N entries match the colormap exactly.
+
+    :param cmap: matplotlib colormap name
+    :param size: number of entries, e.g. 256 or 1024
+    :return: read only (size,4) uint8 table
+    """
+    colormap = plt.get_cmap(cmap)
+    lut = colormap((np.arange(size) + 0.5) / size, bytes=True)
+    lut.flags.writeable = False
+    return lut
+
+
+def normalize_scalars(values, value_range=None, component=None):
+    """
+    Normalize scalars into 0-1.
+
+    :param values: (N,) or (N,k) array
+    :param value_range: (min, max) to map onto 0-1, defaults to the data range. Values outside are clamped
+    :param component: component of a multi component array to use, defaults to the vector magnitude
+    :return: (N,) float array in 0-1, NaN maps to 0
+    """
+    values = np.asarray(values)
+    if values.ndim == 2:
+        if values.shape[1] == 1:
+            values = values[:, 0]
+        elif component is None:
+            values = np.linalg.norm(values, axis=1)
+        else:
+            values = values[:, component]
+    values = values.astype(np.float64, copy=False)
+    if value_range is None:
+        if values.size == 0:
+            return values
+        low, high = np.nanmin(values), np.nanmax(values)
+    else:
+        low, high = value_range
+    span = high - low
+    if not span > 0:
+        return np.zeros(len(values))
+    normalized = (values - low) / span
+    np.clip(normalized, 0, 1, out=normalized)
+    return np.nan_to_num(normalized, copy=False)
+
+
+def map_scalars(values, cmap="cool", value_range=None, component=None, lut_size=256, dtype=np.uint8):
+    """
+    Color scalars through a colormap lookup table.
+
+    :param values: (N,) or (N,k) scalars
+    :param cmap: matplotlib colormap name
+    :param value_range: (min, max) mapped onto the colormap, defaults to the data range
+    :param component: component of a multi component array, defaults to the magnitude
+    :param lut_size: number of table entries
+    :param dtype: np.uint8 for 0-255 colors, a float dtype for 0-1 colors
+    :return: (N,4) RGBA array
+    """
+    lut = build_lut(cmap, lut_size)
+    normalized = normalize_scalars(values, value_range, component)
+    index = np.minimum((normalized * lut_size).astype(np.intp), lut_size - 1)
+    colors = lut[index]
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.floating):
+        return colors.astype(dtype) * dtype.type(1 / 255.0)
+    return colors
+
+
+def color_by_array(polydata, name=None, cmap="cool", value_range=None, component=None, lut_size=256, dtype=np.uint8):
+    """
+    Color a dataset by one of its point data arrays.
+
+    :param polydata: vtkPolyData or any vtkDataSet
+    :param name: point data array to color by, defaults to the strainers' usual color/scalar names and then the active scalars
+    :return: (N,4) RGBA array, None if there is nothing to color by
+    """
+    point_data = polydata.GetPointData()
+    if name is None:
+        name = find_color_array(polydata)
+    array = point_data.GetArray(name) if name is not None else point_data.GetScalars()
+    if array is None:
+        return None
+    return map_scalars(as_array(array, dtype=None), cmap, value_range, component, lut_size, dtype)
+
+
+def random_colors(count, cmap="inferno", lut_size=256, dtype=np.float32):
+    """Colors from random scalars, what the strainers fall back to when they are given nothing to color by."""
+    return map_scalars(np.random.rand(count), cmap, (0, 1), None, lut_size, dtype)
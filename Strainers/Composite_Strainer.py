@@ -0,0 +1,109 @@
+"""
+Straining of composite datasets, block by block.
+
+AMR and multi region outputs come as vtkMultiBlockDataSet or vtkPartitionedDataSetCollection (.vtm/.vtpc/.vtpd).
+Instead of merging everything into one polydata first, strain_composite walks the leaf blocks, extracts each one's
+surface and strains the blocks concurrently on a thread pool (the heavy VTK filters and NumPy copies release the GIL).
+Every block keeps its name, flat index and path in the tree, so it can become its own patch or entity
+(see frame_publisher.publish_blocks).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from vtk import vtkCompositeDataSet, vtkMultiBlockDataSet, vtkPartitionedDataSet, vtkPartitionedDataSetCollection
+from Reader_Strainer_Threading import strain_polydata
+from Reader_Registry import read_dataset, to_polydata
+
+
+class StrainedBlock:
+    """
+    One strained leaf block of a composite dataset.
+
+    Attributes:
+        data (Properties): Strained data of the block.
+        name (str): Block name from the dataset's metadata, "block <flat index>" if it has none.
+        flat_index (int): Flat index of the block in the composite dataset.
+        path (tuple): Child indices from the root down to the block.
+        metadata (dict): String metadata of the block.
+    """
+    def __init__(self, data, name, flat_index, path, metadata):
+        self.data = data
+        self.name = name
+        self.flat_index = flat_index
+        self.path = path
+        self.metadata = metadata
+
+
+def _children(node):
+    """(child, metadata information or None) of a composite node, None if node is a leaf."""
+    if isinstance(node, vtkPartitionedDataSetCollection):
+        count, child = node.GetNumberOfPartitionedDataSets(), node.GetPartitionedDataSet
+    elif isinstance(node, vtkPartitionedDataSet):
+        count, child = node.GetNumberOfPartitions(), node.GetPartition
+    elif isinstance(node, vtkMultiBlockDataSet):
+        count, child = node.GetNumberOfBlocks(), node.GetBlock
+    else:
+        return None
+    return [(child(i), node.GetMetaData(i) if node.HasMetaData(i) else None) for i in range(count)]
+
+
+def iter_leaves(composite):
+    """
+    Leaf datasets of a composite dataset, depth first. Flat indices count every node in pre-order, as VTK does.
+    Unnamed blocks are named after their parent and their index in it.
+
+    :return: generator of (dataset, flat index, path, metadata)
+    """
+    counter = [0]
+
+    def walk(node, path, metadata):
+        flat_index = counter[0]
+        counter[0] += 1
+        if node is None:
+            return
+        children = _children(node)
+        if children is None:
+            yield node, flat_index, path, metadata
+            return
+        for number, (child, information) in enumerate(children):
+            child_metadata = {}
+            if information is not None and information.Has(vtkCompositeDataSet.NAME()):
+                child_metadata["name"] = information.Get(vtkCompositeDataSet.NAME())
+            elif metadata.get("name"):
+                child_metadata["name"] = "%s %d" % (metadata["name"], number) if len(children) > 1 else metadata["name"]
+            yield from walk(child, path + (number,), child_metadata)
+
+    yield from walk(composite, (), {})
+
+
+def strain_composite(data_object, workers=None, strainer=strain_polydata):
+    """
+    Strain every leaf block of a composite dataset concurrently.
+
+    :param data_object: vtkMultiBlockDataSet, vtkPartitionedDataSetCollection or any composite, a plain dataset is one block
+    :param workers: threads straining blocks, None lets the executor choose
+    :param strainer: function straining one vtkPolyData
+    :return: list of StrainedBlock in tree order, blocks without any cells are left out
+    """
+    if isinstance(data_object, vtkCompositeDataSet):
+        leaves = list(iter_leaves(data_object))
+    else:
+        leaves = [(data_object, 0, (), {})]
+
+    def strain_leaf(leaf):
+        dataset, flat_index, path, metadata = leaf
+        polydata = to_polydata(dataset)
+        if polydata.GetNumberOfCells() == 0:
+            return None
+        name = metadata.get("name") or "block %d" % flat_index
+        return StrainedBlock(strainer(polydata), name, flat_index, path, metadata)
+
+    if len(leaves) <= 1:
+        blocks = [strain_leaf(leaf) for leaf in leaves]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="block") as pool:
+            blocks = list(pool.map(strain_leaf, leaves))
+    return [block for block in blocks if block is not None]
+
+
+def strain_composite_file(filename, workers=None, strainer=strain_polydata):
+    """Read a .vtm, .vtpc or .vtpd file (or any registered format) and strain its blocks, see strain_composite."""
+    return strain_composite(read_dataset(filename), workers, strainer)
@@ -0,0 +1,138 @@
+"""
+Shared array extraction layer for the NOODLES strainers.
+
+Returns NumPy views over the buffers that back vtkDataArrays instead of walking GetTuple(i) into Python tuples.
+A copy is only made when the data has to change dtype or layout (e.g. float64 points to float32),
+and scaling is one array operation, done in place whenever the array is already our own copy.
+"""
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+COLOR_ARRAY_NAMES = ["RGB", "RGBA", "SCALARS", "Scalars", "Scalars_"]
+
+
+def as_array(vtk_array, dtype=np.float32):
+    """
+    Wrap a vtkDataArray as a NumPy array of the given dtype.
+
+    :param vtk_array: vtkDataArray (or None)
+    :param dtype: wanted dtype, None keeps the array's native dtype
+    :return: contiguous array, a zero copy view when the dtype already matches. None if vtk_array is None
+    """
+    if vtk_array is None:
+        return None
+    array = vtk_to_numpy(vtk_array)
+    if dtype is None:
+        return np.ascontiguousarray(array)
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+def is_view(array):
+    """
+    True if the array does not own its memory, i.e. it is a view on a VTK buffer that must not be written to.
+    """
+    return array is not None and not array.flags.owndata
+
+
+def scale_points(points, scalefactor):
+    """
+    Scale points with a single array operation.
+    Views on VTK memory are never written to, in that case the (one) copy is made by the multiply itself.
+
+    :param points: (N,3) array
+    :param scalefactor: scale to apply
+    :return: scaled (N,3) array
+    """
+    if scalefactor == 1:
+        return points
+    if is_view(points) or not points.flags.writeable:
+        return np.multiply(points, scalefactor, dtype=points.dtype)
+    points *= scalefactor
+    return points
+
+
+def extract_points(polydata, scalefactor=1, dtype=np.float32):
+    """
+    Points of a vtkPointSet as an (N,3) array.
+
+    :param polydata: vtkPolyData or any vtkPointSet
+    :param scalefactor: optional uniform scale
+    :param dtype: output dtype, float32 by default
+    :return: (N,3) array, empty if the dataset has no points
+    """
+    vtk_points = polydata.GetPoints()
+    if vtk_points is None:
+        return np.empty((0, 3), dtype=dtype)
+    return scale_points(as_array(vtk_points.GetData(), dtype), scalefactor)
+
+
+def extract_normals(polydata, dtype=np.float32):
+    """
+    Point normals as an (N,3) array, None if the dataset has none.
+    """
+    point_data = polydata.GetPointData()
+    normals = point_data.GetNormals()
+    if normals is None:
+        normals = point_data.GetArray("Normals")
+    return as_array(normals, dtype)
+
+
+def extract_tcoords(polydata, dtype=np.float32):
+    """
+    Texture coordinates as an (N,2) array, None if the dataset has none.
+    """
+    point_data = polydata.GetPointData()
+    tcoords = point_data.GetTCoords()
+    if tcoords is None:
+        tcoords = point_data.GetArray("TCoords")
+    return as_array(tcoords, dtype)
+
+
+def extract_point_array(polydata, name, dtype=None):
+    """
+    Named point data array, None if it does not exist.
+
+    :param name: array name
+    :param dtype: output dtype, None keeps the native dtype (e.g. uint8 colors stay uint8)
+    """
+    return as_array(polydata.GetPointData().GetArray(name), dtype)
+
+
+def find_color_array(polydata, names=COLOR_ARRAY_NAMES):
+    """
+    Find the color/scalar array the strainers color by, the last matching name wins as it always has.
+
+    :return: array name or None
+    """
+    point_data = polydata.GetPointData()
+    found = None
+    for name in names:
+        if point_data.HasArray(name):
+            found = name
+    return found
+
+
+def extract_colors(polydata, names=COLOR_ARRAY_NAMES):
+    """
+    Raw color array in its native dtype, None if there are no colors.
+    """
+    name = find_color_array(polydata, names)
+    if name is None:
+        return None
+    return extract_point_array(polydata, name)
+
+
+def colors_to_0_1(colors):
+    """
+    Convert 0-255 RGB or RGBA colors into a float32 (N,4) RGBA array in 0-1. Alpha defaults to 1.
+
+    :param colors: (N,3) or (N,4) array
+    :return: (N,4) float32 array
+    :raises ValueError: if the colors are not 3 or 4 component
+    """
+    colors = np.asarray(colors)
+    if colors.ndim != 2 or colors.shape[1] not in (3, 4):
+        raise ValueError("colors must be RGB or RGBA")
+    rgba = np.ones((len(colors), 4), dtype=np.float32)
+    np.multiply(colors, np.float32(1 / 255.0), out=rgba[:, :colors.shape[1]], casting="unsafe")
+    return rgba
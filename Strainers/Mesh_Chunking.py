@@ -0,0 +1,119 @@
+"""
+Split large strained meshes into spatially coherent chunks.
+
+Triangles are ordered along a Morton (Z order) curve through their centroids and cut into consecutive runs that each
+reference at most max_vertices vertices. Every chunk gets its own compact vertex arrays with remapped indices, so a
+chunk of up to 65536 vertices can use 16 bit indices, and each chunk can become its own geometry patch that clients
+download and display independently.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from Reader_Strainer_Threading import Properties
+
+U16_VERTEX_LIMIT = np.iinfo(np.uint16).max + 1
+VERTEX_FIELDS = ["points", "normals", "colors", "scalars"]
+
+
+def _spread_bits(values):
+    """Spread the low 21 bits of each value so there are two zero bits between them."""
+    values = values.astype(np.uint64) & np.uint64(0x1FFFFF)
+    values = (values | (values << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    values = (values | (values << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    values = (values | (values << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    values = (values | (values << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    values = (values | (values << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return values
+
+
+def morton_codes(positions):
+    """
+    63 bit Morton codes of positions, quantized to 21 bits per axis inside their bounding box.
+
+    :param positions: (N,3) array
+    :return: (N,) uint64 array
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if len(positions) == 0:
+        return np.empty(0, dtype=np.uint64)
+    low = positions.min(axis=0)
+    extent = positions.max(axis=0) - low
+    extent[extent == 0] = 1
+    grid = ((positions - low) / extent * 0x1FFFFF).astype(np.uint64)
+    return (_spread_bits(grid[:, 0]) << np.uint64(2)) | (_spread_bits(grid[:, 1]) << np.uint64(1)) | _spread_bits(grid[:, 2])
+
+
+def morton_order(points, triangles):
+    """Triangle order along the Morton curve through the triangle centroids."""
+    centroids = np.asarray(points, dtype=np.float64)[triangles].mean(axis=1)
+    return np.argsort(morton_codes(centroids), kind="stable")
+
+
+def chunk_ranges(triangles, max_vertices, window_factor=4):
+    """
+    Cut an ordered triangle list into consecutive runs that each use at most max_vertices vertices.
+
+    For each chunk a window of window_factor * max_vertices triangles is examined once, the first occurrence of every
+    vertex in it tells how many vertices any prefix uses, so the longest prefix within budget is found in one pass.
+
+    :param triangles: (M,3) triangles, already in the wanted order
+    :param max_vertices: vertex budget of a chunk, at least 3
+    :return: list of (start, stop) triangle ranges
+    """
+    if max_vertices < 3:
+        raise ValueError("max_vertices must be at least 3")
+    ranges = []
+    start = 0
+    total = len(triangles)
+    while start < total:
+        window = triangles[start:start + window_factor * max_vertices].ravel()
+        _, first = np.unique(window, return_index=True)
+        if len(first) <= max_vertices:
+            length = len(window) // 3
+        else:
+            # The (max_vertices + 1)th new vertex is where the budget runs out, stop at the triangle holding it
+            length = int(np.partition(first, max_vertices)[max_vertices]) // 3
+        ranges.append((start, start + length))
+        start += length
+    return ranges
+
+
+def extract_chunk(data, triangles):
+    """
+    Compact sub mesh made of the given triangles, with its own vertex arrays and remapped indices.
+
+    :param data: Properties of the whole mesh
+    :param triangles: (M,3) triangles of the chunk, indexing the whole mesh
+    :return: Properties of the chunk, vertex_ids holds the original index of every chunk vertex
+    """
+    vertex_ids, local = np.unique(triangles, return_inverse=True)
+    chunk = Properties()
+    index_dtype = np.uint16 if len(vertex_ids) <= U16_VERTEX_LIMIT else np.uint32
+    chunk.polygons = local.reshape(-1, 3).astype(index_dtype)
+    vertex_count = len(data.points)
+    for field in VERTEX_FIELDS:
+        array = getattr(data, field, None)
+        if array is None or len(array) != vertex_count:
+            continue
+        setattr(chunk, field, np.asarray(array)[vertex_ids])
+    chunk.vertex_ids = vertex_ids
+    return chunk
+
+
+def chunk_mesh(data, max_vertices=U16_VERTEX_LIMIT, workers=None):
+    """
+    Partition a strained mesh into spatially coherent chunks below a vertex limit.
+
+    :param data: Properties with points and polygons (per vertex normals, colors and scalars follow along)
+    :param max_vertices: vertex budget per chunk, 65536 keeps every chunk on 16 bit indices
+    :param workers: threads used to build the chunks' arrays, None builds them serially
+    :return: list of Properties, one per chunk. A mesh within the budget comes back as a single chunk
+    """
+    triangles = np.asarray(data.polygons).reshape(-1, 3)
+    if len(data.points) <= max_vertices:
+        return [extract_chunk(data, triangles)]
+    ordered = triangles[morton_order(data.points, triangles)]
+    ranges = chunk_ranges(ordered, max_vertices)
+    if workers:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda r: extract_chunk(data, ordered[r[0]:r[1]]), ranges))
+    return [extract_chunk(data, ordered[start:stop]) for start, stop in ranges]
@@ -0,0 +1,88 @@
+"""
+Fused mesh preparation on NumPy arrays.
+
+Replaces the vtkPolyDataNormals -> vtkTriangleFilter -> vtkStaticCleanPolyData chain, three passes that each deep
+copy the whole mesh, with one pass over the strained arrays:
+- vertices are welded by hashing their (optionally quantized) positions into packed keys for np.unique
+- triangles that collapse after welding are dropped
+- vertices no triangle uses are dropped, welding and compaction share a single index remap
+- normals are only computed when the input has none
+Point arrays are gathered once at the end, so peak memory stays near the size of the input plus the output.
+"""
+import numpy as np
+from Reader_Strainer_Threading import Properties
+from Mesh_Chunking import VERTEX_FIELDS
+from Normals import vertex_normals
+
+# Quantized grids up to this many steps per axis fit three coordinates into one int64 key
+PACKED_AXIS_BITS = 21
+
+
+def weld_keys(points, tolerance=0.0):
+    """
+    One hashable key per vertex, equal for vertices that should be welded.
+
+    :param points: (N,3) positions
+    :param tolerance: 0 welds bitwise identical float32 positions, otherwise positions are snapped to a grid of this spacing
+    :return: (N,) int64 keys, or void keys holding the three coordinates when they do not fit 64 bits
+    """
+    points = np.asarray(points)
+    if tolerance > 0:
+        grid = np.rint((points - points.min(axis=0)) / tolerance).astype(np.int64)
+        if grid.size == 0 or grid.max() < (1 << PACKED_AXIS_BITS):
+            return (grid[:, 0] << (2 * PACKED_AXIS_BITS)) | (grid[:, 1] << PACKED_AXIS_BITS) | grid[:, 2]
+        keys = grid
+    else:
+        # Adding zero turns -0.0 into 0.0 so both weld
+        keys = np.ascontiguousarray(points, dtype=np.float32) + np.float32(0)
+    return keys.view(np.dtype((np.void, 3 * keys.dtype.itemsize))).ravel()
+
+
+def weld_vertices(points, tolerance=0.0):
+    """
+    Group coincident vertices, groups are numbered in order of their first vertex.
+
+    :return: (first, inverse), first[g] is the first vertex of group g and inverse[v] the group of vertex v
+    """
+    _, first, inverse = np.unique(weld_keys(points, tolerance), return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+
+def prepare_mesh(data, tolerance=0.0, generate_normals=True):
+    """
+    Weld duplicate vertices, drop degenerate triangles and unused vertices, and make normals if there are none.
+
+    :param data: Properties with points and (M,3) polygons, per vertex normals, colors and scalars are carried along
+    :param tolerance: weld distance, 0 only welds identical positions
+    :param generate_normals: compute smooth normals when data has none
+    :return: new Properties, vertex_ids holds the input vertex each output vertex was taken from
+    """
+    points = np.asarray(data.points)
+    first, inverse = weld_vertices(points, tolerance)
+    triangles = inverse[np.asarray(data.polygons, dtype=np.intp).reshape(-1, 3)]
+    keep = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) & (triangles[:, 0] != triangles[:, 2])
+    if not keep.all():
+        triangles = triangles[keep]
+
+    used = np.zeros(len(first), dtype=bool)
+    used[triangles.ravel()] = True
+    remap = np.cumsum(used) - 1
+    # Remap in place, the welded index array is reused for the final one
+    np.take(remap, triangles, out=triangles)
+    vertex_ids = first[used]
+
+    result = Properties()
+    vertex_count = len(points)
+    for field in VERTEX_FIELDS:
+        array = getattr(data, field, None)
+        if array is not None and len(array) == vertex_count:
+            setattr(result, field, np.asarray(array)[vertex_ids])
+    result.points = result.points.astype(np.float32, copy=False)
+    result.polygons = triangles.astype(np.uint32)
+    if generate_normals and len(result.normals) != len(result.points):
+        result.normals = vertex_normals(result.points, result.polygons)
+    result.vertex_ids = vertex_ids
+    return result
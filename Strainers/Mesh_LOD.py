@@ -0,0 +1,189 @@
+"""
+Level of detail pyramids for strained meshes.
+
+build_lod_pyramid turns one strained mesh into a few levels with shrinking triangle budgets (100%/25%/5% by default),
+either with a vectorized vertex clustering decimator or with vtkQuadricDecimation. Levels can be kept in the
+StrainCache next to the full mesh, and FramePublisher.publish_lods shows the coarsest level first and then swaps in
+finer ones, so clients get a first picture long before the full resolution mesh has arrived.
+"""
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
+from vtk import vtkPolyData, vtkPoints, vtkCellArray, vtkQuadricDecimation
+from Reader_Strainer_Threading import Properties, threading_strainer
+from Extraction import extract_points, extract_normals, extract_point_array
+from Triangulator import triangulate_polys
+
+DEFAULT_LOD_RATIOS = (1.0, 0.25, 0.05)
+
+
+def _average(array, inverse, counts):
+    """Per cluster mean of a per vertex array, keeping integer dtypes."""
+    array = np.asarray(array)
+    flat = array.reshape(len(array), int(np.prod(array.shape[1:]))).astype(np.float64)
+    sums = np.zeros((len(counts), flat.shape[1]))
+    np.add.at(sums, inverse, flat)
+    means = sums / counts[:, None]
+    if np.issubdtype(array.dtype, np.integer):
+        means = np.rint(means)
+    return means.astype(array.dtype).reshape((len(counts),) + array.shape[1:])
+
+
+def cluster_decimate(data, cell_size):
+    """
+    Vertex clustering decimation. Vertices are snapped to a grid of the given cell size and merged per cell,
+    triangles that collapse are dropped and duplicates removed.
+
+    :param data: Properties with points and polygons
+    :param cell_size: edge length of a grid cell
+    :return: decimated Properties
+    """
+    points = np.asarray(data.points, dtype=np.float64)
+    triangles = np.asarray(data.polygons, dtype=np.int64).reshape(-1, 3)
+    low = points.min(axis=0)
+    cells = np.floor((points - low) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = cells[:, 0] + dims[0] * (cells[:, 1] + dims[1] * cells[:, 2])
+    _, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+
+    clustered = inverse[triangles]
+    keep = (clustered[:, 0] != clustered[:, 1]) & (clustered[:, 1] != clustered[:, 2]) & (clustered[:, 0] != clustered[:, 2])
+    clustered = clustered[keep]
+    # Drop duplicate triangles, keeping the first one's winding
+    _, first = np.unique(np.sort(clustered, axis=1), axis=0, return_index=True)
+    clustered = clustered[np.sort(first)]
+
+    # Only keep clusters still referenced by a triangle
+    used, remapped = np.unique(clustered, return_inverse=True)
+    member = np.isin(inverse, used)
+    vertex_cluster = np.searchsorted(used, inverse[member])
+    counts = np.bincount(vertex_cluster, minlength=len(used)).astype(np.float64)
+
+    result = Properties()
+    result.points = _average(points[member], vertex_cluster, counts).astype(np.float32)
+    result.polygons = remapped.reshape(-1, 3).astype(np.uint32)
+    normals = np.asarray(data.normals)
+    if len(normals) == len(points):
+        averaged = _average(normals[member], vertex_cluster, counts).astype(np.float32)
+        lengths = np.linalg.norm(averaged, axis=1, keepdims=True)
+        lengths[lengths == 0] = 1
+        result.normals = averaged / lengths
+    colors = np.asarray(data.colors)
+    if len(colors) == len(points):
+        result.colors = _average(colors[member], vertex_cluster, counts)
+    return result
+
+
+def cluster_decimate_to_budget(data, max_triangles, iterations=12):
+    """
+    Vertex clustering with the grid cell size searched so the result has at most max_triangles triangles,
+    and as many as possible below that.
+    """
+    triangle_count = len(data.polygons)
+    if triangle_count <= max_triangles:
+        return data
+    points = np.asarray(data.points, dtype=np.float64)
+    diagonal = np.linalg.norm(points.max(axis=0) - points.min(axis=0)) or 1.0
+    # Cell sizes bracketing the budget, searched on a log scale
+    low, high = diagonal * 1e-6, diagonal
+    best = cluster_decimate(data, high)
+    for _ in range(iterations):
+        middle = np.sqrt(low * high)
+        candidate = cluster_decimate(data, middle)
+        if len(candidate.polygons) <= max_triangles:
+            best, high = candidate, middle
+        else:
+            low = middle
+    return best
+
+
+def _to_polydata(data):
+    polydata = vtkPolyData()
+    points = vtkPoints()
+    points.SetData(numpy_to_vtk(np.ascontiguousarray(data.points, dtype=np.float32), deep=True))
+    polydata.SetPoints(points)
+    triangles = np.asarray(data.polygons, dtype=np.int64).reshape(-1, 3)
+    offsets = np.arange(0, 3 * len(triangles) + 1, 3, dtype=np.int64)
+    cells = vtkCellArray()
+    cells.SetData(numpy_to_vtkIdTypeArray(offsets, deep=True), numpy_to_vtkIdTypeArray(triangles.ravel(), deep=True))
+    polydata.SetPolys(cells)
+    normals = np.asarray(data.normals)
+    if len(normals) == len(data.points):
+        vtk_normals = numpy_to_vtk(np.ascontiguousarray(normals, dtype=np.float32), deep=True)
+        vtk_normals.SetName("Normals")
+        polydata.GetPointData().SetNormals(vtk_normals)
+    colors = np.asarray(data.colors)
+    if len(colors) == len(data.points):
+        vtk_colors = numpy_to_vtk(np.ascontiguousarray(colors), deep=True)
+        vtk_colors.SetName("RGBA")
+        polydata.GetPointData().AddArray(vtk_colors)
+    return polydata
+
+
+def quadric_decimate(data, ratio):
+    """
+    Decimate with vtkQuadricDecimation down to roughly ratio of the triangles. Point data is carried over.
+    """
+    decimator = vtkQuadricDecimation()
+    decimator.SetInputData(_to_polydata(data))
+    decimator.SetTargetReduction(1.0 - ratio)
+    if hasattr(decimator, "MapPointDataOn"):
+        decimator.MapPointDataOn()
+    decimator.Update()
+    output = decimator.GetOutput()
+    result = Properties()
+    result.points = extract_points(output)
+    result.polygons = triangulate_polys(output.GetPolys())
+    normals = extract_normals(output)
+    if normals is not None:
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        lengths[lengths == 0] = 1
+        result.normals = normals / lengths
+    colors = extract_point_array(output, "RGBA")
+    if colors is not None:
+        result.colors = colors
+    return result
+
+
+def build_lod_pyramid(data, ratios=DEFAULT_LOD_RATIOS, method="cluster"):
+    """
+    Build a level of detail pyramid.
+
+    :param data: strained Properties
+    :param ratios: triangle budgets as fractions of the full mesh, finest first
+    :param method: "cluster" for the vectorized vertex clustering decimator, "quadric" for vtkQuadricDecimation
+    :return: list of Properties, one per ratio in the given order
+    """
+    if method not in ("cluster", "quadric"):
+        raise ValueError("method must be 'cluster' or 'quadric'")
+    levels = []
+    triangle_count = len(data.polygons)
+    for ratio in ratios:
+        if ratio >= 1.0:
+            levels.append(data)
+        elif method == "quadric":
+            levels.append(quadric_decimate(data, ratio))
+        else:
+            levels.append(cluster_decimate_to_budget(data, max(1, int(triangle_count * ratio))))
+    return levels
+
+
+def cached_lod_pyramid(cache, filename, strainer=threading_strainer, ratios=DEFAULT_LOD_RATIOS, method="cluster"):
+    """
+    LOD pyramid of a file, stored in a StrainCache alongside the full mesh so it is only built once.
+
+    :param cache: StrainCache
+    :return: list of Properties, one per ratio in the given order
+    """
+    full = cache.strain(filename, strainer)
+    levels = []
+    for ratio in ratios:
+        if ratio >= 1.0:
+            levels.append(full)
+            continue
+        level = cache.get(filename, strainer, lod=ratio, lod_method=method)
+        if level is None:
+            level = build_lod_pyramid(full, (ratio,), method)[0]
+            cache.put(filename, level, strainer, lod=ratio, lod_method=method)
+        levels.append(level)
+    return levels
@@ -0,0 +1,83 @@
+"""
+Smooth vertex normals computed with NumPy from the (N,3) index array.
+
+Face normals come from one vectorized cross product per triangle and are accumulated per vertex with bincount,
+so any strainer can guarantee normals without a vtkPolyDataNormals pass or a ParaView generate normals filter.
+Face contributions can be weighted by triangle area (the default, cheapest), by the corner angle at the vertex
+(least sensitive to how a surface was triangulated) or uniformly.
+"""
+import numpy as np
+
+NORMAL_WEIGHTINGS = ("area", "angle", "uniform")
+
+
+def face_normals(points, triangles, normalize=True):
+    """
+    Normals of the triangles.
+
+    :param points: (N,3) positions
+    :param triangles: (M,3) triangle indices
+    :param normalize: unit normals, otherwise their length is twice the triangle area
+    :return: (M,3) float64 array, degenerate triangles get zero normals
+    """
+    corners = np.asarray(points, dtype=np.float64)[np.asarray(triangles, dtype=np.intp).reshape(-1, 3)]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    if normalize:
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        lengths[lengths == 0] = 1
+        normals /= lengths
+    return normals
+
+
+def corner_angles(points, triangles):
+    """(M,3) interior angle of every triangle at each of its corners."""
+    corners = np.asarray(points, dtype=np.float64)[np.asarray(triangles, dtype=np.intp).reshape(-1, 3)]
+    angles = np.empty((len(corners), 3))
+    for corner in range(3):
+        first = corners[:, (corner + 1) % 3] - corners[:, corner]
+        second = corners[:, (corner + 2) % 3] - corners[:, corner]
+        cross = np.linalg.norm(np.cross(first, second), axis=1)
+        angles[:, corner] = np.arctan2(cross, np.einsum("ij,ij->i", first, second))
+    return angles
+
+
+def vertex_normals(points, triangles, weighting="area"):
+    """
+    Smooth normals, the weighted sum of the face normals around each vertex, normalized.
+
+    :param points: (N,3) positions
+    :param triangles: (M,3) triangle indices
+    :param weighting: "area", "angle" or "uniform"
+    :return: (N,3) float32 unit normals, vertices without triangles get zero normals
+    """
+    if weighting not in NORMAL_WEIGHTINGS:
+        raise ValueError("weighting must be one of %s" % (NORMAL_WEIGHTINGS,))
+    triangles = np.asarray(triangles, dtype=np.intp).reshape(-1, 3)
+    vertex_count = len(points)
+    # Cross products are face normals scaled by twice the triangle area
+    faces = face_normals(points, triangles, normalize=weighting != "area")
+    if weighting == "angle":
+        contributions = (faces[:, None, :] * corner_angles(points, triangles)[:, :, None]).reshape(-1, 3)
+    else:
+        contributions = np.repeat(faces, 3, axis=0)
+    # Every corner adds its weighted face normal to its vertex, bincount is much faster than np.add.at
+    flat = triangles.ravel()
+    normals = np.empty((vertex_count, 3))
+    for axis in range(3):
+        normals[:, axis] = np.bincount(flat, weights=contributions[:, axis], minlength=vertex_count)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+    normals /= lengths
+    return normals.astype(np.float32)
+
+
+def ensure_normals(data, weighting="area"):
+    """
+    Give strained data smooth normals if it does not have one per vertex already.
+
+    :param data: Properties with points and polygons
+    :return: data, with normals filled in when they were missing
+    """
+    if len(data.normals) != len(data.points) and len(data.polygons):
+        data.normals = vertex_normals(data.points, data.polygons, weighting)
+    return data
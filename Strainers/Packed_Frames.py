@@ -0,0 +1,136 @@
+"""
+Packed, memory mapped container for animation frame sequences.
+
+pack_frames strains a sequence of frames once and writes every array into a single file. PackedFrames maps that
+file and hands out frames whose arrays are NumPy views into the map, no parsing and no copying. Frames are paged
+in from the OS page cache as they are played, so hundreds of frames can be "loaded" without resident memory.
+
+Layout:
+    8 bytes   magic, b"NOODPAK1"
+    8 bytes   little endian uint64, offset of the index
+    8 bytes   little endian uint64, length of the index
+    ...       array data, each array aligned to 64 bytes
+    index     utf-8 JSON, one entry per frame: {"filename": ..., "arrays": {field: [offset, shape, dtype]}}
+
+Convert a folder of frames from the command line:
+    python Packed_Frames.py path/to/folder/ frames.noodpack
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from Reader_Strainer_Threading import Properties, threading_strainer
+
+PACK_MAGIC = b"NOODPAK1"
+PACK_FIELDS = ["points", "polygons", "normals", "colors", "scalars"]
+PACK_ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sQQ")
+
+
+def _pad(file):
+    remainder = file.tell() % PACK_ALIGNMENT
+    if remainder:
+        file.write(b"\0" * (PACK_ALIGNMENT - remainder))
+
+
+def pack_frames(filenames, output_path, strainer=threading_strainer, cache=None):
+    """
+    Strain frames one at a time and pack them into a single file. Only one frame is held in memory at a time.
+
+    :param filenames: frame files in playback order
+    :param output_path: container to write
+    :param strainer: strainer function, threading_strainer by default
+    :param cache: optional StrainCache to strain through
+    :return: number of frames written
+    """
+    index = []
+    with open(output_path, "wb") as file:
+        file.write(_PREFIX.pack(PACK_MAGIC, 0, 0))
+        for filename in filenames:
+            data = cache.strain(filename, strainer) if cache is not None else strainer(filename)
+            arrays = {}
+            for field in PACK_FIELDS:
+                array = getattr(data, field, None)
+                if array is None:
+                    continue
+                array = np.ascontiguousarray(array)
+                if array.size == 0:
+                    continue
+                _pad(file)
+                arrays[field] = [file.tell(), list(array.shape), array.dtype.str]
+                file.write(array.tobytes())
+            index.append({"filename": os.path.basename(filename), "arrays": arrays})
+        index_bytes = json.dumps({"frames": index}).encode("utf-8")
+        index_offset = file.tell()
+        file.write(index_bytes)
+        file.seek(0)
+        file.write(_PREFIX.pack(PACK_MAGIC, index_offset, len(index_bytes)))
+    return len(index)
+
+
+class PackedFrames:
+    """
+    Read only view of a packed frame container.
+
+    Indexing or iterating returns Properties whose arrays are views into the memory map,
+    they stay valid until close() is called.
+
+    Example usage:
+        frames = PackedFrames("frames.noodpack")
+        for frame in frames:
+            publish(frame)
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size < _PREFIX.size:
+            self._file.close()
+            raise ValueError("%s is not a packed frame file" % path)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_length = _PREFIX.unpack_from(self._map, 0)
+        if magic != PACK_MAGIC:
+            self.close()
+            raise ValueError("%s is not a packed frame file" % path)
+        if index_offset < _PREFIX.size or index_offset + index_length > len(self._map):
+            # Cut short while copying, or pack_frames never got to write the index
+            self.close()
+            raise ValueError("%s is truncated" % path)
+        self.frames = json.loads(self._map[index_offset:index_offset + index_length].decode("utf-8"))["frames"]
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        entry = self.frames[i]
+        data = Properties()
+        data.filename = entry["filename"]
+        for field, (offset, shape, dtype) in entry["arrays"].items():
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            setattr(data, field, np.frombuffer(self._map, dtype=dtype, count=count, offset=offset).reshape(shape))
+        return data
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        """Close the map. Arrays handed out must not be used afterwards."""
+        try:
+            self._map.close()
+        except BufferError:
+            # Views are still alive, the map is released once they are garbage collected
+            pass
+        self._file.close()
+
+
+if __name__ == "__main__":
+    from Batch_Strainer import frame_files
+    if len(sys.argv) < 3:
+        print("usage: python Packed_Frames.py path/to/folder/ output.noodpack [extension]")
+        sys.exit(1)
+    extension = sys.argv[3] if len(sys.argv) > 3 else ".ply"
+    count = pack_frames(frame_files(sys.argv[1], extension), sys.argv[2])
+    print("packed", count, "frames into", sys.argv[2])
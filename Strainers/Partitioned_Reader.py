@@ -0,0 +1,95 @@
+"""
+Parallel loading of partitioned datasets (.pvtp / .pvtu).
+
+A partitioned file is a small XML index listing one piece file per rank of the simulation that wrote it.
+Instead of vtkXMLPPolyDataReader reading the pieces one after another, the pieces are strained concurrently in a
+process pool (Batch_Strainer, arrays come back through shared memory), so load time drops nearly linearly with the
+number of cores. The pieces can be published as they are, one patch per piece (FramePublisher.publish_parts),
+or concatenated into one mesh with every piece's indices offset by the vertices before it.
+"""
+import os
+import sys
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+from Reader_Strainer_Threading import Properties, threading_strainer
+from Batch_Strainer import batch_strain
+from Mesh_Cleaning import prepare_mesh
+
+PIECE_FIELDS = ["normals", "colors", "scalars"]
+
+
+def piece_files(filename):
+    """
+    Piece files listed by a .pvtp or .pvtu file, resolved relative to it.
+
+    :return: list of paths in piece order
+    """
+    root = ElementTree.parse(filename).getroot()
+    folder = os.path.dirname(os.path.abspath(filename))
+    return [os.path.join(folder, piece.get("Source")) for piece in root.iter("Piece") if piece.get("Source")]
+
+
+def concatenate_pieces(pieces):
+    """
+    Concatenate strained pieces into one mesh, each piece's triangles offset by the vertex count of the pieces before it.
+    Per vertex arrays are kept only when every piece has them with the same width.
+
+    :param pieces: list of strained pieces (Properties or SharedFrame)
+    :return: Properties
+    """
+    counts = np.array([len(piece.points) for piece in pieces], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    if offsets[-1] > np.iinfo(np.uint32).max:
+        raise ValueError("too many vertices for 32 bit indices")
+    merged = Properties()
+    merged.points = np.concatenate([np.asarray(piece.points, dtype=np.float32).reshape(-1, 3) for piece in pieces])
+    triangle_counts = [len(np.asarray(piece.polygons).reshape(-1, 3)) for piece in pieces]
+    merged.polygons = np.empty((sum(triangle_counts), 3), dtype=np.uint32)
+    start = 0
+    for piece, triangle_count, offset in zip(pieces, triangle_counts, offsets):
+        # Offset while copying into the output, no intermediate array per piece
+        np.add(np.asarray(piece.polygons).reshape(-1, 3), offset, out=merged.polygons[start:start + triangle_count],
+               casting="unsafe")
+        start += triangle_count
+    for field in PIECE_FIELDS:
+        arrays = [np.asarray(getattr(piece, field)) for piece in pieces]
+        if all(len(array) == count for array, count in zip(arrays, counts)) and len({array.shape[1:] for array in arrays}) == 1:
+            setattr(merged, field, np.concatenate(arrays))
+    return merged
+
+
+def load_partitioned(filename, merge=True, weld=False, max_workers=None, strainer=threading_strainer, cache=None, progress=None):
+    """
+    Strain the pieces of a partitioned dataset concurrently.
+
+    :param filename: .pvtp or .pvtu file
+    :param merge: concatenate the pieces into one mesh, otherwise return one strained piece per file
+    :param weld: weld the vertices duplicated along piece boundaries, only when merging
+    :param max_workers: process pool size, defaults to the number of cpus
+    :param strainer: picklable strainer run on every piece file
+    :param cache: optional StrainCache
+    :param progress: callable(done, total, filename) called as pieces finish
+    :return: Properties when merging, else a list of SharedFrame (unlink them when done)
+    """
+    pieces = batch_strain(piece_files(filename), max_workers, strainer, progress, cache)
+    if not merge:
+        return pieces
+    try:
+        merged = concatenate_pieces(pieces)
+    finally:
+        for piece in pieces:
+            piece.unlink()
+    if weld:
+        merged = prepare_mesh(merged)
+    return merged
+
+
+if __name__ == "__main__":
+    import time
+    if len(sys.argv) < 2:
+        print("usage: python Partitioned_Reader.py path/to/file.pvtp [workers]")
+        sys.exit(1)
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    start = time.time()
+    data = load_partitioned(sys.argv[1], max_workers=workers)
+    print("loaded", len(data.points), "points", len(data.polygons), "triangles in", time.time() - start)
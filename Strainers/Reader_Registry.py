@@ -0,0 +1,147 @@
+"""
+Reader registry shared by the file based strainers.
+
+Maps file extensions, and magic bytes for files with unknown or misleading extensions, to VTK reader factories.
+Formats that do not produce vtkPolyData (unstructured grids, legacy VTK datasets, glTF scenes) go through a geometry
+extraction step, so every strainer gets a single vtkPolyData surface back. Reader instances are reused per thread,
+the output handed out is a shallow copy so it stays valid when the reader reads the next file.
+
+New formats are added with register_reader:
+    register_reader([".ex2"], vtkExodusIIReader)
+"""
+import os
+import threading
+from vtk import (vtkPLYReader, vtkOBJReader, vtkSTLReader, vtkGLTFReader, vtkDataSetReader, vtkPolyData,
+                 vtkGeometryFilter, vtkCompositeDataGeometryFilter, vtkCompositeDataSet)
+from vtkmodules.vtkIOXML import (vtkXMLPolyDataReader, vtkXMLUnstructuredGridReader, vtkXMLMultiBlockDataReader,
+                                 vtkXMLPartitionedDataSetCollectionReader, vtkXMLPartitionedDataSetReader,
+                                 vtkXMLPPolyDataReader, vtkXMLPUnstructuredGridReader)
+
+# extension: reader factory
+READERS = {}
+# (magic prefix, extension) checked in order, the first match wins
+MAGIC = []
+# Bytes read from the start of a file to sniff its type
+SNIFF_BYTES = 512
+
+_local = threading.local()
+
+
+def register_reader(extensions, factory, magic=None):
+    """
+    Register a reader factory for file extensions.
+
+    :param extensions: list of extensions with their dot, e.g. [".vtu"]
+    :param factory: callable returning a new reader with SetFileName and an output port, usually the reader class
+    :param magic: optional bytes prefix identifying the format, mapped to the first extension
+    """
+    for extension in extensions:
+        READERS[extension.lower()] = factory
+    if magic is not None:
+        MAGIC.append((magic, extensions[0].lower()))
+
+
+def _sniff_xml(head):
+    """Extension of a VTK XML file from the type attribute of its VTKFile element."""
+    for vtk_type, extension in ((b'type="PolyData"', ".vtp"), (b'type="UnstructuredGrid"', ".vtu"),
+                                (b'type="vtkMultiBlockDataSet"', ".vtm"),
+                                (b'type="vtkPartitionedDataSetCollection"', ".vtpc"),
+                                (b'type="vtkPartitionedDataSet"', ".vtpd"),
+                                (b'type="PPolyData"', ".pvtp"), (b'type="PUnstructuredGrid"', ".pvtu")):
+        if vtk_type in head:
+            return extension
+    return None
+
+
+def sniff(filename):
+    """
+    Registered extension to read a file with, by magic bytes first and then by the file extension.
+
+    :return: extension key of READERS, None if the format is unknown
+    """
+    try:
+        with open(filename, "rb") as file:
+            head = file.read(SNIFF_BYTES)
+    except OSError:
+        head = b""
+    if head.lstrip().startswith(b"<"):
+        extension = _sniff_xml(head)
+        if extension is not None:
+            return extension
+    for magic, extension in MAGIC:
+        if head.startswith(magic):
+            return extension
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if extension in READERS else None
+
+
+def get_reader(extension):
+    """Reader for an extension, one instance per thread and extension."""
+    readers = getattr(_local, "readers", None)
+    if readers is None:
+        readers = _local.readers = {}
+    reader = readers.get(extension)
+    if reader is None:
+        reader = readers[extension] = READERS[extension]()
+    return reader
+
+
+def read_dataset(filename):
+    """
+    Read a file with the registered reader for its format.
+
+    :return: the reader's output data object, a shallow copy the reader no longer writes to
+    :raises ValueError: if no reader is registered for the file
+    """
+    extension = sniff(filename)
+    if extension is None:
+        raise ValueError("no reader registered for %s, add one with register_reader" % filename)
+    reader = get_reader(extension)
+    reader.SetFileName(filename)
+    # SetFileName with the same path does not mark the reader modified, a rewritten file would not be read again
+    reader.Modified()
+    reader.Update()
+    output = reader.GetOutputDataObject(0)
+    copy = output.NewInstance()
+    copy.ShallowCopy(output)
+    return copy
+
+
+def to_polydata(data_object):
+    """
+    Surface of any dataset as vtkPolyData. Polydata is returned as is, unstructured grids and other datasets
+    go through vtkGeometryFilter and composite datasets are merged into one surface.
+    """
+    if isinstance(data_object, vtkPolyData):
+        return data_object
+    if isinstance(data_object, vtkCompositeDataSet):
+        extractor = vtkCompositeDataGeometryFilter()
+    else:
+        extractor = vtkGeometryFilter()
+    extractor.SetInputData(data_object)
+    extractor.Update()
+    return extractor.GetOutput()
+
+
+def read_polydata(filename):
+    """
+    Read any registered format as vtkPolyData, the single entry point of the file based strainers.
+    """
+    return to_polydata(read_dataset(filename))
+
+
+register_reader([".ply"], vtkPLYReader, magic=b"ply")
+register_reader([".obj"], vtkOBJReader)
+register_reader([".vtp"], vtkXMLPolyDataReader)
+register_reader([".vtu"], vtkXMLUnstructuredGridReader)
+register_reader([".vtk"], vtkDataSetReader, magic=b"# vtk DataFile")
+register_reader([".stl"], vtkSTLReader)
+register_reader([".glb"], vtkGLTFReader, magic=b"glTF")
+register_reader([".gltf"], vtkGLTFReader)
+### Composite formats, read_polydata merges their blocks, Composite_Strainer strains them block by block
+register_reader([".vtm"], vtkXMLMultiBlockDataReader)
+register_reader([".vtpc"], vtkXMLPartitionedDataSetCollectionReader)
+register_reader([".vtpd"], vtkXMLPartitionedDataSetReader)
+### Partitioned formats read serially, Partitioned_Reader strains their pieces in parallel
+register_reader([".pvtp"], vtkXMLPPolyDataReader)
+register_reader([".pvtu"], vtkXMLPUnstructuredGridReader)
@@ -4,21 +4,27 @@ Filter to read .vtp file data primtiives into NOODLEs.
 Output is an array of arrays, points and polygon indices as of 7/3/23
 Support for normals and texture coordinates to be developed in the future.
 
-Consume_faces function is based upon pywavefront's obj exporter method called consume_faces. 
-This method triangulates polygons with more than 3 vertices.
-Consume_faces in this file is based upon the documentation and code found here: https://github.com/pywavefront/PyWavefront/blob/master/pywavefront/obj.py
+Polygons with more than 3 vertices are fan triangulated by the shared engine in Triangulator.py,
+which follows pywavefront's consume_faces ordering: https://github.com/pywavefront/PyWavefront/blob/master/pywavefront/obj.py
 
 """
+import logging
 import numpy as np
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtk import vtkOBJReader, vtkGLTFReader, vtkPLYReader
 from VTKnamedColorsNOODLES import VTKColors
+from Triangulator import triangulate_polys, consume_faces
+from Extraction import extract_points, extract_normals, extract_colors, colors_to_0_1, scale_points
+from Color_Mapping import map_scalars, random_colors, color_by_array
+from Normals import vertex_normals
+from Reader_Registry import read_polydata
+from Streaming_Strainer import streaming_strainer
 from vtkmodules.numpy_interface import dataset_adapter as dsa
 from vtkmodules.numpy_interface import algorithms as akgs
 import matplotlib.pyplot as plt
 from matplotlib.path import Path
 from matplotlib.patches import PathPatch
 
+logger = logging.getLogger(__name__)
+
 
 class Properties:
     """
@@ -40,13 +46,20 @@ class Properties:
         self.scalars = []
         self.colors = []
 
-def noodStrainer(filename):
+def noodStrainer(filename, color_array=None, color_range=None, cmap='cool', memory_budget=None):
     """
-    Reads a obj, vtp, ply, or gltf file and extracts relevant data into a custom format.
-    If a different file type is needed, add the import to this strainer. 
+    Reads a ply, obj, vtp, vtu, legacy vtk, stl, gltf or glb file and extracts relevant data into a custom format.
+    If a different file type is needed, add it with Reader_Registry.register_reader. 
 
     Args:
         filename (str): The path to the VTK XML PolyData file.
+        color_array (str): Optional point data array to color by through cmap. By default RGB(A) colors are used
+            if present, otherwise points are colored by height.
+        color_range (tuple): Optional (min, max) scalar range mapped onto cmap, defaults to the data range.
+        cmap (str): matplotlib colormap used for scalar coloring.
+        memory_budget (int): Optional bytes of working memory. When given the mesh is strained out of core by
+            Streaming_Strainer.streaming_strainer and the arrays returned are memory mapped spill files
+            (delete them with Streaming_Strainer.remove_spill). color_array is not supported in this mode.
 
     Returns:
         data (Properties): An instance of the Properties class containing extracted data.
@@ -55,147 +68,49 @@ def noodStrainer(filename):
     #reader = vtkXMLPolyDataReader()
         data = noodStrainer(/Users/jbachman/Downloads/workspace/aug4realdemo_magvort0.ply'input.vtp')
     """
-    file_extension = filename[-3:]
-    if file_extension == "ply":
-        reader = vtkPLYReader()
-    elif file_extension == "obj":
-        reader = vtkOBJReader()
-    elif file_extension == "vtp":
-        reader = vtkXMLPolyDataReader()
-    else:
-        print("file type not standard, if vtk reader exists for file type, input manually")
-    reader.SetFileName(filename)
-    reader.Update()
-    s_array = dsa.WrapDataObject(reader.GetOutput())
-    #### Test area for color
-    point_data = s_array.PointData
-    point_data_array_names = point_data.keys()
-
-    names_to_check = ["RGB", "RGBA", "SCALARS", "Scalars", "Scalars_"]  # Names to check
-
-    result_dict = [0]  # Dictionary to store the names that are present in the set
-    for name in names_to_check:
-        if name in point_data_array_names:
-            result_dict[0] = name
-
-
-###Wrap the vtk data object so its data is accesible
-    polygons = s_array.GetPolygons()
-    point_array = []
-    normals = s_array.GetPointData().GetNormals()
-    num_points = len(s_array.Points)
-    print("LINE 83")
-    indy = 0
-    ### Turn Point data into pretty format
-    while (indy < num_points):
-        point = s_array.Points.GetTuple(indy)
-        point_array.append(point)
-        indy += 1
-    point_indices = []
-    index = 0
-    ### Turn Polygon indices into pretty format
-    while index < len(polygons):
-        num_vertices = polygons[index]
-        polygon_vertices = polygons[index+1:index+1+num_vertices]
-        point_indices.append(list(polygon_vertices))
-        index += num_vertices + 1
-    pointdatalength = len(s_array.PointData.keys())
-
-    triangulated = []
-    triangulated = consume_faces(point_array,point_indices)
-    normal_array = []
-    TCoords_array = []
-    try:
-        num_normals = s_array.GetPointData().GetNormals().GetNumberOfTuples()
-    except Exception as e:
-        print("No normals available, generate with Rigatoni")
-    index1 = 0
-    ### package normals
-    if s_array.GetPointData().GetNormals():
-        while(index1 < num_normals ):
-            norm = s_array.GetPointData().GetNormals().GetTuple(index1)
-            normal_array.append(norm)
-            index1 += 1
-    ### Turn normals into pretty format
-    ### Turn T Coords into pretty format
-    ### As of 9/3 this is causing weird errors and I havent encontered T coords ever so just gonna let it be. 
-    try:
-        if 'TCoords' in s_array.PointData:
-            TCoords_array = []
-            num_cords = len(s_array.PointData['TCoords'])
-            index = 0
-        while (index < num_cords):
-            point = s_array.PointData['TCoords'].GetTuple(index)
-            TCoords_array.append(point)
-            index += 1
-    except:
-        print("No Texture Coordinates Available")
+    if memory_budget is not None:
+        if color_array is not None:
+            raise ValueError("color_array is not supported when straining with a memory_budget")
+        return streaming_strainer(filename, memory_budget, cmap=cmap, color_range=color_range)
+
+    ### The registry picks the reader by magic bytes or extension and extracts a surface from non polydata formats
+    polydata = read_polydata(filename)
+
+    ### Triangulate straight from the offsets/connectivity arrays
+    triangulated = triangulate_polys(polydata.GetPolys())
     data = Properties()
-    data.points = Scale_by(point_array,0.5)
+    ### Points and normals come out as float32 views over the vtk buffers, scaling is a single array op
+    data.points = extract_points(polydata, 0.5)
     data.polygons = triangulated
-    data.normals = normal_array
-    height_values = []
-    for val in data.points:
-        height_values.append(val[1])
-    try:
-        colors = s_array.PointData[result_dict[0]]
-        data.colors = convert_to_0_1_scale(colors)
-    except Exception as e:
-        data.colors = generate_colors_for_polygons(data.points,data.polygons,height_values)
+    normals = extract_normals(polydata)
+    if normals is None:
+        ### Smooth normals from the triangles, no ParaView normals filter needed
+        data.normals = vertex_normals(data.points, data.polygons)
+    else:
+        data.normals = normals
+    height_values = data.points[:, 1]
+    if color_array is not None:
+        data.colors = color_by_array(polydata, color_array, cmap, color_range, dtype=np.float32)
+        if data.colors is None:
+            logger.warning("no point data array named %s", color_array)
+            data.colors = []
+        return data
+    colors = extract_colors(polydata)
+    if colors is not None and colors.ndim == 2 and colors.shape[1] in (3, 4):
+        data.colors = colors_to_0_1(colors)
+    else:
+        ### No RGB(A) colors in the file, color by height
+        data.colors = map_scalars(height_values, cmap, color_range, dtype=np.float32)
     return data
 
 
 def convert_to_0_1_scale(color_data):
     """
     Converts 0-255 rgb values to 0-1 scale. 
-    :param color_data: list of lists, containg color dat 0-255
-    :returns correct list of lists. 
+    :param color_data: array or list of lists, containg color dat 0-255
+    :returns (N,4) float32 RGBA array. 
     """
-    converted_data = []
-    for color in color_data:
-        if len(color) == 3:
-            converted_color = [channel / 255.0 for channel in color]
-            converted_color.append(1.0)
-            converted_data.append(converted_color)
-        if len(color) == 4:
-            converted_color = [channel / 255.0 for channel in color]
-            converted_data.append(converted_color)
-    return converted_data  
-
-def consume_faces(points, polygons):
-    """
-    Large part taken from pywavefront github
-    Consume polygons and output triangles. May not be the most efficent way to create triangles.
-
-    :param points: A list of points representing the vertices of the polygons.
-    :param polygons: A list of polygons, where each polygon is a list of indices representing the vertices.
-    :return: A list of triangles representing the polygons.
-    """
-    collected_faces = []  # List to store triangles
-
-    # Helper function to append triangles
-    def emit_triangle(v1, v2, v3):
-        collected_faces.append([v1, v2, v3]) 
-    for polygon in polygons:
-        num_vertices = len(polygon)
-
-        if num_vertices < 3:
-            continue 
-
-        # Emit the first triangle of the polygon
-        v1 = polygon[0]
-        v2 = polygon[1]
-        v3 = polygon[2]
-        emit_triangle(v1, v2, v3)
-
-        # triangulate rest of triangles by pinning down v1 and moving through points
-        for i in range(3, num_vertices):
-            v_current = polygon[i]
-            v_last = polygon[i - 1]
-            emit_triangle(v1, v_last, v_current)
-
-    return collected_faces
-
+    return colors_to_0_1(color_data)
 
 def generate_colors_for_polygons(vertices, polygons, values, cmap='cool'):
     """
@@ -204,40 +119,19 @@ def generate_colors_for_polygons(vertices, polygons, values, cmap='cool'):
     :param vertices: a lis of polygon points
     :param polygons: A list of polygons, where each polygon is a list of indices representing the vertices.
     :param values: Values corresponding to each point, will be normalized in 0-1 range and used for coloring. Lack of values results in random coloring.
-    _param cmap: matplot color map, default to inferno but can be overridden. 
-    :return: A list of colors correspionding to .
+    _param cmap: matplot color map, default to cool but can be overridden. 
+    :return: (N,4) float32 RGBA array of colors corresponding to the vertices, looked up in one vectorized pass.
     """
-    if values == None:
-        values = np.random.rand(len(vertices))
-        print(len(values))
-    else:
-        # Normalize values to the range [0, 1]
-        values = np.array(values)
-        values = (values - values.min()) / (values.max() - values.min())
-    # Create a color map
-    colormap = plt.get_cmap(cmap)
-
-    colors = []
-    for val in values:
-        # 9/22 subscripting is not needed for total random gen. Confused why I needed it before. 
-        rgba_color = colormap(val)
-
-        red = round(rgba_color[0],3)
-        green = round(rgba_color[1],3)
-        blue = round(rgba_color[2],3)
-
-        colors.append([red, green, blue,1.0])
-
-    return colors
+    if values is None:
+        return random_colors(len(vertices), cmap)
+    # Normalize values to the range [0, 1] and look them up in the colormap table
+    return map_scalars(values, cmap, dtype=np.float32)
 
 def Scale_by(oldpoints,scalefactor):
-    points = []
-    for point in oldpoints:
-        new_point = []
-        i = 0
-        while i < 3:
-            new_one_dim = point[i] * scalefactor
-            new_point.append(new_one_dim)
-            i+=1
-        points.append(new_point)
-    return points
\ No newline at end of file
+    """
+    Scale points by a uniform factor.
+    :param oldpoints: (N,3) array or list of points
+    :param scalefactor: scale to apply
+    :returns (N,3) float32 array, scaled in place when oldpoints is already a float32 array we own
+    """
+    return scale_points(np.asarray(oldpoints, dtype=np.float32), scalefactor)
@@ -2,18 +2,29 @@
 Author @Jonny Bachman
 Filter to read file data into NOODLES
 This filter utilizes python threading to speed up the packaging of VTK/Paraview data as fast as possible.
+Every call strains into its own Properties, so it is safe to call from several threads (e.g. concurrent server method handlers).
+The large array copies are split into chunks and run on a shared thread pool, NumPy releases the GIL while copying
+so the chunks really run in parallel. Only chunk jobs go to the pool, they never wait on each other.
 Requirements for this filter:
--polygons must be triangles, this can be achieved in Paraview with the triangle filter
--Normals must be generated, achieved through paraview with generate normals filter
+-Normals are used if the file has them, otherwise smooth normals are generated from the triangles
+Triangles take a fast path, other polygons are triangulated on the fly so the Paraview triangle filter is optional.
 
 """
 import numpy as np
 import time
-import sys
+import os
 import threading
-from vtkmodules.vtkIOXML import vtkXMLPolyDataReader
-from vtk import vtkOBJReader, vtkGLTFReader, vtkPLYReader
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from vtkmodules.numpy_interface import dataset_adapter as dsa
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from Triangulator import triangulate_cells
+from Extraction import extract_points, extract_normals, extract_colors, colors_to_0_1, scale_points
+from Color_Mapping import map_scalars, random_colors
+from Normals import ensure_normals
+from Reader_Registry import read_polydata
+
+logger = logging.getLogger(__name__)
 
 class Properties:
     """
@@ -36,159 +47,167 @@ class Properties:
         self.scalars = np.array([])
         self.colors = np.array([])
 
-def handleColor(s_array):
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+### Elements per chunk job, big enough that the pool overhead is negligible
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _reset_pool_after_fork():
+    ### A forked process (e.g. a Batch_Strainer worker) inherits the pool without its threads, start a new one there
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+def get_thread_pool():
+    """
+    Shared thread pool used for the chunk jobs, created on first use with DEFAULT_WORKERS threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="strainer")
+        return _pool
+
+def set_thread_pool(workers):
+    """
+    Replace the shared thread pool with one of the given size. Jobs already running on the old pool finish.
+    :param workers: number of threads
+    """
+    global _pool
+    ### The old pool is not shut down, callers still holding it keep submitting to it.
+    ### Its threads exit once their work is done and the last reference to it is gone.
+    with _pool_lock:
+        _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="strainer")
+
+def parallel_chunks(function, total, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Run function(start, stop) over [0, total) in chunks on the thread pool.
+    A single chunk runs in the calling thread.
+    :return: list of the chunks' results in order
+    """
+    bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    if len(bounds) <= 1:
+        return [function(start, stop) for start, stop in bounds]
+    pool = pool or get_thread_pool()
+    futures = [pool.submit(function, start, stop) for start, stop in bounds]
+    return [future.result() for future in futures]
+
+def parallel_astype(array, dtype, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    array converted to dtype, the copy split into chunks along the first axis. No copy if the dtype already matches.
+    """
+    if array.dtype == dtype:
+        return array
+    converted = np.empty(array.shape, dtype=dtype)
+    def copy(start, stop):
+        converted[start:stop] = array[start:stop]
+    parallel_chunks(copy, len(array), pool, chunk_size)
+    return converted
+
+def scalar_range(values, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    (min, max) of a scalar array over all its chunks, for multi component arrays of the magnitude as map_scalars uses it.
+    Chunks are colored against this one range, otherwise every chunk would stretch the colormap over its own values.
+    """
+    def chunk_range(start, stop):
+        chunk = values[start:stop]
+        if chunk.ndim == 2:
+            chunk = chunk[:, 0] if chunk.shape[1] == 1 else np.linalg.norm(chunk, axis=1)
+        return np.nanmin(chunk), np.nanmax(chunk)
+    if len(values) == 0:
+        return None
+    ranges = parallel_chunks(chunk_range, len(values), pool, chunk_size)
+    return min(low for low, high in ranges), max(high for low, high in ranges)
+
+def handleColor(s_array, data, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Extract and process color data from the input data and store it in the 'data' object.
-    Parameters: s_array: Input data, numpy wrapper
-    Returns: None, assigns property of global data class
+    Parameters: s_array: Input data, numpy wrapper, data: Properties to fill
+    Returns: None, assigns data.colors
     """
     stcolor = time.time()
-    point_data = s_array.PointData
-    point_data_array_names = point_data.keys()
-    result_dict = [0]  # Dictionary to store the names that are present in the set
-        ### height values for optional coloring by height, optional
-    names_to_check = ["RGB", "RGBA", "SCALARS", "Scalars", "Scalars_"]
-    for name in names_to_check:
-        if name in point_data_array_names:
-            result_dict[0] = name
-    try: 
-        colors = np.array(s_array.PointData[result_dict[0]], dtype = int)
-    except:
-        print("no colors available")
-    ### concert to_0_1 might not even be neccesary
-    #finished_colors = convert_to_0_1_scale(colors)
+    ### native dtype view, PLY colors are read as uint8 and converted to 0-1 float32 in chunks like every other strainer
+    colors = extract_colors(s_array.VTKObject)
+    if colors is None or len(colors) == 0:
+        logger.debug("no colors available")
+    elif colors.ndim == 1 or colors.shape[1] not in (3, 4):
+        ### scalar array, map it through the colormap table in chunks over the full data range
+        value_range = scalar_range(colors, pool, chunk_size)
+        data.colors = np.concatenate(parallel_chunks(lambda start, stop: map_scalars(colors[start:stop], value_range=value_range, dtype=np.float32),
+                                                     len(colors), pool, chunk_size))
+    else:
+        data.colors = np.concatenate(parallel_chunks(lambda start, stop: colors_to_0_1(colors[start:stop]),
+                                                     len(colors), pool, chunk_size))
     endcolor = time.time()
-    print("Time of colors", stcolor-endcolor)
-    data.colors = colors
+    logger.debug("time of colors %.4f s", endcolor - stcolor)
     return
 
-### This version assumes ParaView triangle filter is applied. 
-def handlePolygons(s_array):
+def handlePolygons(s_array, data, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Processes polygon data and stores it in the data object.
-    Parameters: s_array: Input data, numpy wrapper
+    Reads the offsets/connectivity arrays directly. If every cell is a triangle (e.g. the ParaView triangle filter was applied)
+    the connectivity array is the index buffer as is, otherwise polygons are fan triangulated by the shared triangulator.
+    Parameters: s_array: Input data, numpy wrapper, data: Properties to fill
     Returns: None, assigns data.polygons
     """
     stpp = time.time()
-    polygons = np.array(s_array.GetPolygons())
-    
-    remainder = len(polygons) % 3
-    polygons2 = polygons[:-remainder]
-    point_indices = polygons2.reshape(-1,3)
+    polys = s_array.VTKObject.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray())
+    connectivity = vtk_to_numpy(polys.GetConnectivityArray())
+    all_triangles = len(offsets) > 1 and all(parallel_chunks(
+        lambda start, stop: np.all(offsets[start + 1:stop + 1] - offsets[start:stop] == 3), len(offsets) - 1, pool, chunk_size))
+    if all_triangles:
+        point_indices = parallel_astype(connectivity, np.uint32, pool, chunk_size).reshape(-1,3)
+    else:
+        point_indices = triangulate_cells(offsets, connectivity)
     data.polygons = point_indices
-# Reshape the array into a 2D array with 3 columns
     endpp = time.time()
-    print("here are poly",point_indices[100])
-    print("time of polys", endpp-stpp)
+    logger.debug("time of polys %.4f s", endpp - stpp)
     return 
 
-    """
-    #### Slower Version that alters data less
-    num_polygons = len(polygons)
-    point_indices = np.empty((num_polygons,3), dtype = int)
-    index = 0 
-    while index < num_polygons:
-        num_vertices = polygons[index]
-        polygon_vertices = polygons[index+1:index+1+num_vertices]
-        point_indices[index] = polygon_vertices
-        index += num_vertices + 1
-    """
-
-def handlepoints(s_array):
+def handlepoints(s_array, data, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
     """
     Processes point data and stores it in the data object.
-    Parameters: s_array: Input data, numpy wrapper
+    Parameters: s_array: Input data, numpy wrapper, data: Properties to fill
     Returns: None, assigns data.points
     """
     st = time.time()
-    num_points = len(s_array.Points)
-    points = np.array(s_array.Points)
-    data.points = points
+    ### native dtype view, float64 points are converted to float32 in chunks
+    data.points = parallel_astype(extract_points(s_array.VTKObject, dtype=None), np.float32, pool, chunk_size)
     end = time.time()
-    print("time of points", end-st)
+    logger.debug("time of points %.4f s", end - st)
     return
 
 
-def handleNormals(s_array):
-    st_norm = time.time()
-    index1 = 0
-    ### package normals
+def handleNormals(s_array, data, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
     """
-    try:
-        num_normals = s_array.GetPointData().GetNormals().GetNumberOfTuples()
-        normal_array = np.empty((num_normals,3), dtype = float)
-        
-    except Exception as e:
-        print("No normals available, generate with Rigatoni")
-    if s_array.GetPointData().GetNormals():
-        while(index1 < num_normals ):
-            norm = s_array.GetPointData().GetNormals().GetTuple(index1)
-            normal_array[index1] = norm
-            index1 += 1
-    end_norm = time.time()
-    data.normals = normal_array
+    Processes normal data and stores it in the data object, missing normals are generated by threading_strainer.
+    Parameters: s_array: Input data, numpy wrapper, data: Properties to fill
+    Returns: None, assigns data.normals
     """
-    if s_array.GetPointData().GetNormals():
-        normal_array = np.array(s_array.GetPointData().GetNormals(), dtype = float)
-        data.normals = normal_array
+    st_norm = time.time()
+    normal_array = extract_normals(s_array.VTKObject, dtype=None)
+    if normal_array is not None:
+        data.normals = parallel_astype(normal_array, np.float32, pool, chunk_size)
     else:
-        print("no normals available")
+        logger.debug("no normals available, generating them")
     end_norm = time.time()
-    print("time of normals", st_norm-end_norm)
+    logger.debug("time of normals %.4f s", end_norm - st_norm)
     return 
 
 ### Extra Functions that can be used as needed. 
 def convert_to_0_1_scale(color_data):
     """
     Converts 0-255 rgb values to 0-1 scale. 
-    :param color_data: list of lists, containg color dat 0-255
-    :returns correct list of lists. 
+    :param color_data: array or list of lists, containg color dat 0-255
+    :returns (N,4) float32 RGBA array. 
     """
-    converted_data = []
-    for color in color_data:
-        if len(color) == 3:
-            converted_color = [channel / 255.0 for channel in color]
-            converted_color.append(1.0)
-            converted_data.append(converted_color)
-        if len(color) == 4:
-            converted_color = [channel / 255.0 for channel in color]
-            converted_data.append(converted_color)
-    return converted_data  
-
-def consume_faces(points, polygons):
-    """
-    Large part taken from pywavefront github
-    Consume polygons and output triangles. May not be the most efficent way to create triangles.
-
-    :param points: A list of points representing the vertices of the polygons.
-    :param polygons: A list of polygons, where each polygon is a list of indices representing the vertices.
-    :return: A list of triangles representing the polygons.
-    """
-    collected_faces = []  # List to store triangles
-
-    # Helper function to append triangles
-    def emit_triangle(v1, v2, v3):
-        collected_faces.append([v1, v2, v3]) 
-    for polygon in polygons:
-        num_vertices = len(polygon)
-
-        if num_vertices < 3:
-            continue 
-
-        # Emit the first triangle of the polygon
-        v1 = polygon[0]
-        v2 = polygon[1]
-        v3 = polygon[2]
-        emit_triangle(v1, v2, v3)
-
-        # triangulate rest of triangles by pinning down v1 and moving through points
-        for i in range(3, num_vertices):
-            v_current = polygon[i]
-            v_last = polygon[i - 1]
-            emit_triangle(v1, v_last, v_current)
-
-    return collected_faces
-
+    return colors_to_0_1(color_data)
 
 def generate_colors_for_polygons(vertices, polygons, values, cmap='cool'):
     """
@@ -196,88 +215,59 @@ def generate_colors_for_polygons(vertices, polygons, values, cmap='cool'):
     :param vertices: a list of polygon points
     :param polygons: A list of polygons, where each polygon is a list of indices representing the vertices.
     :param values: Values corresponding to each point, will be normalized in 0-1 range and used for coloring. Lack of values results in random coloring.
-    _param cmap: matplot color map, default to inferno but can be overridden. 
-    :return: A list of colors correspionding to .
+    _param cmap: matplot color map, default to cool but can be overridden. 
+    :return: (N,4) float32 RGBA array of colors corresponding to the vertices, looked up in one vectorized pass.
     """
-    if values == None:
-        values = np.random.rand(len(vertices))
-        print(len(values))
-    else:
-        # Normalize values to the range [0, 1]
-        values = np.array(values)
-        values = (values - values.min()) / (values.max() - values.min())
-    # Create a color map
-    colormap = plt.get_cmap(cmap)
-
-    colors = []
-    for val in values:
-        # 9/22 subscripting is not needed for total random gen. Confused why I needed it before. 
-        rgba_color = colormap(val)
-
-        red = round(rgba_color[0],3)
-        green = round(rgba_color[1],3)
-        blue = round(rgba_color[2],3)
-
-        colors.append([red, green, blue,1.0])
-
-    return colors
+    if values is None:
+        return random_colors(len(vertices), cmap)
+    # Normalize values to the range [0, 1] and look them up in the colormap table
+    return map_scalars(values, cmap, dtype=np.float32)
 
 def Scale_by(oldpoints,scalefactor):
-    points = []
-    for point in oldpoints:
-        new_point = []
-        i = 0
-        while i < 3:
-            new_one_dim = point[i] * scalefactor
-            new_point.append(new_one_dim)
-            i+=1
-        points.append(new_point)
-    return points
+    """
+    Scale points by a uniform factor.
+    :param oldpoints: (N,3) array or list of points
+    :param scalefactor: scale to apply
+    :returns (N,3) float32 array, scaled in place when oldpoints is already a float32 array we own
+    """
+    return scale_points(np.asarray(oldpoints, dtype=np.float32), scalefactor)
 
-def threading_strainer(filename):
+def threading_strainer(filename, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
     """
-    Reads a obj, vtp, ply, or gltf file and extracts relevant data into a custom format.
-    If a different file type is needed, add the import to this strainer. 
-    This is the most efficent strainer, requires polygons to be traingles with color and normal generation completed.
+    Reads a ply, obj, vtp, vtu, legacy vtk, stl, gltf or glb file and extracts relevant data into a custom format.
+    If a different file type is needed, add it with Reader_Registry.register_reader. 
+    This is the most efficent strainer. Reentrant, every call returns a fresh Properties and shares no state with other calls.
     Args:
         filename (str): The path to the VTK/Paraview file.
+        pool (ThreadPoolExecutor): Optional pool for the chunk jobs, defaults to the shared pool (see set_thread_pool).
+        chunk_size (int): Elements per chunk job.
 
     Returns:
         data (Properties): An instance of the Properties class containing extracted data.
     """
-    global s_array
-    global data
-    data = Properties()
     st = time.time()
-    file_extension = filename[-3:]
-    if file_extension == "ply":
-        reader = vtkPLYReader()
-    elif file_extension == "obj":
-        reader = vtkOBJReader()
-    elif file_extension == "vtp":
-        reader = vtkXMLPolyDataReader()
-    else:
-        print("file type not standard, if vtk reader exists for file type, input manually")
-    reader.SetFileName(filename)
-    reader.Update()
-    s_array = dsa.WrapDataObject(reader.GetOutput())
-
-    t1 = threading.Thread(target=handlePolygons, args=(s_array,))
-    t2 = threading.Thread(target=handleNormals, args=(s_array,))
-    t3 = threading.Thread(target=handleColor, args=(s_array,))
-    t4 = threading.Thread(target=handlepoints, args=(s_array,))
-
-    t1.start()
-    t2.start()
-    t3.start()
-    t4.start()
+    ### The registry picks the reader by magic bytes or extension and extracts a surface from non polydata formats
+    data = strain_polydata(read_polydata(filename), pool, chunk_size)
+    et = time.time()
+    logger.debug("time of program %.4f s for %s", et - st, filename)
+    return data
 
+def strain_polydata(polydata, pool=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Strains an in memory vtkPolyData, e.g. the output of a live VTK pipeline, the same way threading_strainer strains files.
+    Args:
+        polydata (vtkPolyData): Data to strain, arrays that need no conversion are returned as views over its buffers.
+        pool (ThreadPoolExecutor): Optional pool for the chunk jobs.
+        chunk_size (int): Elements per chunk job.
 
-    t1.join()
-    t2.join()
-    t3.join()
-    t4.join()
-    # Now, you can access the processed data properties in the 'data' object.
-    et = time.time()
-    print("time of program", et-st)
-    return data
\ No newline at end of file
+    Returns:
+        data (Properties): An instance of the Properties class containing extracted data.
+    """
+    data = Properties()
+    s_array = dsa.WrapDataObject(polydata)
+    ### Each handler fills its own field, the heavy copies inside them run in chunks on the pool
+    for handler in (handlePolygons, handleNormals, handleColor, handlepoints):
+        handler(s_array, data, pool, chunk_size)
+    ### Normals need the triangles, so missing ones are generated once the polygons are in
+    ensure_normals(data)
+    return data
@@ -0,0 +1,174 @@
+"""
+Persistent on-disk cache of strained meshes.
+
+Strained arrays (points, polygons, normals, colors, scalars) are stored as raw .npy files, one folder per entry,
+so they can be memory mapped straight back in instead of re-parsing the source through VTK and re-triangulating.
+Entries are keyed by the file's path, mtime and size (or optionally a hash of its contents) plus the strainer and
+its options. The cache is bounded by size and the least recently used entries are evicted first.
+
+Example usage:
+    cache = StrainCache("~/.cache/vtk2noodles", max_bytes=8 * 2**30)
+    data = cache.strain("path/to/frame/10.ply")
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import numpy as np
+from Reader_Strainer_Threading import Properties, threading_strainer
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+CACHE_FIELDS = ["points", "polygons", "normals", "colors", "scalars"]
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "vtk2noodles")
+
+
+def _content_hash(filename, chunk_size=1 << 24):
+    digest = hashlib.sha1()
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _folder_size(path):
+    size = 0
+    for entry in os.scandir(path):
+        try:
+            size += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+    return size
+
+
+class StrainCache:
+    """
+    Size bounded, least recently used cache of strained meshes on disk.
+
+    Attributes:
+        cache_dir (str): Folder holding the entries.
+        max_bytes (int): Size limit, the least recently used entries are evicted above it.
+        use_content_hash (bool): Key by a hash of the file contents instead of path, mtime and size.
+        mmap (bool): Return memory mapped, read only arrays instead of loading them into memory.
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=4 * 2**30, use_content_hash=False, mmap=True):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_bytes = max_bytes
+        self.use_content_hash = use_content_hash
+        self.mmap = mmap
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, filename, strainer=threading_strainer, **options):
+        """
+        Cache key for a file strained by strainer with the given options.
+        """
+        if self.use_content_hash:
+            source = _content_hash(filename)
+        else:
+            stat = os.stat(filename)
+            source = "%s|%d|%d" % (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+        strainer_name = "%s.%s" % (getattr(strainer, "__module__", ""), getattr(strainer, "__qualname__", repr(strainer)))
+        option_text = repr(sorted(options.items()))
+        text = "%d|%s|%s|%s" % (CACHE_FORMAT_VERSION, source, strainer_name, option_text)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, filename, strainer=threading_strainer, **options):
+        """
+        Cached result for the file, None on a miss.
+        """
+        path = self._entry_path(self.key(filename, strainer, **options))
+        if not os.path.isdir(path):
+            return None
+        data = Properties()
+        try:
+            for field in CACHE_FIELDS:
+                field_path = os.path.join(path, field + ".npy")
+                if os.path.exists(field_path):
+                    setattr(data, field, np.load(field_path, mmap_mode="r" if self.mmap else None))
+            # Mark as recently used
+            os.utime(path)
+        except (FileNotFoundError, ValueError) as e:
+            # Evicted or half written by another process
+            logger.warning("strain cache entry unreadable, re-straining %s: %s", filename, e)
+            return None
+        return data
+
+    def put(self, filename, data, strainer=threading_strainer, **options):
+        """
+        Store a strained result. Written to a temporary folder first and moved into place, so readers never see partial entries.
+        """
+        path = self._entry_path(self.key(filename, strainer, **options))
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=".staging-")
+        try:
+            for field in CACHE_FIELDS:
+                array = getattr(data, field, None)
+                if array is None:
+                    continue
+                array = np.asarray(array)
+                if array.size == 0:
+                    continue
+                np.save(os.path.join(staging, field + ".npy"), np.ascontiguousarray(array))
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(staging, path)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            # Another process stored the same entry first
+            if not os.path.isdir(path):
+                raise
+        self.evict()
+
+    def strain(self, filename, strainer=threading_strainer, **options):
+        """
+        Strain a file through the cache, only running the strainer on a miss.
+
+        :param filename: file to strain
+        :param strainer: strainer function, threading_strainer by default
+        :param options: keyword arguments passed to the strainer, part of the key
+        :return: Properties with the strained arrays
+        """
+        data = self.get(filename, strainer, **options)
+        if data is not None:
+            return data
+        data = strainer(filename, **options)
+        self.put(filename, data, strainer, **options)
+        return data
+
+    def entries(self):
+        """
+        Entries as (last used time, size, path), least recently used first.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, _folder_size(entry.path), entry.path))
+            except FileNotFoundError:
+                pass
+        entries.sort()
+        return entries
+
+    def size(self):
+        """Total size of the cache in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Remove every entry."""
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
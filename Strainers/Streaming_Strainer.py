@@ -0,0 +1,388 @@
+"""
+Out-of-core straining of meshes larger than memory.
+
+noodStrainer holds the whole VTK output and its NumPy copies at once. streaming_strainer instead works through a mesh
+in chunks of rows sized from a memory budget and appends every converted chunk to spill files, one raw file per field,
+which are memory mapped back read only at the end. Working memory stays around the budget, the arrays handed back
+are paged in from the OS page cache as they are used (and can be dropped by it again under memory pressure).
+
+What is streamed depends on the file:
+    binary PLY          vertex and face records are memory mapped and parsed a chunk of rows at a time
+    pieced XML files    .pvtp/.pvtu and multi piece .vtp/.vtu are read one piece at a time with piece requests
+Anything else is read in one go by its registered reader and only the strained arrays are spilled.
+
+Missing normals are accumulated over chunks of triangles straight into the spilled normals, and height colors are
+mapped over chunks of the spilled points, so neither step needs the whole mesh in memory. The output matches
+noodStrainer: points scaled by scalefactor, (M,3) uint32 triangles, float32 normals and float32 RGBA colors in 0-1.
+
+Example usage:
+    data = streaming_strainer("huge.ply", memory_budget=512 * 2**20)
+    publisher.publish(data)
+    remove_spill(data)
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+from Reader_Strainer_Threading import Properties
+from Reader_Registry import READERS, sniff, read_polydata, to_polydata
+from Triangulator import triangulate_cells, triangulate_polys
+from Extraction import extract_points, extract_normals, extract_colors, colors_to_0_1
+from Color_Mapping import map_scalars
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET = 256 * 2**20
+### Rough working memory per row: the input record plus the outputs and temporaries made while converting it
+VERTEX_ROW_BYTES = 256
+TRIANGLE_ROW_BYTES = 512
+MIN_CHUNK_ROWS = 1024
+PIECED_EXTENSIONS = (".pvtp", ".pvtu", ".vtp", ".vtu")
+MIXED_FACES_MESSAGE = "faces with different vertex counts can not be streamed, triangulate the file first"
+PLY_TYPES = {"char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1", "short": "i2", "int16": "i2",
+             "ushort": "u2", "uint16": "u2", "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+             "float": "f4", "float32": "f4", "double": "f8", "float64": "f8"}
+
+
+def chunk_rows(memory_budget, row_bytes):
+    """Rows per chunk that keep a chunk's working memory within the budget."""
+    return max(MIN_CHUNK_ROWS, int(memory_budget) // row_bytes)
+
+
+class SpillFiles:
+    """
+    Raw spill files in a folder, one per field, appended to chunk by chunk and memory mapped back when done.
+    """
+    def __init__(self, folder):
+        self.folder = folder
+        self._files = {}
+        # field: [dtype, row shape, rows]
+        self._layout = {}
+
+    def path(self, field):
+        return os.path.join(self.folder, field + ".bin")
+
+    def rows(self, field):
+        """Rows written to a field so far, 0 if it has none."""
+        return self._layout[field][2] if field in self._layout else 0
+
+    def write(self, field, array):
+        """Append rows to a field, every write to a field must have the same dtype and row shape."""
+        array = np.ascontiguousarray(array)
+        file = self._files.get(field)
+        if file is None:
+            if field in self._layout:
+                raise ValueError("spill file %s is already closed" % field)
+            file = self._files[field] = open(self.path(field), "wb")
+            self._layout[field] = [array.dtype, array.shape[1:], 0]
+        elif (array.dtype, array.shape[1:]) != tuple(self._layout[field][:2]):
+            raise ValueError("rows written to %s must all be %s %s" % (field, *self._layout[field][:2]))
+        array.tofile(file)
+        self._layout[field][2] += len(array)
+
+    def allocate(self, field, dtype, row_shape, rows):
+        """Zero filled field of a known size, mapped for writing."""
+        self.discard(field)
+        dtype = np.dtype(dtype)
+        with open(self.path(field), "wb") as file:
+            file.truncate(rows * dtype.itemsize * int(np.prod(row_shape)))
+        self._layout[field] = [dtype, tuple(row_shape), rows]
+        return self.map(field, "r+")
+
+    def discard(self, field):
+        """Drop a field and its file."""
+        file = self._files.pop(field, None)
+        if file is not None:
+            file.close()
+        if self._layout.pop(field, None) is not None:
+            os.remove(self.path(field))
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+
+    def map(self, field, mode="r"):
+        """Memory map of a field, closed for writing first, an empty array for fields without rows."""
+        if field not in self._layout:
+            return np.array([])
+        file = self._files.pop(field, None)
+        if file is not None:
+            file.close()
+        dtype, row_shape, rows = self._layout[field]
+        if rows == 0:
+            return np.empty((0,) + tuple(row_shape), dtype=dtype)
+        return np.memmap(self.path(field), dtype=dtype, mode=mode, shape=(rows,) + tuple(row_shape))
+
+
+def read_ply_header(filename):
+    """
+    Parse the header of a PLY file.
+
+    :return: (header length in bytes, "<" or ">" for binary files and None for ascii ones, elements),
+        elements is a list of (name, count, properties), a property is (name, type) or (name, count type, item type)
+        for lists, with NumPy type codes
+    :raises ValueError: if the file is not a valid PLY file
+    """
+    elements = []
+    byte_order = None
+    with open(filename, "rb") as file:
+        line = file.readline()
+        if line.strip() != b"ply":
+            raise ValueError("%s is not a PLY file" % filename)
+        header_length = len(line)
+        for line in file:
+            header_length += len(line)
+            words = line.decode("ascii", "replace").split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            try:
+                if words[0] == "end_header":
+                    return header_length, byte_order, elements
+                if words[0] == "format":
+                    byte_order = {"binary_little_endian": "<", "binary_big_endian": ">"}.get(words[1])
+                elif words[0] == "element":
+                    elements.append((words[1], int(words[2]), []))
+                elif words[0] == "property" and words[1] == "list":
+                    elements[-1][2].append((words[4], PLY_TYPES[words[2]], PLY_TYPES[words[3]]))
+                elif words[0] == "property":
+                    elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+            except (IndexError, KeyError, ValueError):
+                raise ValueError("bad PLY header line in %s: %r" % (filename, line))
+    raise ValueError("%s has no end_header" % filename)
+
+
+def _record_dtype(properties, byte_order, list_length=None):
+    """Structured dtype of a PLY element's records, a list property becomes its count plus list_length items."""
+    fields = []
+    for prop in properties:
+        if len(prop) == 3:
+            fields.append((prop[0] + "_count", byte_order + prop[1]))
+            fields.append((prop[0], byte_order + prop[2], (list_length,)))
+        else:
+            fields.append((prop[0], byte_order + prop[1]))
+    return np.dtype(fields)
+
+
+def _spill_ply_vertices(records, spill, scalefactor, rows):
+    names = records.dtype.names
+    for start in range(0, len(records), rows):
+        block = records[start:start + rows]
+        points = np.empty((len(block), 3), dtype=np.float32)
+        for axis, name in enumerate(("x", "y", "z")):
+            points[:, axis] = block[name]
+        if scalefactor != 1:
+            points *= np.float32(scalefactor)
+        spill.write("points", points)
+        if all(name in names for name in ("nx", "ny", "nz")):
+            spill.write("normals", np.stack([block["nx"], block["ny"], block["nz"]], axis=1).astype(np.float32))
+        channels = [name for name in ("red", "green", "blue", "alpha") if name in names]
+        if len(channels) >= 3:
+            spill.write("colors", colors_to_0_1(np.stack([block[name] for name in channels], axis=1)))
+
+
+def _spill_ply_faces(records, index_name, spill, rows, vertex_count):
+    corners = records.dtype[index_name].shape[0]
+    offsets = np.arange(0, corners * rows + 1, corners, dtype=np.int64)
+    for start in range(0, len(records), rows):
+        block = records[start:start + rows]
+        if np.any(block[index_name + "_count"] != corners):
+            raise ValueError(MIXED_FACES_MESSAGE)
+        indices = block[index_name].reshape(-1)
+        if len(indices) and (indices.min() < 0 or indices.max() >= vertex_count):
+            raise ValueError("face index out of range")
+        spill.write("polygons", triangulate_cells(offsets[:len(block) + 1], indices))
+
+
+def stream_ply(filename, spill, scalefactor=1, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Spill the points, triangles and (when present) normals and RGB(A) colors of a binary PLY file chunk by chunk.
+    Records are read through a memory map of the file. Faces are fan triangulated, every face must have the same
+    number of vertices so records have a fixed size (true of the triangle meshes VTK and ParaView write).
+
+    :param spill: SpillFiles receiving "points", "polygons", "normals" and "colors"
+    :raises ValueError: for ascii files and faces of mixed sizes
+    """
+    header_length, byte_order, elements = read_ply_header(filename)
+    if byte_order is None:
+        raise ValueError("%s is an ascii PLY file, only binary ones are streamed" % filename)
+    offset = header_length
+    vertex_count = 0
+    for name, count, properties in elements:
+        lists = [prop for prop in properties if len(prop) == 3]
+        if not lists:
+            dtype = _record_dtype(properties, byte_order)
+        elif count == 0:
+            continue
+        elif name == "face" and len(lists) == 1 and lists[0][0] in ("vertex_indices", "vertex_index"):
+            # The first face's vertex count fixes the record size
+            head = _record_dtype(properties[:properties.index(lists[0]) + 1], byte_order, 0)
+            first = np.fromfile(filename, dtype=head, count=1, offset=offset)
+            dtype = _record_dtype(properties, byte_order, int(first[lists[0][0] + "_count"][0]))
+            if offset + count * dtype.itemsize > os.path.getsize(filename):
+                raise ValueError(MIXED_FACES_MESSAGE)
+        else:
+            # Record size unknown, nothing after this element can be located
+            break
+        if count and name == "vertex" and not lists:
+            records = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(count,))
+            _spill_ply_vertices(records, spill, scalefactor, chunk_rows(memory_budget, VERTEX_ROW_BYTES))
+            vertex_count = count
+        elif name == "face" and lists:
+            records = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(count,))
+            _spill_ply_faces(records, lists[0][0], spill, chunk_rows(memory_budget, TRIANGLE_ROW_BYTES), vertex_count)
+        offset += count * dtype.itemsize
+
+
+def _spill_polydata(polydata, spill, scalefactor, offset):
+    """Spill one vtkPolyData, its triangle indices shifted by offset. Returns its number of points."""
+    count = polydata.GetNumberOfPoints()
+    if offset + count > np.iinfo(np.uint32).max:
+        raise ValueError("too many vertices for 32 bit indices")
+    spill.write("points", extract_points(polydata, scalefactor))
+    spill.write("polygons", triangulate_polys(polydata.GetPolys()) + np.uint32(offset))
+    normals = extract_normals(polydata)
+    if normals is not None:
+        spill.write("normals", normals)
+    colors = extract_colors(polydata)
+    # Scalar arrays under a color name are not RGB(A), those pieces get height colors instead
+    if colors is not None and colors.ndim == 2 and colors.shape[1] in (3, 4):
+        spill.write("colors", colors_to_0_1(colors))
+    return count
+
+
+def stream_pieces(filename, spill, scalefactor=1, extension=None):
+    """
+    Spill a pieced XML file (.pvtp/.pvtu, or a .vtp/.vtu written with several pieces) one piece at a time
+    through piece requests, only one piece is in memory at a time. Vertices shared by neighbouring pieces are
+    duplicated, as in the file.
+
+    :return: number of pieces read, 0 if the file has a single piece and nothing was spilled
+    """
+    reader = READERS[extension or sniff(filename)]()
+    reader.SetFileName(filename)
+    reader.UpdateInformation()
+    pieces = reader.GetNumberOfPieces() if hasattr(reader, "GetNumberOfPieces") else 1
+    if pieces <= 1:
+        return 0
+    offset = 0
+    for piece in range(pieces):
+        reader.UpdatePiece(piece, pieces, 0)
+        offset += _spill_polydata(to_polydata(reader.GetOutputDataObject(0)), spill, scalefactor, offset)
+    return pieces
+
+
+def accumulate_normals(points, triangles, normals, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """
+    Area weighted smooth normals computed over chunks of triangles, as Normals.vertex_normals does for a whole mesh.
+    Face normals are summed into normals (a zeroed, writable memory map of the same length as points) and the
+    sums are normalized in place afterwards.
+
+    :param points: (N,3) positions, usually a memory map
+    :param triangles: (M,3) triangle indices, usually a memory map
+    :param normals: (N,3) float32 zeros, filled in place
+    """
+    rows = chunk_rows(memory_budget, TRIANGLE_ROW_BYTES)
+    for start in range(0, len(triangles), rows):
+        flat = np.asarray(triangles[start:start + rows], dtype=np.intp).reshape(-1)
+        corners = np.asarray(points[flat], dtype=np.float64).reshape(-1, 3, 3)
+        # Cross products are face normals scaled by twice the triangle area
+        faces = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        # Sum the corners of the chunk per vertex, then add each vertex's sum to the map once
+        order = np.argsort(flat, kind="stable")
+        keys = flat[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        sums = np.add.reduceat(faces[order // 3], starts, axis=0)
+        vertices = keys[starts]
+        normals[vertices] += sums.astype(np.float32)
+    rows = chunk_rows(memory_budget, VERTEX_ROW_BYTES)
+    for start in range(0, len(normals), rows):
+        block = normals[start:start + rows]
+        lengths = np.linalg.norm(block, axis=1, keepdims=True)
+        lengths[lengths == 0] = 1
+        block /= lengths
+    return normals
+
+
+def spill_height_colors(points, spill, cmap="cool", color_range=None, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """Spill float32 RGBA colors mapping each point's height through cmap, over the data range by default."""
+    rows = chunk_rows(memory_budget, VERTEX_ROW_BYTES)
+    if color_range is None:
+        low, high = np.inf, -np.inf
+        for start in range(0, len(points), rows):
+            heights = points[start:start + rows, 1]
+            low, high = min(low, float(heights.min())), max(high, float(heights.max()))
+        color_range = (low, high)
+    for start in range(0, len(points), rows):
+        spill.write("colors", map_scalars(points[start:start + rows, 1], cmap, color_range, dtype=np.float32))
+
+
+def streaming_strainer(filename, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None, scalefactor=0.5, cmap='cool',
+                       color_range=None):
+    """
+    Strain a mesh chunk by chunk into memory mapped spill files, keeping working memory around memory_budget.
+
+    :param filename: binary PLY, pieced XML file or any registered format (read whole, see the module docstring)
+    :param memory_budget: bytes of working memory, sets the number of rows converted at a time
+    :param spill_dir: folder the spill folder is created in, the system temporary folder by default
+    :param scalefactor: uniform scale applied to the points, 0.5 like noodStrainer
+    :param cmap: matplotlib colormap for height coloring when the file has no RGB(A) colors
+    :param color_range: optional (min, max) height range mapped onto cmap, defaults to the data range
+    :return: Properties of read only memory maps, its spill_dir attribute is the folder to delete (remove_spill)
+        once the arrays are no longer used
+    """
+    folder = tempfile.mkdtemp(prefix="vtk2noodles-spill-", dir=spill_dir)
+    spill = SpillFiles(folder)
+    try:
+        extension = sniff(filename)
+        if extension == ".ply" and read_ply_header(filename)[1] is not None:
+            stream_ply(filename, spill, scalefactor, memory_budget)
+        elif not (extension in PIECED_EXTENSIONS and stream_pieces(filename, spill, scalefactor, extension)):
+            logger.info("no pieces to stream in %s, reading it whole", filename)
+            _spill_polydata(read_polydata(filename), spill, scalefactor, 0)
+        points = spill.map("points")
+        if spill.rows("normals") != len(points):
+            # None, or only some pieces had normals
+            normals = spill.allocate("normals", np.float32, (3,), len(points))
+            accumulate_normals(points, spill.map("polygons"), normals, memory_budget)
+            normals.flush()
+            del normals
+        if spill.rows("colors") != len(points):
+            spill.discard("colors")
+            spill_height_colors(points, spill, cmap, color_range, memory_budget)
+        data = Properties()
+        data.points = points
+        for field in ("polygons", "normals", "colors"):
+            setattr(data, field, spill.map(field))
+        data.spill_dir = folder
+        return data
+    except BaseException:
+        spill.close()
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+
+
+def remove_spill(data):
+    """Delete the spill files behind streamed data, its arrays are emptied."""
+    folder = getattr(data, "spill_dir", None)
+    for field in ("points", "polygons", "normals", "colors"):
+        setattr(data, field, np.array([]))
+    if folder is not None:
+        shutil.rmtree(folder, ignore_errors=True)
+        data.spill_dir = None
+
+
+if __name__ == "__main__":
+    import resource
+    import time
+    if len(sys.argv) < 2:
+        print("usage: python Streaming_Strainer.py path/to/mesh.ply [memory budget in MiB]")
+        sys.exit(1)
+    budget = int(sys.argv[2]) * 2**20 if len(sys.argv) > 2 else DEFAULT_MEMORY_BUDGET
+    start = time.time()
+    data = streaming_strainer(sys.argv[1], budget)
+    print("strained", len(data.points), "points", len(data.polygons), "triangles in", time.time() - start,
+          "peak memory", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024, "MiB")
+    remove_spill(data)
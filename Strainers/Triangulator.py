@@ -0,0 +1,78 @@
+"""
+Shared triangulation engine for the NOODLES strainers.
+
+Works directly on the offsets/connectivity arrays that back a vtkCellArray and
+fans every polygon into triangles with NumPy, so no Python level loop over cells is needed.
+Output ordering matches the consume_faces fan used by the strainers before (based on pywavefront):
+for a polygon (v0, v1, ... vn) the triangles are (v0, v1, v2), (v0, v2, v3) ... (v0, vn-1, vn),
+polygons are emitted in cell order and cells with fewer than 3 vertices are skipped.
+"""
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+
+def triangulate_cells(offsets, connectivity):
+    """
+    Fan triangulate cells described by VTK style offsets and connectivity arrays.
+
+    :param offsets: array of length num_cells + 1, cell i spans connectivity[offsets[i]:offsets[i+1]]
+    :param connectivity: flat array of point indices
+    :return: (N,3) uint32 array of triangle indices
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    connectivity = np.asarray(connectivity)
+    if len(offsets) < 2:
+        return np.empty((0, 3), dtype=np.uint32)
+
+    sizes = np.diff(offsets)
+    # Fast path, every cell is already a triangle
+    if np.all(sizes == 3):
+        start = offsets[0]
+        return connectivity[start:start + 3 * len(sizes)].astype(np.uint32, copy=False).reshape(-1, 3)
+
+    tris_per_cell = np.maximum(sizes - 2, 0)
+    num_tris = int(tris_per_cell.sum())
+    if num_tris == 0:
+        return np.empty((0, 3), dtype=np.uint32)
+
+    # Cell start for every output triangle, plus the triangle's position inside its fan
+    cell_starts = np.repeat(offsets[:-1], tris_per_cell)
+    first_tri = np.cumsum(tris_per_cell) - tris_per_cell
+    local = np.arange(num_tris, dtype=np.int64) - np.repeat(first_tri, tris_per_cell)
+
+    triangles = np.empty((num_tris, 3), dtype=np.uint32)
+    triangles[:, 0] = connectivity[cell_starts]
+    triangles[:, 1] = connectivity[cell_starts + local + 1]
+    triangles[:, 2] = connectivity[cell_starts + local + 2]
+    return triangles
+
+
+def triangulate_polys(cell_array):
+    """
+    Triangulate a vtkCellArray (for example polydata.GetPolys()).
+
+    :param cell_array: vtkCellArray holding polygons
+    :return: (N,3) uint32 array of triangle indices
+    """
+    if cell_array is None or cell_array.GetNumberOfCells() == 0:
+        return np.empty((0, 3), dtype=np.uint32)
+    offsets = vtk_to_numpy(cell_array.GetOffsetsArray())
+    connectivity = vtk_to_numpy(cell_array.GetConnectivityArray())
+    return triangulate_cells(offsets, connectivity)
+
+
+def consume_faces(points, polygons):
+    """
+    Drop in replacement for the old per polygon consume_faces.
+
+    :param points: unused, kept so existing calls keep working
+    :param polygons: A list of polygons, where each polygon is a list of indices representing the vertices.
+    :return: (N,3) uint32 array of triangles representing the polygons.
+    """
+    sizes = np.fromiter((len(polygon) for polygon in polygons), dtype=np.int64, count=len(polygons))
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    if offsets[-1] == 0:
+        return np.empty((0, 3), dtype=np.uint32)
+    connectivity = np.concatenate([np.asarray(polygon, dtype=np.int64) for polygon in polygons])
+    return triangulate_cells(offsets, connectivity)
@@ -1,8 +1,17 @@
+import asyncio
+import logging
 import vtk
 from VTKnamedColorsNOODLES import VTKColors
-from vtk import vtkTriangleFilter, vtkPolyDataMapper, vtkPolyDataNormals, vtkStaticCleanPolyData
+from vtk import vtkTriangleFilter, vtkPolyDataMapper
 import numpy as np
 import matplotlib.pyplot as plt
+from Triangulator import triangulate_polys
+from Extraction import as_array, extract_points, extract_normals
+from Color_Mapping import map_scalars, random_colors
+from Mesh_Cleaning import prepare_mesh
+
+logger = logging.getLogger(__name__)
+
 class Properties:
     """
     Class representing properties of an object.
@@ -40,48 +49,160 @@ def mapperStrainer(mapper):
     list 2: normals
     list 3: scalars (if they exist)
     """
-    data = Properties()
     mapper.Update()
     # Access the polydata
     polyData = mapper.GetInput()
     if polyData == None:
         errormessage("No polydata provided, try updating mapper before passing through the filter")
-    #Run data through filtering process
-    completeData = cleanData(triangulate(makeNormals(polyData)))
-    #Access vertices
-    vertices = GetPoints(completeData)
-    pointDataholder = []
-    pointDataholder = AccessPointData(completeData)
-    normals = pointDataholder[0]
-    scalars = pointDataholder[1]
-    polygons = getPolygons(completeData)
+    completeData = prepareData(polyData)
     ### Input values corresponding to vertices or chosen color map as third and fourth arguments
-    colors = generate_colors_for_polygons(vertices,polygons)
+    colors = generate_colors_for_polygons(completeData.points, completeData.polygons)
     data = Properties()
-    data.points = vertices
-    data.polygons = polygons
-    data.normals = normals
-    data.scalars = scalars
+    data.points = completeData.points
+    data.polygons = completeData.polygons
+    data.normals = completeData.normals
+    data.scalars = completeData.scalars
     data.colors = colors
     return data
 
-def makeNormals(polydata):
+def prepareData(polyData):
     """
-    Passes input polydata through vtk make normals filter. 
+    Triangulate, weld and clean polydata and make normals if it has none, in one pass over views of its arrays.
 
     Parameters
     ----------
-    polydata: vtkPolyData
+    polyData: vtkPolyData
 
-    Returns 
+    Returns
     ----------
-    polydata that contains normal data.
+    Properties from Mesh_Cleaning.prepare_mesh, vertex_ids maps every output vertex to its input point
+    """
+    #Triangle strips still go through the vtk filter, polygons are fanned by the shared triangulator
+    if polyData.GetNumberOfStrips() > 0:
+        polyData = triangulate(polyData)
+    #Run the views over the vtk arrays through the fused weld/clean/normals stage
+    rawData = Properties()
+    rawData.points = GetPoints(polyData)
+    rawData.polygons = getPolygons(polyData)
+    rawData.normals, rawData.scalars = AccessPointData(polyData)
+    return prepare_mesh(rawData)
+
+def _mtime(vtk_object):
+    return None if vtk_object is None else vtk_object.GetMTime()
+
+class WatchedMapper:
     """
-    normalMaker = vtkPolyDataNormals()
-    normalMaker.SetInputData(polydata)
-    normalMaker.Update()
-    normalPolydata = normalMaker.GetOutput()
-    return normalPolydata
+    Mapper strainer that only redoes the work the last pipeline change requires.
+
+    Every poll updates the mapper (VTK itself skips filters that did not change) and compares the modification
+    times of the input's points, cells, normals and scalars with the ones seen last. Nothing changed means no work
+    at all, changed scalars only re-gather and recolor them, changed normals only re-gather them, and the full
+    triangulate/weld/clean pass only runs when the geometry changed.
+    With a FramePublisher every change is pushed to the server, in delta mode only the changed streams are sent.
+
+    Attributes:
+        data (Properties): Latest strained data, None before the first poll.
+        polls (int): Number of polls, restrains (int): Full passes, recolors (int): Scalar or normal only updates,
+        errors (int): Polls that raised, watch logs them and keeps polling.
+
+    Example usage:
+        watched = WatchedMapper(mapper, publisher)
+        watched.start(interval=0.1)   # on the server's event loop
+    """
+    def __init__(self, mapper, publisher=None, cmap='cool', value_range=None):
+        """
+        :param mapper: vtkPolyDataMapper to watch
+        :param publisher: optional FramePublisher changes are pushed to
+        :param cmap: colormap scalars are colored with
+        :param value_range: scalar range mapped onto cmap, defaults to the data range
+        """
+        self.mapper = mapper
+        self.publisher = publisher
+        self.cmap = cmap
+        self.value_range = value_range
+        self.data = None
+        self.polls = 0
+        self.restrains = 0
+        self.recolors = 0
+        self.errors = 0
+        self._mtimes = None
+        self._task = None
+
+    def _input_mtimes(self, polyData):
+        pointData = polyData.GetPointData()
+        normals = pointData.GetNormals() or pointData.GetArray("Normals")
+        return {
+            "geometry": (_mtime(polyData.GetPoints()), _mtime(polyData.GetPolys()), _mtime(polyData.GetStrips())),
+            "normals": _mtime(normals),
+            "scalars": _mtime(pointData.GetScalars()),
+        }
+
+    def _colors(self, data):
+        if len(data.scalars) != len(data.points):
+            return generate_colors_for_polygons(data.points, data.polygons)
+        return map_scalars(data.scalars, self.cmap, self.value_range, dtype=np.float32)
+
+    def poll(self):
+        """
+        Bring the strained data up to date with the pipeline.
+
+        Returns
+        ----------
+        set of the fields that changed, empty when nothing did
+        """
+        self.polls += 1
+        self.mapper.Update()
+        polyData = self.mapper.GetInput()
+        if polyData is None:
+            errormessage("No polydata provided, try updating mapper before passing through the filter")
+            return set()
+        mtimes = self._input_mtimes(polyData)
+        if mtimes == self._mtimes:
+            return set()
+        previous, self._mtimes = self._mtimes, mtimes
+        if previous is None or mtimes["geometry"] != previous["geometry"]:
+            self.data = prepareData(polyData)
+            self.data.colors = self._colors(self.data)
+            self.restrains += 1
+            changed = {"points", "polygons", "normals", "scalars", "colors"}
+        else:
+            # Same vertices as last time, per point arrays only need to be gathered through vertex_ids again
+            changed = set()
+            normals, scalars = AccessPointData(polyData)
+            if mtimes["normals"] != previous["normals"] and len(normals):
+                self.data.normals = np.asarray(normals)[self.data.vertex_ids]
+                changed.add("normals")
+            if mtimes["scalars"] != previous["scalars"]:
+                self.data.scalars = np.asarray(scalars)[self.data.vertex_ids] if len(scalars) else []
+                self.data.colors = self._colors(self.data)
+                changed |= {"scalars", "colors"}
+            if changed:
+                self.recolors += 1
+        if changed and self.publisher is not None:
+            self.publisher.publish(self.data)
+        return changed
+
+    async def watch(self, interval=0.1):
+        """Poll every interval seconds until cancelled. A failing poll is logged and polling goes on."""
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                self.errors += 1
+                logger.exception("polling the watched mapper failed")
+            await asyncio.sleep(interval)
+
+    def start(self, interval=0.1):
+        """Start watching as a task on the running event loop, e.g. from a Rigatoni method handler."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.watch(interval))
+        return self._task
+
+    def stop(self):
+        """Stop watching."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
 
     #Triangulate data
 def triangulate(polydata):
@@ -103,27 +224,6 @@ def triangulate(polydata):
     triPolydata= Tryifyoucan.GetOutput()
     return triPolydata
 
-    # Clean the data (merge duplicate points, and/or remove unused points and/or remove degenerate cells)
-def cleanData(polydata):
-    """
-    Passes input polydata through vtkStaticClean filter.
-    Static Clean does the following tasks: merge duplicate points, and/or remove unused points and/or remove degenerate cells
-    Static clean is chosen due to its suitability with large datasets
-    Parameters
-    ----------
-    polydata: vtkPolyData
-
-    Returns 
-    ----------
-    cleaned polydata, as the last step it is denoted 'completePolydata'
-    """
-    cleaner = vtkStaticCleanPolyData()
-    cleaner.SetInputData(polydata)
-    cleaner.Update()
-    completePolydata = cleaner.GetOutput()
-
-    return completePolydata
-
 def GetPoints(completePolydata):
     """
     Access the vertices of the comepletePolydata
@@ -133,14 +233,9 @@ def GetPoints(completePolydata):
 
     Returns 
     ----------
-    vertices: list containing points
+    vertices: (N,3) float32 array of points, a view over the vtk buffer
     """
-    vertices = []
-    points = completePolydata.GetPoints()
-    numPoints = points.GetNumberOfPoints()
-    for i in range(numPoints):
-        point = points.GetPoint(i)
-        vertices.append(point)
+    vertices = extract_points(completePolydata)
     return vertices
 
 def AccessPointData(completePolydata):
@@ -158,24 +253,15 @@ def AccessPointData(completePolydata):
     list 0: normals, if they exist
     list 1: scalars, if they exist
     """
-    normals = []
-    scalars = []
     pointData = completePolydata.GetPointData()
 
     # In theory this should be generalized for all polydata, if not, customization of GetArray will be needed and user dependent
-    if pointData.GetArray("Normals"):
-        normalsArray = pointData.GetArray("Normals")
-        numNormals = normalsArray.GetNumberOfTuples()
-        for i in range(numNormals):
-            normal = normalsArray.GetTuple(i)
-            normals.append(normal)
-    
-    if pointData.GetScalars():
-        scalarsArray = pointData.GetScalars
-        numScalars = scalarsArray.GetNumberOfTuples()
-        for i in range(numScalars):
-            scalar = scalarsArray.GetTuple(i)
-            scalars.append(scalar)
+    normals = extract_normals(completePolydata)
+    if normals is None:
+        normals = []
+    scalars = as_array(pointData.GetScalars(), dtype=None)
+    if scalars is None:
+        scalars = []
     pointdata = [0,0]
     pointdata[0] = normals
     pointdata[1] = scalars
@@ -185,8 +271,7 @@ def AccessPointData(completePolydata):
 def getPolygons(completePolydata):
     """
     Access the polygons of the comepletePolydata
-    Due to triangulation, offset array is not used. 
-    Each triangle has it points stored in a sequential triple in connectivity array so offsets are not needed.
+    Triangles take the fast path of the shared triangulator, other polygons are fan triangulated.
     
     Parameters
     ----------
@@ -194,27 +279,10 @@ def getPolygons(completePolydata):
 
     Returns 
     ----------
-    polygons: list containing indices of polygons that correlate with vertices []
+    polygons: (N,3) uint32 array containing indices of polygons that correlate with vertices
     """
-    polygons = []
     # Access the polygons through connectivity and offsets.
-    polys = completePolydata.GetPolys()
-    polyArray = polys.GetConnectivityArray()
-    offsetArray = polys.GetOffsetsArray()
-    numPolys = polyArray.GetNumberOfTuples() 
-    numOffsets = offsetArray.GetNumberOfTuples()
-
-    # fill in polygons list, because we already triangulated everything we dont need to use the offsets
-    # If you are using this with polygons other than triangles, the offset arrays 
-    for i in range(numPolys - 3):
-        polygon1 = polyArray.GetTuple(0+ i)[0]
-        polygon2 = polyArray.GetTuple(1+ i)[0]
-        polygon3 = polyArray.GetTuple(2+ i)[0]
-        complete = []
-        complete.append(polygon1)
-        complete.append(polygon2)
-        complete.append(polygon3)
-        polygons.append(complete)
+    polygons = triangulate_polys(completePolydata.GetPolys())
     return polygons
 
 def errormessage(string):
@@ -232,28 +300,9 @@ def generate_colors_for_polygons(vertices, polygons, values=None, cmap='inferno'
     :param polygons: A list of polygons, where each polygon is a list of indices representing the vertices.
     :param values: Values corresponding to each point, will be normalized in 0-1 range and used for coloring. Lack of values results in random coloring.
     _param cmap: matplot color map, default to inferno but can be overridden. 
-    :return: A list of colors correspionding to .
+    :return: (N,4) float32 RGBA array of colors corresponding to the vertices, looked up in one vectorized pass.
     """
     if values is None:
-        values = np.random.rand(len(vertices))
-    else:
-        # Normalize values to the range [0, 1]
-        values = np.array(values)
-        values = (values - values.min()) / (values.max() - values.min())
-    # Create a color map
-    colormap = plt.get_cmap(cmap)
-
-    colors = []
-    for val in values:
-        # Get the color for the current value from the colormap
-        #subscripting 0 because random gen creates 3x as many values as needed
-        rgba_color = colormap(val[0])
-
-        red = float(rgba_color[0])
-        green = float(rgba_color[1])
-        blue = float(rgba_color[2])
-
-        
-        colors.append([red, green, blue])
-
-    return colors
\ No newline at end of file
+        return random_colors(len(vertices), cmap)
+    # Normalize values to the range [0, 1] and look them up in the colormap table
+    return map_scalars(values, cmap, dtype=np.float32)
\ No newline at end of file
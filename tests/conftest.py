@@ -0,0 +1,10 @@
+"""
+The strainers and the server modules import each other by bare module name, put their folders on the path.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in (ROOT, os.path.join(ROOT, "Strainers"), os.path.join(ROOT, "Paraview2Noodles")):
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
@@ -0,0 +1,53 @@
+"""
+Small meshes for the tests, built with VTK sources and written in the formats the strainers read.
+"""
+from vtk import vtkSphereSource, vtkPLYWriter, vtkXMLPPolyDataWriter
+from vtkmodules.vtkIOXML import vtkXMLPolyDataWriter
+
+
+def sphere_source(resolution=16):
+    source = vtkSphereSource()
+    source.SetThetaResolution(resolution)
+    source.SetPhiResolution(resolution)
+    return source
+
+
+def sphere(resolution=16, normals=True):
+    """Triangulated sphere, its point normals removed when normals is False."""
+    source = sphere_source(resolution)
+    source.Update()
+    polydata = source.GetOutput()
+    if not normals:
+        polydata.GetPointData().RemoveArray("Normals")
+    return polydata
+
+
+def write_mesh(polydata, filename, binary=True, pieces=1):
+    """Write polydata as .ply or .vtp (stored in pieces) by the file's extension."""
+    if filename.endswith(".ply"):
+        writer = vtkPLYWriter()
+        if binary:
+            writer.SetFileTypeToBinary()
+        else:
+            writer.SetFileTypeToASCII()
+    else:
+        writer = vtkXMLPolyDataWriter()
+        writer.SetNumberOfPieces(pieces)
+    writer.SetFileName(filename)
+    writer.SetInputData(polydata)
+    writer.Write()
+    return filename
+
+
+def write_partitioned_sphere(filename, pieces=3, resolution=16):
+    """Write a sphere as a .pvtp index plus one .vtp file per piece, the source generates every piece separately."""
+    # Keep the source referenced while the writer runs the pipeline
+    source = sphere_source(resolution)
+    writer = vtkXMLPPolyDataWriter()
+    writer.SetFileName(filename)
+    writer.SetInputConnection(source.GetOutputPort())
+    writer.SetNumberOfPieces(pieces)
+    writer.SetStartPiece(0)
+    writer.SetEndPiece(pieces - 1)
+    writer.Write()
+    return filename
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from animation_scheduler import AnimationScheduler
+from frame_provider import FrameProvider
+from meshes import sphere, write_mesh
+
+
+class RecordingPublisher:
+    def __init__(self):
+        self.shown = []
+
+    def publish(self, frame):
+        self.shown.append(frame)
+
+
+def test_plays_every_frame_once_without_looping():
+    publisher = RecordingPublisher()
+
+    async def main():
+        scheduler = AnimationScheduler(publisher, list(range(5)), fps=200, loop=False, drop_frames=False)
+        await scheduler.start()
+        return scheduler.stats()
+    stats = asyncio.run(main())
+    assert publisher.shown == [0, 1, 2, 3, 4]
+    assert stats["state"] == "stopped"
+    assert stats["frames_shown"] == 5
+
+
+def test_no_frames_means_no_playback():
+    publisher = RecordingPublisher()
+
+    async def main():
+        scheduler = AnimationScheduler(publisher, [], fps=10)
+        assert scheduler.start() is None
+        scheduler.seek(3)
+        assert not scheduler.running
+        await scheduler._run()
+        return scheduler.stats()
+    stats = asyncio.run(main())
+    assert publisher.shown == []
+    assert stats["frame_count"] == 0
+
+
+def test_seek_wraps_around():
+    publisher = RecordingPublisher()
+
+    async def main():
+        scheduler = AnimationScheduler(publisher, list(range(4)), fps=10)
+        scheduler.start()
+        scheduler.pause()
+        await asyncio.sleep(0.05)
+        scheduler.seek(6)
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+    asyncio.run(main())
+    assert publisher.shown[-1] == 2
+
+
+@pytest.fixture
+def provider(tmp_path):
+    files = [write_mesh(sphere(8 + 4 * number), str(tmp_path / ("%d.ply" % number))) for number in range(6)]
+    provider = FrameProvider(files, read_ahead=2, max_workers=2)
+    yield provider
+    provider.close()
+
+
+def test_provider_serves_threads_one_at_a_time(provider):
+    # An old scheduler's fetch still running while the restarted one asks for frames.
+    # A frame is freed by the next request from either thread, only its filename outlives that
+    barrier = threading.Barrier(2)
+
+    def fetch(indices):
+        barrier.wait()
+        return [(index, provider[index].filename) for index in indices]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(fetch, [[0, 1, 2, 3, 4, 5] * 10, [5, 0, 3, 1, 4, 2] * 10]))
+    for fetched in results:
+        assert all(filename == provider.filenames[index] for index, filename in fetched)
+    # The window is still usable afterwards
+    assert len(provider[2].points) == sphere(16).GetNumberOfPoints()
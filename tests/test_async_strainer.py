@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import threading
+import numpy as np
+from Async_Strainer import StrainJobs, async_threading_strainer, run_strainer
+from Reader_Strainer_Threading import threading_strainer
+from meshes import sphere, write_mesh
+
+
+def test_new_job_cancels_the_previous_one_under_its_name():
+    results = []
+
+    async def slow(value):
+        await asyncio.sleep(10)
+        return value
+
+    async def fast(value):
+        return value
+
+    async def main():
+        jobs = StrainJobs()
+        first = jobs.start("load", slow(1), results.append)
+        other = jobs.start("other", fast(3), results.append)
+        second = jobs.start("load", fast(2), results.append)
+        assert jobs.running("load")
+        await asyncio.gather(first, second, other, return_exceptions=True)
+        # Done callbacks run on the next loop iteration
+        await asyncio.sleep(0)
+        assert first.cancelled()
+        assert not jobs.running("load")
+        assert jobs.tasks == {}
+    asyncio.run(main())
+    assert sorted(results) == [2, 3]
+
+
+def test_failed_job_is_logged_or_passed_on(caplog):
+    errors = []
+
+    async def broken():
+        raise RuntimeError("bad file")
+
+    async def main():
+        jobs = StrainJobs()
+        with caplog.at_level(logging.ERROR, logger="Async_Strainer"):
+            await asyncio.gather(jobs.start("quiet", broken(), print), return_exceptions=True)
+            await asyncio.sleep(0)
+        await asyncio.gather(jobs.start("loud", broken(), print, errors.append), return_exceptions=True)
+        await asyncio.sleep(0)
+    asyncio.run(main())
+    assert "straining job quiet failed" in caplog.text
+    assert [str(error) for error in errors] == ["bad file"]
+
+
+def test_strainer_runs_off_the_loop(tmp_path):
+    filename = write_mesh(sphere(16), str(tmp_path / "sphere.ply"))
+
+    def strainer_thread(name):
+        return threading.current_thread().name
+
+    async def main():
+        loop_thread = threading.current_thread().name
+        assert await run_strainer(strainer_thread, filename) != loop_thread
+        return await async_threading_strainer(filename)
+    data = asyncio.run(main())
+    assert np.array_equal(data.points, threading_strainer(filename).points)
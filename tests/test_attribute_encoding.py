@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from Reader_Strainer_Threading import Properties
+from Attribute_Encoding import (quantize_positions, dequantize_positions, oct_encode, oct_decode, encode_colors,
+                                encode_indices, encode_frame, decode_frame)
+
+
+def unit_normals(count=100000):
+    normals = np.random.default_rng(0).normal(size=(count, 3))
+    # Include the axes and the octahedron's folds, where the encoding is least forgiving
+    normals = np.concatenate([normals, np.eye(3), -np.eye(3), [[1, 1, 0], [-1, 0, -1], [0, -1, -1]]])
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+def angles(a, b):
+    return np.degrees(np.arccos(np.clip((a * b).sum(axis=1), -1, 1)))
+
+
+@pytest.mark.parametrize("bits, dtype, max_degrees", [(8, np.int8, 1.0), (16, np.int16, 0.02)])
+def test_octahedral_round_trip_error(bits, dtype, max_degrees):
+    normals = unit_normals()
+    encoded = oct_encode(normals, bits)
+    assert encoded.dtype == dtype
+    assert encoded.shape == (len(normals), 2)
+    decoded = oct_decode(encoded)
+    assert decoded.dtype == np.float32
+    assert np.allclose(np.linalg.norm(decoded, axis=1), 1, atol=1e-6)
+    assert angles(decoded, normals).max() < max_degrees
+
+
+def test_quantized_positions_within_one_step():
+    points = np.random.default_rng(1).random((10000, 3)) * [20, 2, 0.5] - [10, 1, 0.25]
+    quantized, scale, offset = quantize_positions(points)
+    assert quantized.dtype == np.int16
+    # Every step of the int16 range is used along each axis
+    assert np.array_equal(quantized.min(axis=0), [-32768] * 3)
+    assert np.array_equal(quantized.max(axis=0), [32767] * 3)
+    error = np.abs(dequantize_positions(quantized, scale, offset) - points)
+    assert np.all(error <= scale)
+
+
+def test_flat_and_empty_positions():
+    points = np.array([[1, 2, 3], [4, 2, 3]], dtype=np.float32)
+    quantized, scale, offset = quantize_positions(points)
+    assert np.allclose(dequantize_positions(quantized, scale, offset), points)
+    assert quantize_positions(np.empty((0, 3)))[0].shape == (0, 3)
+
+
+def test_colors_and_indices():
+    assert np.array_equal(encode_colors(np.array([[0, 0.5, 1]])), [[0, 128, 255, 255]])
+    assert np.array_equal(encode_colors(np.array([[10, 20, 30]], dtype=np.uint8)), [[10, 20, 30, 255]])
+    assert encode_colors(np.arange(4.0)) is None
+    assert encode_indices(np.array([[0, 1, 65535]]), 65536).dtype == np.uint16
+    assert encode_indices(np.array([[0, 1, 65536]]), 65537).dtype == np.uint32
+
+
+def test_frame_round_trip():
+    data = Properties()
+    data.points = np.random.default_rng(2).random((50, 3)).astype(np.float32)
+    data.normals = unit_normals(50).astype(np.float32)
+    data.colors = np.random.default_rng(3).random((50, 4)).astype(np.float32)
+    data.polygons = np.arange(48, dtype=np.uint32).reshape(-1, 3)
+    encoded = encode_frame(data, positions="int16", normals="oct16")
+    assert encoded.nbytes() < data.points.nbytes + data.normals.nbytes + data.colors.nbytes + data.polygons.nbytes
+    decoded = decode_frame(encoded)
+    assert np.all(np.abs(decoded.points - data.points) <= encoded.position_scale)
+    assert angles(decoded.normals, data.normals).max() < 0.02
+    assert np.array_equal(decoded.polygons, data.polygons)
+    with pytest.raises(ValueError):
+        encode_frame(data, normals="spherical")
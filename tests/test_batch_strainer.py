@@ -0,0 +1,26 @@
+import os
+import pytest
+from Batch_Strainer import batch_strain
+from meshes import sphere, write_mesh
+
+SHARED_MEMORY = "/dev/shm"
+
+
+def test_batch_keeps_file_order(tmp_path):
+    files = [write_mesh(sphere(resolution), str(tmp_path / ("%d.ply" % resolution))) for resolution in (8, 16, 24)]
+    frames = batch_strain(files, max_workers=2, progress=None)
+    try:
+        assert [len(frame.points) for frame in frames] == [sphere(resolution).GetNumberOfPoints() for resolution in (8, 16, 24)]
+    finally:
+        for frame in frames:
+            frame.unlink()
+
+
+@pytest.mark.skipif(not os.path.isdir(SHARED_MEMORY), reason="needs /dev/shm to look for leaked blocks")
+def test_failed_batch_frees_finished_frames(tmp_path):
+    files = [write_mesh(sphere(8), str(tmp_path / ("%d.ply" % number))) for number in range(3)]
+    files.insert(1, str(tmp_path / "missing.unknown"))
+    before = set(os.listdir(SHARED_MEMORY))
+    with pytest.raises(ValueError):
+        batch_strain(files, max_workers=2, progress=None)
+    assert set(os.listdir(SHARED_MEMORY)) - before == set()
@@ -0,0 +1,66 @@
+import pytest
+import rigatoni
+from vtk import vtkMultiBlockDataSet, vtkCompositeDataSet, vtkPolyData, vtkConeSource
+from vtkmodules.vtkIOXML import vtkXMLMultiBlockDataWriter
+from Composite_Strainer import strain_composite, strain_composite_file
+from frame_publisher import publish_blocks
+from meshes import sphere
+
+
+def cone():
+    source = vtkConeSource()
+    source.Update()
+    return source.GetOutput()
+
+
+def named(multiblock, number, dataset, name=None):
+    multiblock.SetBlock(number, dataset)
+    if name is not None:
+        multiblock.GetMetaData(number).Set(vtkCompositeDataSet.NAME(), name)
+
+
+@pytest.fixture
+def multiblock():
+    """Named sphere, unnamed cone, and a named group of two unnamed spheres plus an empty block."""
+    group = vtkMultiBlockDataSet()
+    named(group, 0, sphere(8))
+    named(group, 1, sphere(12))
+    named(group, 2, vtkPolyData())
+    root = vtkMultiBlockDataSet()
+    named(root, 0, sphere(16), "Sphere")
+    named(root, 1, cone())
+    named(root, 2, group, "Group")
+    return root
+
+
+def test_block_names_and_paths(multiblock):
+    blocks = strain_composite(multiblock, workers=2)
+    assert [block.name for block in blocks] == ["Sphere", "block 2", "Group 0", "Group 1"]
+    assert [block.path for block in blocks] == [(0,), (1,), (2, 0), (2, 1)]
+    assert [block.flat_index for block in blocks] == [1, 2, 4, 5]
+    assert len(blocks[0].data.points) == sphere(16).GetNumberOfPoints()
+    assert len(blocks[3].data.points) == sphere(12).GetNumberOfPoints()
+
+
+def test_block_names_survive_a_vtm_file(tmp_path, multiblock):
+    filename = str(tmp_path / "blocks.vtm")
+    writer = vtkXMLMultiBlockDataWriter()
+    writer.SetFileName(filename)
+    writer.SetInputData(multiblock)
+    writer.Write()
+    blocks = strain_composite_file(filename)
+    assert [block.name for block in blocks][0] == "Sphere"
+    assert [block.name for block in blocks][2:] == ["Group 0", "Group 1"]
+
+
+def test_entities_keep_block_names(multiblock):
+    server = rigatoni.Server(0, [])
+    blocks = strain_composite(multiblock)
+    publishers = publish_blocks(server, blocks, mode="entities", port=0, methods=[])
+    try:
+        assert [publisher.entity.name for publisher in publishers] == [block.name for block in blocks]
+        # One ByteServer for all of them
+        assert len({id(publisher.byte_server) for publisher in publishers}) == 1
+    finally:
+        for publisher in reversed(publishers):
+            publisher.close()
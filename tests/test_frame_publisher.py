@@ -0,0 +1,70 @@
+import pytest
+import rigatoni
+from rigatoni import noodle_objects as nooobs
+from Reader_Strainer_Threading import strain_polydata
+from frame_publisher import FramePublisher
+from meshes import sphere
+
+
+@pytest.fixture
+def publishers():
+    """Make publishers on a server that is never started, port 0 lets the OS pick the ByteServer's port."""
+    server = rigatoni.Server(0, [])
+    made = []
+
+    def make(**kwargs):
+        publisher = FramePublisher(server, port=0, methods=[], **kwargs)
+        made.append(publisher)
+        return publisher
+    yield make
+    for publisher in made:
+        publisher.close()
+
+
+def components(server, kind):
+    return [delegate for delegate in server.state.values() if isinstance(delegate, kind)]
+
+
+def test_swapping_frames_keeps_the_material(publishers):
+    publisher = publishers(delta=False)
+    server = publisher.server
+    small, large = strain_polydata(sphere(8)), strain_polydata(sphere(40))
+    publisher.publish(small)
+    counts = {kind: len(components(server, kind)) for kind in (nooobs.Geometry, nooobs.BufferView, nooobs.Buffer)}
+    for frame in (large, small, large):
+        publisher.publish(frame)
+    assert publisher.material.id in server.state
+    assert server.delete_queue == set()
+    # Only the shown frame's geometry, views and buffers are left
+    assert len(components(server, nooobs.Geometry)) == counts[nooobs.Geometry] == 1
+    assert len(components(server, nooobs.BufferView)) == counts[nooobs.BufferView]
+    assert len(components(server, nooobs.Buffer)) == counts[nooobs.Buffer]
+    assert server.get_delegate(publisher.entity.render_rep.mesh).patches[0].vertex_count == len(large.points)
+
+
+def test_delta_frames_reuse_unchanged_streams(publishers):
+    publisher = publishers()
+    frame = strain_polydata(sphere(40))
+    publisher.publish(frame)
+    first_streams = dict(publisher._streams)
+    sent = publisher.bytes_sent
+
+    # Same frame again costs nothing
+    publisher.publish(frame)
+    assert publisher.frames_skipped == 1
+    assert publisher.bytes_sent == sent
+
+    # Moved points: only the positions are published again, the index, normal and color buffers are reused
+    moved = strain_polydata(sphere(40))
+    moved.points = moved.points * 2
+    publisher.publish(moved)
+    assert publisher._streams["points 0"] is not first_streams["points 0"]
+    for key in first_streams:
+        if key != "points 0":
+            assert publisher._streams[key] is first_streams[key]
+    assert publisher.bytes_sent - sent == first_streams["points 0"].nbytes
+    assert publisher.bytes_reused > 0
+    # The replaced position stream is gone from the server
+    assert first_streams["points 0"].view.id not in publisher.server.state
+    patch = publisher.server.get_delegate(publisher.entity.render_rep.mesh).patches[0]
+    assert patch.indices.view == first_streams["indices 0"].view.id
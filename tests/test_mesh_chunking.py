@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from Reader_Strainer_Threading import strain_polydata
+from Mesh_Chunking import chunk_mesh, chunk_ranges, morton_codes
+from meshes import sphere
+
+
+@pytest.fixture
+def strained_sphere():
+    return strain_polydata(sphere(96))
+
+
+def sorted_triangles(triangles):
+    """Triangles as a sorted list of rows, independent of triangle order, each triangle keeps its winding."""
+    triangles = np.asarray(triangles, dtype=np.int64)
+    return triangles[np.lexsort(triangles.T[::-1])]
+
+
+def test_chunks_keep_every_triangle(strained_sphere):
+    data = strained_sphere
+    chunks = chunk_mesh(data, max_vertices=500)
+    assert len(chunks) > 1
+    restored = []
+    for chunk in chunks:
+        assert len(chunk.points) <= 500
+        assert chunk.polygons.dtype == np.uint16
+        # Every chunk vertex is used, and the local indices point at the same vertices as the original ones
+        assert np.array_equal(np.unique(chunk.polygons), np.arange(len(chunk.points)))
+        assert np.array_equal(chunk.points, data.points[chunk.vertex_ids])
+        assert np.array_equal(chunk.normals, data.normals[chunk.vertex_ids])
+        restored.append(chunk.vertex_ids[chunk.polygons])
+    assert np.array_equal(sorted_triangles(np.concatenate(restored)), sorted_triangles(data.polygons))
+
+
+def test_chunks_are_spatially_compact(strained_sphere):
+    data = strained_sphere
+    chunks = chunk_mesh(data, max_vertices=500)
+    extent = np.ptp(data.points, axis=0).max()
+    assert max(np.ptp(chunk.points, axis=0).max() for chunk in chunks) < extent
+
+
+def test_small_mesh_is_one_chunk(strained_sphere):
+    chunks = chunk_mesh(strained_sphere)
+    assert len(chunks) == 1
+    assert np.array_equal(chunks[0].points, strained_sphere.points)
+    assert np.array_equal(chunks[0].polygons, strained_sphere.polygons)
+
+
+def test_threaded_chunks_match_serial(strained_sphere):
+    serial = chunk_mesh(strained_sphere, max_vertices=700)
+    threaded = chunk_mesh(strained_sphere, max_vertices=700, workers=3)
+    assert [chunk.vertex_ids.tolist() for chunk in serial] == [chunk.vertex_ids.tolist() for chunk in threaded]
+
+
+def test_chunk_ranges_fill_the_budget():
+    # A strip where every triangle brings one new vertex
+    triangles = np.array([[i, i + 1, i + 2] for i in range(20)])
+    assert chunk_ranges(triangles, 5) == [(0, 3), (3, 6), (6, 9), (9, 12), (12, 15), (15, 18), (18, 20)]
+    with pytest.raises(ValueError):
+        chunk_ranges(triangles, 2)
+
+
+def test_morton_codes_interleave_axes():
+    corners = np.array([[0, 0, 0], [0, 0, 1], [0, 1, 0], [1, 0, 0], [1, 1, 1]], dtype=np.float64)
+    codes = morton_codes(corners)
+    assert codes.dtype == np.uint64
+    assert codes[0] == 0
+    assert codes[1] < codes[2] < codes[3] < codes[4]
@@ -0,0 +1,78 @@
+import numpy as np
+from vtk import vtkStripper
+from Reader_Strainer_Threading import Properties
+from Mesh_Cleaning import weld_vertices, prepare_mesh
+from vtkMapperStrainer import prepareData
+from meshes import sphere
+
+
+def two_triangles_with_split_edge():
+    """Two triangles sharing an edge whose vertices are duplicated, plus one vertex no triangle uses."""
+    data = Properties()
+    data.points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [5, 5, 5]],
+                           dtype=np.float32)
+    data.polygons = np.array([[0, 1, 2], [3, 4, 5]], dtype=np.uint32)
+    data.colors = np.arange(7 * 4, dtype=np.float32).reshape(7, 4)
+    return data
+
+
+def test_weld_groups_in_first_occurrence_order():
+    first, inverse = weld_vertices(two_triangles_with_split_edge().points)
+    assert first.tolist() == [0, 1, 2, 4, 6]
+    assert inverse.tolist() == [0, 1, 2, 1, 3, 2, 4]
+
+
+def test_signed_zeros_weld():
+    first, inverse = weld_vertices(np.array([[0.0, 1, 1], [-0.0, 1, 1]], dtype=np.float32))
+    assert inverse.tolist() == [0, 0]
+
+
+def test_tolerance_weld():
+    points = np.array([[0, 0, 0], [0.001, 0, 0], [1, 0, 0]], dtype=np.float32)
+    assert weld_vertices(points)[1].tolist() == [0, 1, 2]
+    assert weld_vertices(points, tolerance=0.01)[1].tolist() == [0, 0, 1]
+
+
+def test_prepare_mesh_welds_and_drops_unused_vertices():
+    data = two_triangles_with_split_edge()
+    result = prepare_mesh(data)
+    assert len(result.points) == 4
+    assert result.polygons.dtype == np.uint32
+    assert result.polygons.tolist() == [[0, 1, 2], [1, 3, 2]]
+    assert result.vertex_ids.tolist() == [0, 1, 2, 4]
+    # Per vertex arrays follow the vertices they were taken from
+    assert np.array_equal(result.colors, data.colors[[0, 1, 2, 4]])
+    # Same triangles in space
+    assert np.array_equal(result.points[result.polygons], data.points[data.polygons.astype(np.intp)])
+
+
+def test_prepare_mesh_drops_triangles_collapsed_by_welding():
+    data = Properties()
+    data.points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 0]], dtype=np.float32)
+    data.polygons = np.array([[0, 1, 2], [0, 3, 1]], dtype=np.uint32)
+    result = prepare_mesh(data)
+    assert result.polygons.tolist() == [[0, 1, 2]]
+    assert len(result.points) == 3
+
+
+def test_prepare_mesh_normals():
+    data = two_triangles_with_split_edge()
+    result = prepare_mesh(data)
+    assert np.allclose(result.normals, [0, 0, 1])
+    data.normals = np.tile(np.array([[0, 0, -1]], dtype=np.float32), (7, 1))
+    assert np.allclose(prepare_mesh(data).normals, [0, 0, -1])
+    assert len(prepare_mesh(two_triangles_with_split_edge(), generate_normals=False).normals) == 0
+
+
+def test_prepare_data_triangulates_strips():
+    polydata = sphere(16, normals=False)
+    stripper = vtkStripper()
+    stripper.SetInputData(polydata)
+    stripper.Update()
+    strips = stripper.GetOutput()
+    assert strips.GetNumberOfStrips() > 0
+    result = prepareData(strips)
+    assert len(result.polygons) == polydata.GetNumberOfPolys()
+    assert len(result.points) == polydata.GetNumberOfPoints()
+    # Generated normals of a sphere point outwards
+    assert np.all(np.einsum("ij,ij->i", result.normals, result.points) > 0)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import Mesh_LOD
+from Reader_Strainer_Threading import strain_polydata
+from Strain_Cache import StrainCache
+from Mesh_LOD import DEFAULT_LOD_RATIOS, build_lod_pyramid, cached_lod_pyramid
+from meshes import sphere, write_mesh
+
+
+@pytest.mark.parametrize("method", ["cluster", "quadric"])
+def test_levels_stay_within_their_budget(method):
+    data = strain_polydata(sphere(96))
+    levels = build_lod_pyramid(data, method=method)
+    assert levels[0] is data
+    for ratio, level in zip(DEFAULT_LOD_RATIOS[1:], levels[1:]):
+        budget = int(len(data.polygons) * ratio)
+        # Within budget and not far below it
+        assert budget // 2 < len(level.polygons) <= budget
+        assert level.polygons.max() < len(level.points)
+        assert len(level.normals) == len(level.points)
+        assert np.allclose(np.linalg.norm(level.normals, axis=1), 1, atol=1e-5)
+        # Still a sphere of radius 0.5
+        assert np.allclose(np.linalg.norm(level.points, axis=1), 0.5, atol=0.05)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        build_lod_pyramid(strain_polydata(sphere(8)), method="edge collapse")
+
+
+def test_cached_pyramid_is_built_once(tmp_path, monkeypatch):
+    filename = write_mesh(sphere(48), str(tmp_path / "sphere.ply"))
+    cache = StrainCache(str(tmp_path / "cache"))
+    levels = cached_lod_pyramid(cache, filename)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the cached pyramid was built again")
+    monkeypatch.setattr(Mesh_LOD, "build_lod_pyramid", fail)
+    cached = cached_lod_pyramid(cache, filename)
+    assert len(cached) == len(DEFAULT_LOD_RATIOS)
+    for level, hit in zip(levels, cached):
+        # Hits come back memory mapped from the cache, the full mesh included
+        assert isinstance(hit.points, np.memmap)
+        assert np.array_equal(hit.points, level.points)
+        assert np.array_equal(hit.polygons, level.polygons)
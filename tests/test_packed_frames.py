@@ -0,0 +1,63 @@
+import mmap
+import os
+import numpy as np
+import pytest
+from Reader_Strainer_Threading import threading_strainer
+from Packed_Frames import PACK_ALIGNMENT, PackedFrames, pack_frames
+from meshes import sphere, write_mesh
+
+
+def buffer_owner(array):
+    while isinstance(array, (np.ndarray, memoryview)):
+        array = array.base if isinstance(array, np.ndarray) else array.obj
+    return array
+
+
+@pytest.fixture
+def frame_files(tmp_path):
+    return [write_mesh(sphere(resolution), str(tmp_path / ("%d.ply" % number)))
+            for number, resolution in enumerate((8, 16, 12))]
+
+
+def test_round_trip_gives_views_into_the_map(tmp_path, frame_files):
+    path = str(tmp_path / "frames.noodpack")
+    assert pack_frames(frame_files, path) == 3
+    frames = PackedFrames(path)
+    try:
+        assert len(frames) == 3
+        for filename, frame in zip(frame_files, frames):
+            expected = threading_strainer(filename)
+            assert frame.filename == os.path.basename(filename)
+            for field in ("points", "polygons", "normals"):
+                array = getattr(frame, field)
+                assert array.dtype == getattr(expected, field).dtype
+                assert np.array_equal(array, getattr(expected, field))
+                assert isinstance(buffer_owner(array), mmap.mmap)
+                assert not array.flags.writeable
+                assert array.__array_interface__["data"][0] % PACK_ALIGNMENT == 0
+            assert len(frame.colors) == 0
+        del array, frame
+    finally:
+        frames.close()
+
+
+def test_bad_magic_is_rejected(tmp_path, frame_files):
+    path = str(tmp_path / "frames.noodpack")
+    pack_frames(frame_files[:1], path)
+    with open(path, "r+b") as file:
+        file.write(b"NOTAPACK")
+    with pytest.raises(ValueError, match="not a packed frame file"):
+        PackedFrames(path)
+    with open(path, "wb") as file:
+        file.write(b"NOOD")
+    with pytest.raises(ValueError, match="not a packed frame file"):
+        PackedFrames(path)
+
+
+def test_truncated_file_is_rejected(tmp_path, frame_files):
+    path = str(tmp_path / "frames.noodpack")
+    pack_frames(frame_files, path)
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) - 10)
+    with pytest.raises(ValueError, match="truncated"):
+        PackedFrames(path)
@@ -0,0 +1,52 @@
+import os
+import numpy as np
+from Reader_Strainer_Threading import Properties, threading_strainer
+from Partitioned_Reader import piece_files, concatenate_pieces, load_partitioned
+from meshes import write_partitioned_sphere
+
+
+def piece(points, triangles, normals=True):
+    data = Properties()
+    data.points = np.asarray(points, dtype=np.float32)
+    data.polygons = np.asarray(triangles, dtype=np.uint32)
+    data.normals = np.ones_like(data.points) if normals else np.array([])
+    return data
+
+
+def test_concatenation_offsets_indices():
+    first = piece([[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[0, 1, 2]])
+    second = piece([[0, 0, 1], [1, 0, 1], [0, 1, 1], [1, 1, 1]], [[0, 1, 2], [1, 3, 2]])
+    merged = concatenate_pieces([first, second])
+    assert merged.polygons.dtype == np.uint32
+    assert merged.polygons.tolist() == [[0, 1, 2], [3, 4, 5], [4, 6, 5]]
+    assert np.array_equal(merged.points, np.concatenate([first.points, second.points]))
+    assert merged.normals.shape == (7, 3)
+
+
+def test_concatenation_drops_arrays_missing_from_a_piece():
+    merged = concatenate_pieces([piece([[0, 0, 0]] * 3, [[0, 1, 2]]), piece([[0, 0, 1]] * 3, [[0, 1, 2]], normals=False)])
+    assert len(merged.normals) == 0
+    assert len(merged.points) == 6
+
+
+def test_piece_files(tmp_path):
+    filename = write_partitioned_sphere(str(tmp_path / "sphere.pvtp"), pieces=3)
+    files = piece_files(filename)
+    assert len(files) == 3
+    assert all(os.path.isfile(file) for file in files)
+
+
+def test_parallel_load_matches_serial_reader(tmp_path):
+    filename = write_partitioned_sphere(str(tmp_path / "sphere.pvtp"), pieces=3)
+    serial = threading_strainer(filename)
+    merged = load_partitioned(filename, max_workers=2)
+    assert np.array_equal(merged.points, serial.points)
+    assert np.array_equal(merged.polygons, serial.polygons)
+
+    pieces = load_partitioned(filename, merge=False, max_workers=2)
+    try:
+        assert len(pieces) == 3
+        assert sum(len(piece.points) for piece in pieces) == len(serial.points)
+    finally:
+        for piece in pieces:
+            piece.unlink()
@@ -0,0 +1,64 @@
+import numpy as np
+from vtk import vtkPolyData, vtkStreamingDemandDrivenPipeline, vtkSphereSource, vtkElevationFilter
+from vtkmodules.util.vtkAlgorithm import VTKPythonAlgorithmBase
+from pipeline_bridge import PipelineBridge
+
+TIMES = [1.0, 2.0, 3.0]
+
+
+class GrowingSphere(VTKPythonAlgorithmBase):
+    """Source with timesteps whose output is a sphere with the requested time as its radius."""
+    def __init__(self):
+        VTKPythonAlgorithmBase.__init__(self, nInputPorts=0, nOutputPorts=1, outputType="vtkPolyData")
+        self.requested = []
+
+    def RequestInformation(self, request, inInfo, outInfo):
+        information = outInfo.GetInformationObject(0)
+        information.Set(vtkStreamingDemandDrivenPipeline.TIME_STEPS(), TIMES, len(TIMES))
+        information.Set(vtkStreamingDemandDrivenPipeline.TIME_RANGE(), [TIMES[0], TIMES[-1]], 2)
+        return 1
+
+    def RequestData(self, request, inInfo, outInfo):
+        information = outInfo.GetInformationObject(0)
+        time = information.Get(vtkStreamingDemandDrivenPipeline.UPDATE_TIME_STEP())
+        self.requested.append(time)
+        sphere = vtkSphereSource()
+        sphere.SetRadius(time)
+        sphere.Update()
+        vtkPolyData.GetData(outInfo).ShallowCopy(sphere.GetOutput())
+        return 1
+
+
+def radius(frame):
+    return np.linalg.norm(np.asarray(frame.points, dtype=np.float64), axis=1).mean()
+
+
+def test_frames_are_strained_at_each_timestep():
+    source = GrowingSphere()
+    bridge = PipelineBridge(source)
+    assert bridge.times == TIMES
+    assert len(bridge) == 3
+    assert np.isclose(radius(bridge[2]), 3.0)
+    assert np.isclose(radius(bridge[0]), 1.0)
+    assert source.requested == [3.0, 1.0]
+    assert [round(radius(frame), 6) for frame in bridge] == TIMES
+
+
+def test_output_survives_the_next_timestep():
+    bridge = PipelineBridge(GrowingSphere())
+    first = bridge.polydata_at(1.0)
+    points = first.GetNumberOfPoints()
+    bridge.polydata_at(2.0)
+    assert first.GetNumberOfPoints() == points
+    assert np.isclose(np.linalg.norm(first.GetPoint(0)), 1.0)
+
+
+def test_output_port_and_data_without_time():
+    sphere = vtkSphereSource()
+    elevation = vtkElevationFilter()
+    elevation.SetInputConnection(sphere.GetOutputPort())
+    bridge = PipelineBridge(elevation.GetOutputPort())
+    assert bridge.times == [None]
+    frame = bridge[0]
+    assert len(frame.points) == sphere.GetOutput().GetNumberOfPoints()
+    assert len(frame.polygons) == sphere.GetOutput().GetNumberOfPolys()
@@ -0,0 +1,38 @@
+import os
+import pytest
+from Reader_Registry import read_polydata, sniff
+from meshes import sphere, write_mesh
+
+
+def write_sphere(filename, resolution):
+    polydata = sphere(resolution)
+    write_mesh(polydata, filename)
+    return polydata.GetNumberOfPoints()
+
+
+@pytest.mark.parametrize("extension", [".ply", ".vtp"])
+def test_rewritten_file_is_read_again(tmp_path, extension):
+    filename = str(tmp_path / ("mesh" + extension))
+    small = write_sphere(filename, 8)
+    assert read_polydata(filename).GetNumberOfPoints() == small
+    large = write_sphere(filename, 40)
+    assert large != small
+    assert read_polydata(filename).GetNumberOfPoints() == large
+
+
+def test_output_survives_the_next_read(tmp_path):
+    first, second = str(tmp_path / "a.ply"), str(tmp_path / "b.ply")
+    count = write_sphere(first, 8)
+    write_sphere(second, 20)
+    polydata = read_polydata(first)
+    read_polydata(second)
+    assert polydata.GetNumberOfPoints() == count
+
+
+def test_sniff_uses_magic_before_extension(tmp_path):
+    filename = str(tmp_path / "mesh.ply")
+    write_sphere(filename, 8)
+    renamed = str(tmp_path / "mesh.data")
+    os.rename(filename, renamed)
+    assert sniff(renamed) == ".ply"
+    assert sniff(str(tmp_path / "missing.unknown")) is None
@@ -0,0 +1,41 @@
+import logging
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from Reader_Strainer import noodStrainer
+from Color_Mapping import map_scalars
+from meshes import sphere, write_mesh
+
+
+def sphere_with_array(filename, name, values):
+    polydata = sphere(16)
+    array = numpy_to_vtk(values, deep=True)
+    array.SetName(name)
+    polydata.GetPointData().AddArray(array)
+    return write_mesh(polydata, filename)
+
+
+def test_rgb_colors_are_scaled_to_0_1(tmp_path):
+    rgb = np.random.default_rng(0).integers(0, 256, (sphere(16).GetNumberOfPoints(), 3)).astype(np.uint8)
+    data = noodStrainer(sphere_with_array(str(tmp_path / "rgb.vtp"), "RGB", rgb))
+    assert data.colors.dtype == np.float32
+    assert np.allclose(data.colors[:, :3], rgb / 255.0)
+    assert np.all(data.colors[:, 3] == 1)
+
+
+def test_scalar_array_falls_back_to_height_colors(tmp_path):
+    values = np.linspace(0, 1, sphere(16).GetNumberOfPoints())
+    data = noodStrainer(sphere_with_array(str(tmp_path / "scalars.vtp"), "Scalars", values))
+    assert np.array_equal(data.colors, map_scalars(data.points[:, 1], dtype=np.float32))
+
+
+def test_no_colors_falls_back_to_height_colors(tmp_path):
+    data = noodStrainer(write_mesh(sphere(16), str(tmp_path / "plain.ply")))
+    assert np.array_equal(data.colors, map_scalars(data.points[:, 1], dtype=np.float32))
+
+
+def test_missing_color_array_is_logged(tmp_path, caplog):
+    filename = write_mesh(sphere(16), str(tmp_path / "plain.vtp"))
+    with caplog.at_level(logging.WARNING, logger="Reader_Strainer"):
+        data = noodStrainer(filename, color_array="Pressure")
+    assert len(data.colors) == 0
+    assert "Pressure" in caplog.text
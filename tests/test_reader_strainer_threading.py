@@ -0,0 +1,41 @@
+import types
+import numpy as np
+import Reader_Strainer_Threading
+from Reader_Strainer_Threading import Properties, handleColor, scalar_range, get_thread_pool, set_thread_pool
+from Color_Mapping import map_scalars
+from Extraction import colors_to_0_1
+
+
+def test_scalar_range_of_magnitudes():
+    values = np.array([[3, 4], [0, 1], [6, 8]], dtype=np.float64)
+    assert scalar_range(values, chunk_size=1) == (1.0, 10.0)
+    assert scalar_range(np.array([2.0, -1.0, 5.0]), chunk_size=2) == (-1.0, 5.0)
+
+
+def test_chunked_scalar_colors_use_one_range(monkeypatch):
+    values = np.random.default_rng(0).random((5000, 2)) * np.linspace(1, 100, 5000)[:, None]
+    monkeypatch.setattr(Reader_Strainer_Threading, "extract_colors", lambda polydata: values)
+    data = Properties()
+    handleColor(types.SimpleNamespace(VTKObject=None), data, chunk_size=1000)
+    assert np.array_equal(data.colors, map_scalars(values, dtype=np.float32))
+
+
+def test_rgb_colors_are_scaled_to_0_1(monkeypatch):
+    rgb = np.random.default_rng(1).integers(0, 256, (5000, 3)).astype(np.uint8)
+    monkeypatch.setattr(Reader_Strainer_Threading, "extract_colors", lambda polydata: rgb)
+    data = Properties()
+    handleColor(types.SimpleNamespace(VTKObject=None), data, chunk_size=1000)
+    assert data.colors.dtype == np.float32
+    assert data.colors.shape == (5000, 4)
+    assert np.array_equal(data.colors, colors_to_0_1(rgb))
+    assert np.all(data.colors[:, 3] == 1)
+
+
+def test_replaced_pool_stays_usable():
+    old = get_thread_pool()
+    set_thread_pool(2)
+    try:
+        assert old.submit(lambda: 42).result() == 42
+        assert get_thread_pool() is not old
+    finally:
+        set_thread_pool(Reader_Strainer_Threading.DEFAULT_WORKERS)
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+from Reader_Strainer_Threading import threading_strainer
+from Strain_Cache import StrainCache
+from meshes import sphere, write_mesh
+
+calls = []
+
+
+def counting_strainer(filename):
+    calls.append(filename)
+    return threading_strainer(filename)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    calls.clear()
+    return StrainCache(str(tmp_path / "cache"))
+
+
+def test_hit_returns_memory_maps_without_straining(tmp_path, cache):
+    filename = write_mesh(sphere(16), str(tmp_path / "sphere.ply"))
+    strained = cache.strain(filename, counting_strainer)
+    cached = cache.strain(filename, counting_strainer)
+    assert calls == [filename]
+    assert isinstance(cached.points, np.memmap)
+    assert not cached.points.flags.writeable
+    assert np.array_equal(cached.points, strained.points)
+    assert np.array_equal(cached.polygons, strained.polygons)
+
+
+def test_touched_source_is_strained_again(tmp_path, cache):
+    filename = write_mesh(sphere(16), str(tmp_path / "sphere.ply"))
+    cache.strain(filename, counting_strainer)
+    stat = os.stat(filename)
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.strain(filename, counting_strainer)
+    assert len(calls) == 2
+
+
+def test_options_and_strainer_are_part_of_the_key(tmp_path, cache):
+    filename = write_mesh(sphere(8), str(tmp_path / "sphere.ply"))
+    assert cache.key(filename) != cache.key(filename, counting_strainer)
+    assert cache.key(filename, chunk_size=10) != cache.key(filename, chunk_size=20)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, cache):
+    first = write_mesh(sphere(16), str(tmp_path / "first.ply"))
+    second = write_mesh(sphere(16), str(tmp_path / "second.ply"))
+    cache.strain(first)
+    cache.strain(second)
+    # Make the first entry the oldest, then use it again
+    for age, filename in ((200, first), (100, second)):
+        path = os.path.join(cache.cache_dir, cache.key(filename))
+        os.utime(path, (os.stat(path).st_atime - age, os.stat(path).st_mtime - age))
+    assert cache.get(first) is not None
+    cache.max_bytes = cache.size() - 1
+    cache.evict()
+    assert cache.get(second) is None
+    assert cache.get(first) is not None
+
+
+def test_put_replaces_entries_through_staging(tmp_path, cache):
+    filename = write_mesh(sphere(8), str(tmp_path / "sphere.ply"))
+    data = threading_strainer(filename)
+    cache.put(filename, data)
+    data.points = data.points * 2
+    cache.put(filename, data)
+    assert np.array_equal(cache.get(filename).points, data.points)
+    assert [name for name in os.listdir(cache.cache_dir) if name.startswith(".")] == []
+    assert len(cache.entries()) == 1
+
+
+def test_half_written_entry_is_a_miss(tmp_path, cache):
+    filename = write_mesh(sphere(8), str(tmp_path / "sphere.ply"))
+    cache.strain(filename)
+    path = os.path.join(cache.cache_dir, cache.key(filename), "points.npy")
+    with open(path, "r+b") as file:
+        file.truncate(16)
+    assert cache.get(filename) is None
@@ -0,0 +1,88 @@
+import os
+import numpy as np
+import pytest
+from vtk import vtkAppendPolyData, vtkPlaneSource
+from Reader_Strainer import noodStrainer
+from Streaming_Strainer import streaming_strainer, remove_spill, read_ply_header
+from meshes import sphere, write_mesh
+
+# Small enough that every mesh below is converted in several chunks
+TINY_BUDGET = 1
+
+
+def assert_same_strained_mesh(expected, streamed):
+    assert isinstance(streamed.points, np.memmap)
+    assert np.array_equal(np.asarray(streamed.points), expected.points)
+    assert np.array_equal(np.asarray(streamed.polygons), expected.polygons)
+    assert np.allclose(np.asarray(streamed.normals), expected.normals, atol=1e-5)
+    assert np.allclose(np.asarray(streamed.colors), expected.colors, atol=1e-6)
+
+
+@pytest.mark.parametrize("normals", [True, False])
+def test_binary_ply_matches_noodstrainer(tmp_path, normals):
+    filename = write_mesh(sphere(64, normals=normals), str(tmp_path / "sphere.ply"))
+    data = streaming_strainer(filename, TINY_BUDGET, spill_dir=str(tmp_path))
+    assert_same_strained_mesh(noodStrainer(filename), data)
+    remove_spill(data)
+
+
+@pytest.mark.parametrize("name, pieces", [("ascii.ply", 1), ("whole.vtp", 1), ("pieces.vtp", 3)])
+def test_other_files_match_noodstrainer(tmp_path, name, pieces):
+    filename = write_mesh(sphere(32), str(tmp_path / name), binary=False, pieces=pieces)
+    data = streaming_strainer(filename, TINY_BUDGET, spill_dir=str(tmp_path))
+    assert_same_strained_mesh(noodStrainer(filename), data)
+    remove_spill(data)
+
+
+def test_quads_are_fan_triangulated(tmp_path):
+    plane = vtkPlaneSource()
+    plane.SetResolution(40, 30)
+    plane.Update()
+    filename = write_mesh(plane.GetOutput(), str(tmp_path / "quads.ply"))
+    data = streaming_strainer(filename, TINY_BUDGET, spill_dir=str(tmp_path))
+    assert len(data.polygons) == 2 * 40 * 30
+    assert_same_strained_mesh(noodStrainer(filename), data)
+    remove_spill(data)
+
+
+def test_mixed_faces_raise_and_leave_no_spill(tmp_path):
+    plane = vtkPlaneSource()
+    append = vtkAppendPolyData()
+    append.AddInputConnection(plane.GetOutputPort())
+    append.AddInputData(sphere(8))
+    append.Update()
+    filename = write_mesh(append.GetOutput(), str(tmp_path / "mixed.ply"))
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    with pytest.raises(ValueError):
+        streaming_strainer(filename, spill_dir=str(spill_dir))
+    assert os.listdir(spill_dir) == []
+
+
+def test_remove_spill(tmp_path):
+    filename = write_mesh(sphere(8), str(tmp_path / "sphere.ply"))
+    data = streaming_strainer(filename, spill_dir=str(tmp_path))
+    folder = data.spill_dir
+    assert os.path.isdir(folder)
+    remove_spill(data)
+    assert not os.path.exists(folder)
+    assert len(data.points) == 0
+
+
+def test_noodstrainer_memory_budget_switch(tmp_path):
+    filename = write_mesh(sphere(8), str(tmp_path / "sphere.ply"))
+    data = noodStrainer(filename, memory_budget=TINY_BUDGET)
+    assert data.spill_dir is not None
+    remove_spill(data)
+    with pytest.raises(ValueError):
+        noodStrainer(filename, color_array="Normals", memory_budget=TINY_BUDGET)
+
+
+def test_ply_header(tmp_path):
+    filename = write_mesh(sphere(8), str(tmp_path / "sphere.ply"))
+    length, byte_order, elements = read_ply_header(filename)
+    with open(filename, "rb") as file:
+        assert file.read(length).endswith(b"end_header\n")
+    assert byte_order in ("<", ">")
+    assert [(name, count) for name, count, _ in elements] == [("vertex", 50), ("face", 96)]
+    assert elements[1][2] == [("vertex_indices", "u1", "i4")]
@@ -0,0 +1,44 @@
+import numpy as np
+from vtk import vtkCellArray
+from Triangulator import triangulate_cells, triangulate_polys, consume_faces
+
+
+def test_fans_follow_consume_faces_order():
+    # A quad and a pentagon
+    offsets = [0, 4, 9]
+    connectivity = [10, 11, 12, 13, 20, 21, 22, 23, 24]
+    triangles = triangulate_cells(offsets, connectivity)
+    assert triangles.dtype == np.uint32
+    assert triangles.tolist() == [[10, 11, 12], [10, 12, 13], [20, 21, 22], [20, 22, 23], [20, 23, 24]]
+
+
+def test_cells_with_fewer_than_three_vertices_are_skipped():
+    offsets = [0, 2, 3, 6]
+    connectivity = [0, 1, 2, 3, 4, 5]
+    assert triangulate_cells(offsets, connectivity).tolist() == [[3, 4, 5]]
+
+
+def test_triangle_fast_path():
+    connectivity = np.arange(12, dtype=np.int64)
+    triangles = triangulate_cells(np.arange(0, 13, 3), connectivity)
+    assert triangles.dtype == np.uint32
+    assert np.array_equal(triangles, connectivity.reshape(-1, 3))
+
+
+def test_empty_input():
+    assert triangulate_cells([0], []).shape == (0, 3)
+    assert triangulate_polys(vtkCellArray()).shape == (0, 3)
+    assert triangulate_polys(None).shape == (0, 3)
+
+
+def test_consume_faces_matches_cell_arrays():
+    polygons = [[0, 1, 2], [3, 4, 5, 6], [7, 8, 9, 10, 11]]
+    offsets = np.cumsum([0] + [len(polygon) for polygon in polygons])
+    assert np.array_equal(consume_faces(None, polygons), triangulate_cells(offsets, np.concatenate(polygons)))
+
+
+def test_vtk_cell_array():
+    cells = vtkCellArray()
+    for cell in ([0, 1, 2, 3], [4, 5, 6]):
+        cells.InsertNextCell(len(cell), cell)
+    assert triangulate_polys(cells).tolist() == [[0, 1, 2], [0, 2, 3], [4, 5, 6]]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from vtkmodules.util.numpy_support import vtk_to_numpy
+from Reader_Strainer_Threading import Properties
+from Vertex_Cache import acmr, first_use_order, optimize_vertex_cache
+from meshes import sphere
+
+
+@pytest.fixture
+def shuffled_sphere():
+    polydata = sphere(48)
+    data = Properties()
+    data.points = vtk_to_numpy(polydata.GetPoints().GetData())
+    data.normals = vtk_to_numpy(polydata.GetPointData().GetNormals())
+    triangles = vtk_to_numpy(polydata.GetPolys().GetConnectivityArray()).reshape(-1, 3).astype(np.uint32)
+    data.polygons = triangles[np.random.default_rng(0).permutation(len(triangles))]
+    return data
+
+
+def test_acmr_of_unshared_triangles():
+    assert acmr(np.arange(9).reshape(3, 3)) == 3.0
+    assert acmr(np.empty((0, 3))) == 0.0
+
+
+def test_first_use_order_puts_unused_vertices_last():
+    order, remap = first_use_order(np.array([[3, 1, 4], [1, 0, 3]]), 6)
+    assert order.tolist() == [3, 1, 4, 0, 2, 5]
+    assert np.array_equal(remap[order], np.arange(6))
+
+
+@pytest.mark.parametrize("method", ["tipsify", "morton"])
+def test_optimized_mesh_is_in_first_use_order(shuffled_sphere, method):
+    result = optimize_vertex_cache(shuffled_sphere, method=method)
+    order, _ = first_use_order(result.polygons, len(result.points))
+    assert np.array_equal(order, np.arange(len(result.points)))
+
+
+@pytest.mark.parametrize("method", ["tipsify", "morton"])
+def test_optimized_mesh_is_the_same_mesh_with_fewer_misses(shuffled_sphere, method):
+    data = shuffled_sphere
+    result = optimize_vertex_cache(data, method=method)
+    assert result.polygons.dtype == data.polygons.dtype
+
+    def corner_positions(mesh):
+        # Triangles as sorted rows of their corner positions, independent of triangle and vertex order
+        return np.sort(np.asarray(mesh.points)[mesh.polygons.astype(np.intp)].reshape(-1, 9), axis=0)
+    assert np.array_equal(corner_positions(result), corner_positions(data))
+    # Normals were permuted along with the points
+    position_to_normal = {tuple(p): tuple(n) for p, n in zip(data.points.tolist(), data.normals.tolist())}
+    assert all(position_to_normal[tuple(p)] == tuple(n) for p, n in zip(result.points.tolist(), result.normals.tolist()))
+    assert acmr(result.polygons) < 0.5 * acmr(data.polygons)
+
+
+def test_unknown_method(shuffled_sphere):
+    with pytest.raises(ValueError):
+        optimize_vertex_cache(shuffled_sphere, method="forsyth")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import numpy as np
+from vtk import vtkPolyDataMapper
+from vtkmodules.util.numpy_support import numpy_to_vtk
+from vtkMapperStrainer import WatchedMapper
+from meshes import sphere
+
+
+class RecordingPublisher:
+    def __init__(self):
+        self.published = 0
+
+    def publish(self, frame):
+        self.published += 1
+
+
+def watched_sphere():
+    polydata = sphere(16)
+    scalars = numpy_to_vtk(np.linspace(0, 1, polydata.GetNumberOfPoints()), deep=True)
+    scalars.SetName("Scalars")
+    polydata.GetPointData().SetScalars(scalars)
+    mapper = vtkPolyDataMapper()
+    mapper.SetInputData(polydata)
+    publisher = RecordingPublisher()
+    return polydata, WatchedMapper(mapper, publisher), publisher
+
+
+def test_only_changed_arrays_are_redone():
+    polydata, watched, publisher = watched_sphere()
+    assert "points" in watched.poll()
+    assert watched.poll() == set()
+    assert (watched.restrains, watched.recolors, publisher.published) == (1, 0, 1)
+
+    scalars = polydata.GetPointData().GetScalars()
+    scalars.SetValue(0, 5.0)
+    scalars.Modified()
+    assert watched.poll() == {"scalars", "colors"}
+    assert watched.data.scalars[0] == 5.0
+    assert (watched.restrains, watched.recolors, publisher.published) == (1, 1, 2)
+
+
+def test_unused_change_is_not_counted_as_a_recolor():
+    polydata, watched, publisher = watched_sphere()
+    watched.poll()
+    # The normals' modification time moves, but there are no normals left to gather
+    polydata.GetPointData().RemoveArray("Normals")
+    assert watched.poll() == set()
+    assert (watched.restrains, watched.recolors, publisher.published) == (1, 0, 1)
+
+
+def test_watch_logs_failed_polls_and_keeps_going(caplog):
+    polydata, watched, publisher = watched_sphere()
+    poll = watched.poll
+    calls = []
+
+    def flaky_poll():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("pipeline failed")
+        return poll()
+    watched.poll = flaky_poll
+
+    async def main():
+        task = watched.start(interval=0.01)
+
+        async def polled_again():
+            while len(calls) < 3:
+                await asyncio.sleep(0.01)
+        try:
+            await asyncio.wait_for(polled_again(), timeout=5)
+        finally:
+            watched.stop()
+        return task
+    with caplog.at_level(logging.ERROR, logger="vtkMapperStrainer"):
+        task = asyncio.run(main())
+    assert task.cancelled()
+    assert watched.errors == 1
+    assert "pipeline failed" in caplog.text
+    assert publisher.published == 1